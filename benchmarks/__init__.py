@@ -0,0 +1 @@
+"""Offline benchmarks of the extractors (see ``benchmarks/run.py``)."""
@@ -0,0 +1,276 @@
+"""
+Local stand-ins for the surface of each portal, serving synthetic gazettes.
+
+Every portal runs on its own ``ThreadingHTTPServer`` on 127.0.0.1 and publishes
+one edition per weekday (ALPA: one weekly edition, listed on each of its days).
+Each response waits ``latency`` seconds before being sent, and the server counts
+requests by kind (listing, search, form, pdf) so the runner can report them.
+"""
+
+import json
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from collections import Counter
+
+MONTHS = (
+    "janeiro", "fevereiro", "março", "abril", "maio", "junho",
+    "julho", "agosto", "setembro", "outubro", "novembro", "dezembro",
+)
+
+
+def synthetic_pdf(text: str, size: int = 64 * 1024) -> bytes:
+    """Builds a one-page PDF showing ``text`` at the top, padded to about ``size`` bytes."""
+    stream = f"BT /F1 12 Tf 72 760 Td ({text}) Tj ET"
+    padding = max(size - 700, 0)
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [4 0 R] /Count 1 >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        "/Resources << /Font << /F1 3 0 R >> >> /Contents 5 0 R >>",
+        f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream",
+        # Corpo de enchimento: um stream não referenciado com o tamanho pedido
+        f"<< /Length {padding} >>\nstream\n{'0' * padding}\nendstream",
+    ]
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(body))
+        body += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(body)
+    body += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    body += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    body += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return body
+
+
+def published(day: date) -> bool:
+    return day.weekday() < 5
+
+
+class Portal:
+    """
+    A running stand-in server.
+
+    Args:
+        handler (type): ``_PortalHandler`` subclass implementing the portal.
+        latency (float): Seconds added before every response.
+        pdf_size (int): Approximate size of each synthetic PDF.
+    """
+
+    def __init__(self, handler, latency: float = 0.0, pdf_size: int = 64 * 1024):
+        self.requests = Counter()
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._pdfs = {}
+        handler = type(handler.__name__, (handler,), {"portal": self, "latency": latency, "pdf_size": pdf_size})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, kind: str, size: int):
+        with self._lock:
+            self.requests[kind] += 1
+            self.bytes_sent += size
+
+    def pdf(self, text: str, size: int) -> bytes:
+        with self._lock:
+            if text not in self._pdfs:
+                self._pdfs[text] = synthetic_pdf(text, size)
+            return self._pdfs[text]
+
+
+class _PortalHandler(BaseHTTPRequestHandler):
+    portal = None
+    latency = 0.0
+    pdf_size = 64 * 1024
+    # HTTP/1.1 mantém a conexão aberta como nos portais reais
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        form = {}
+        if method == "POST":
+            body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+            form = {k: v[-1] for k, v in parse_qs(body).items()}
+        if self.latency:
+            threading.Event().wait(self.latency)
+        kind, status, content_type, body = self.route(method, url.path, query, form)
+        self.portal.count(kind, len(body))
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def route(self, method, path, query, form):
+        raise NotImplementedError
+
+    def send_pdf(self, text):
+        return "pdf", 200, "application/pdf", self.portal.pdf(text, self.pdf_size)
+
+    @staticmethod
+    def not_found():
+        return "outro", 404, "text/plain", b"not found"
+
+    @staticmethod
+    def html(kind, markup):
+        return kind, 200, "text/html; charset=utf-8", markup.encode("utf-8")
+
+    def log_message(self, *args):
+        pass
+
+
+class ALCEPortal(_PortalHandler):
+    """JSON API of the latest editions plus the PDFs it links to."""
+
+    def route(self, method, path, query, form):
+        if path == "/api/publico/ultimas-edicoes":
+            interval = json.loads(query["buscarData"])
+            day, end = date.fromisoformat(interval["data_de"]), date.fromisoformat(interval["data_ate"])
+            dados = []
+            while day <= end:
+                if published(day):
+                    dados.append({
+                        "id": day.toordinal(),
+                        "data_publicacao": f"{day.isoformat()}T00:00:00",
+                        "caminho_documento_pdf": f"/storage/diarios/{day.isoformat()}.pdf",
+                    })
+                day += timedelta(days=1)
+            return "listagem", 200, "application/json", json.dumps({"dados": dados}).encode()
+        if path.startswith("/storage/diarios/"):
+            return self.send_pdf(f"Diario Oficial ALECE {path.rsplit('/', 1)[-1][:-4]}")
+        return self.not_found()
+
+
+class ALACPortal(_PortalHandler):
+    """JSF page: the GET carries the date and hands out a ViewState, the POST returns the PDF."""
+
+    PAGE = "/faces/paginas/publico/dec/visualizarDOE.xhtml"
+
+    def route(self, method, path, query, form):
+        if path != self.PAGE:
+            return self.not_found()
+        if method == "GET":
+            # O ViewState carrega a data consultada, como o estado guardado no servidor JSF
+            day = "-".join(reversed(query["dataDEC"].split("-")))
+            return self.html(
+                "formulario",
+                f'<form id="visualizarDoe"><input type="hidden" name="javax.faces.ViewState" value="{day}"/></form>',
+            )
+        day = date.fromisoformat(form["javax.faces.ViewState"])
+        if not published(day):
+            return self.html("pdf", "<html>Nenhum diário publicado nesta data</html>")
+        return self.send_pdf(f"Diario Oficial ALEAC {day.isoformat()}")
+
+
+class ALGOPortal(_PortalHandler):
+    """Monthly FullCalendar pages with links to the PDFs."""
+
+    def route(self, method, path, query, form):
+        if path == "/gestao-parlamentar/diario":
+            first = date(int(query["ano"]), int(query["mes"]), 1)
+            links = []
+            day = first
+            while day.month == first.month:
+                if published(day):
+                    links.append(
+                        f'<a class="fc-day-grid-event" href="/storage/diario/diario-alego-{day.isoformat()}.pdf">DOE</a>'
+                    )
+                day += timedelta(days=1)
+            return self.html("listagem", "<html><body>" + "".join(links) + "</body></html>")
+        if path.startswith("/storage/diario/"):
+            return self.send_pdf(f"Diario Oficial ALEGO {path[-14:-4]}")
+        return self.not_found()
+
+
+class ALMSPortal(_PortalHandler):
+    """Search form by edition number; editions 1 to ``editions`` exist."""
+
+    editions = 10_000
+
+    def route(self, method, path, query, form):
+        if path == "/":
+            rows = ""
+            number = query.get("pesquisa", "")
+            if number.isdigit() and 1 <= int(number) <= self.editions:
+                rows = (
+                    f"<tr><td>Diário nº {number}</td>"
+                    f'<td><a href="/arquivos/diario-{number}.pdf">Baixar</a></td></tr>'
+                )
+            return self.html(
+                "busca" if number else "pagina",
+                '<html><body><form method="get" action="/">'
+                f'<input id="pesquisa" name="pesquisa" value="{number}"/>'
+                '<button id="filtro" type="submit">Filtrar</button></form>'
+                f'<table class="table"><tr><th>Diário</th><th></th></tr>{rows}</table></body></html>',
+            )
+        if path.startswith("/arquivos/"):
+            return self.send_pdf(f"Diario Oficial ALEMS {path.rsplit('-', 1)[-1][:-4]}")
+        return self.not_found()
+
+
+class ALPAPortal(_PortalHandler):
+    """Date picker page: a weekly edition opens in a new tab from the "Visualizar o arquivo" button."""
+
+    def route(self, method, path, query, form):
+        if path == "/Comunicacao/Diarios":
+            return self.html(
+                "pagina",
+                """<html><body>
+<input id="dateEdit_I"/><span id="dateEdit_B-1">📅</span><div id="resultado"></div>
+<script>
+document.getElementById("dateEdit_I").addEventListener("change", function (e) {
+  var parts = e.target.value.split("/");
+  var day = new Date(Date.UTC(parts[2], parts[1] - 1, parts[0]));
+  var box = document.getElementById("resultado");
+  box.innerHTML = "";
+  var weekday = day.getUTCDay();
+  if (weekday === 0 || weekday === 6) { return; }
+  var monday = new Date(day.getTime() - (weekday - 1) * 86400000);
+  fetch("/Comunicacao/Diarios/busca?data=" + monday.toISOString().slice(0, 10));
+  var button = document.createElement("button");
+  button.textContent = "Visualizar o arquivo";
+  button.onclick = function () {
+    window.open("/Diarios/semana-" + monday.toISOString().slice(0, 10) + ".pdf", "_blank");
+  };
+  box.appendChild(button);
+});
+</script></body></html>""",
+            )
+        if path == "/Comunicacao/Diarios/busca":
+            return self.html("busca", "ok")
+        if path.startswith("/Diarios/semana-"):
+            monday = date.fromisoformat(path[-14:-4])
+            friday = monday + timedelta(days=4)
+            header = (
+                f"Diario Oficial - {monday.day:02d} de {MONTHS[monday.month - 1]} a "
+                f"{friday.day:02d} de {MONTHS[friday.month - 1]} de {friday.year}"
+            )
+            return self.send_pdf(header)
+        return self.not_found()
+
+
+PORTALS = {
+    "al_ce": ALCEPortal,
+    "al_ac": ALACPortal,
+    "al_go": ALGOPortal,
+    "al_ms": ALMSPortal,
+    "al_pa": ALPAPortal,
+}
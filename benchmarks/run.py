@@ -0,0 +1,171 @@
+"""
+Offline benchmark of the extractors against the local portal stand-ins.
+
+Each extractor runs in its own spawned process against a fresh storage root, so
+the peak RSS reported is its own. The report lists documents/s, MB/s, peak RSS
+and the requests each portal received. ALMS and ALPA drive Chrome and are
+reported as skipped when no browser can be started.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.run --days 20 --latency 0.05
+    python -m benchmarks.run --save baseline.json
+    python -m benchmarks.run --baseline baseline.json --tolerance 0.2
+"""
+
+import io
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from pathlib import Path
+from datetime import date, timedelta
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.portals import PORTALS, Portal
+
+START = date(2024, 3, 4)
+ENTITY_CODES = {"al_ce": "ALCE", "al_ac": "ALAC", "al_go": "ALGO", "al_ms": "ALMS", "al_pa": "ALPA"}
+
+
+def _extractor(entity, base_dir, url):
+    """The entity's extractor pointed at the stand-in at ``url``."""
+    if entity == "al_ce":
+        from datapub.entities.al_ce.extractor import ALCEExtractor
+
+        extractor = ALCEExtractor(base_dir=base_dir)
+        extractor.base_api = f"{url}/api/publico/ultimas-edicoes"
+        extractor.base_url = url
+    elif entity == "al_ac":
+        from datapub.entities.al_ac.extractor import ALACExtractor
+
+        extractor = ALACExtractor(base_dir=base_dir)
+        extractor.base_url = url + PORTALS["al_ac"].PAGE
+    elif entity == "al_go":
+        from datapub.entities.al_go.extractor import ALGOExtractor
+
+        extractor = ALGOExtractor(base_dir=base_dir, base_url=url)
+    elif entity == "al_ms":
+        from datapub.entities.al_ms.extractor import ALMSExtractor
+
+        extractor = ALMSExtractor(base_dir=base_dir)
+        extractor.base_url = url + "/"
+    elif entity == "al_pa":
+        from datapub.entities.al_pa.extractor import ALPAExtractor
+
+        extractor = ALPAExtractor(base_dir=base_dir)
+        extractor.base_url = url + "/Comunicacao/Diarios"
+    else:
+        raise ValueError(f"Sem portal simulado para '{entity}'")
+    return extractor
+
+
+def _params(entity, days):
+    if entity == "al_ms":
+        return {"start_num": 1, "end_num": days}
+    return {"start_date": START, "end_date": START + timedelta(days=days - 1)}
+
+
+def run_scenario(entity: str, days: int, latency: float, pdf_size: int, verbose=False) -> dict:
+    """Runs one extractor over ``days`` days (or editions) of its stand-in; runs in a child process."""
+    from datapub.factory import close_extractor, run_download
+    from datapub.shared.utils.manifest import Manifest
+
+    log = sys.stdout if verbose else io.StringIO()
+    with tempfile.TemporaryDirectory() as workdir, Portal(PORTALS[entity], latency, pdf_size) as portal:
+        base_dir = Path(workdir) / "raw" / entity
+        with redirect_stdout(log):
+            try:
+                extractor = _extractor(entity, base_dir, portal.url)
+            except Exception as e:
+                return {"entity": entity, "skipped": f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"}
+            started = time.perf_counter()
+            try:
+                run_download(extractor, _params(entity, days))
+            finally:
+                elapsed = time.perf_counter() - started
+                close_extractor(extractor)
+
+        manifest = Manifest(base_dir.parent)
+        records = list(manifest.documents(ENTITY_CODES[entity]))
+        manifest.close()
+
+    stored = sum(r["tamanho_bytes"] or 0 for r in records)
+    return {
+        "entity": entity,
+        "documents": len(records),
+        "bytes": stored,
+        "seconds": round(elapsed, 3),
+        "docs_per_s": round(len(records) / elapsed, 2) if elapsed else 0.0,
+        "mb_per_s": round(stored / elapsed / 1e6, 2) if elapsed else 0.0,
+        # ru_maxrss vem em KiB no Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "requests": dict(portal.requests),
+    }
+
+
+def run_benchmarks(entities, days=10, latency=0.0, pdf_size=64 * 1024, verbose=False) -> list:
+    """Runs each scenario in a fresh spawned process and returns the results in order."""
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for entity in entities:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results.append(pool.submit(run_scenario, entity, days, latency, pdf_size, verbose).result())
+    return results
+
+
+def print_report(results):
+    print(f"{'entidade':<8} {'docs':>5} {'docs/s':>8} {'MB/s':>7} {'RSS MB':>7} {'tempo s':>8}  requisições")
+    for r in results:
+        if "skipped" in r:
+            print(f"{r['entity']:<8} ignorado ({r['skipped']})")
+            continue
+        requests = ", ".join(f"{kind}={n}" for kind, n in sorted(r["requests"].items()))
+        print(
+            f"{r['entity']:<8} {r['documents']:>5} {r['docs_per_s']:>8.2f} {r['mb_per_s']:>7.2f} "
+            f"{r['peak_rss_mb']:>7.1f} {r['seconds']:>8.2f}  {requests}"
+        )
+
+
+def regressions(results, baseline, tolerance=0.2) -> list:
+    """Entities whose docs/s fell more than ``tolerance`` below the baseline."""
+    previous = {r["entity"]: r for r in baseline if "skipped" not in r}
+    slower = []
+    for r in results:
+        before = previous.get(r["entity"])
+        if before and "skipped" not in r and r["docs_per_s"] < before["docs_per_s"] * (1 - tolerance):
+            slower.append(f"{r['entity']}: {before['docs_per_s']:.2f} -> {r['docs_per_s']:.2f} docs/s")
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the extractors against local portals")
+    parser.add_argument("entities", nargs="*", default=list(PORTALS), help="Entities to run (default: all)")
+    parser.add_argument("--days", type=int, default=10, help="Days (editions, for ALMS) to download")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--pdf-kb", type=int, default=64, help="Size of each synthetic PDF")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Accepted docs/s drop against the baseline")
+    parser.add_argument("--verbose", action="store_true", help="Show the extractors' own output")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.entities, args.days, args.latency, args.pdf_kb * 1024, args.verbose)
+    print_report(results)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.baseline:
+        slower = regressions(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+        for line in slower:
+            print(f"🐢 Regressão: {line}")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,120 +5,315 @@ Adapted for PyScaffold project structure.
 """
 
 import argparse
-import importlib
 import sys
-from datetime import datetime, date
 from pathlib import Path
-from datapub.shared.contracts.extractor_contract import ExtractorContract
-from datapub.shared.utils.extractor_base import ExtractorBase
+from datapub.factory import build_params, close_extractor, load_extractor, run_download
+from datapub.orchestrator import implemented_entities, print_report, run_all
+from datapub.processing.text import PROCESSED_ROOT, process_documents
+from datapub.shared.utils.blob_store import deduplicate
+from datapub.shared.utils.manifest import Manifest
+from datapub.shared.utils.metrics import metrics
 
-EXTRACTORS_PACKAGE = "datapub.entities"
+STORAGE_ROOT = Path("storage/raw")
 
-def parse_date(date_str):
-    """Parses a date string in YYYY-MM-DD format into a date object."""
-    return datetime.strptime(date_str, "%Y-%m-%d").date()
+def add_range_arguments(parser):
+    """Adds the options shared by every command that runs extractors."""
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument(
+        "--incremental", action="store_true", help="Resume an interrupted run or start after the last checkpoint"
+    )
+    parser.add_argument(
+        "--revalidate", action="store_true", help="Re-check files already downloaded with conditional requests"
+    )
 
-def load_extractor(entity: str) -> ExtractorContract:
-    """
-    Dynamically loads and returns the Extractor class instance for a given entity.
+def run_extractor(entity, args):
+    """Initializes and runs the appropriate extractor with CLI arguments."""
+    extractor = load_extractor(entity)
+    extractor.revalidate = args.revalidate
+
+    params = build_params(entity, args.start, args.end)
+
+    # Call the extractor's download method with collected parameters
+    try:
+        run_download(extractor, params, incremental=args.incremental)
+    finally:
+        close_extractor(extractor)
+
+def run_many(args):
+    """Runs several extractors in parallel, one worker process per entity."""
+    if args.all:
+        entities = implemented_entities(args.sources)
+    elif args.entities:
+        entities = args.entities
+    else:
+        raise ValueError("Use --all or list the entities to run")
 
-    Args:
-        entity (str): Name of the entity folder (e.g., 'al_go').
+    print(f"🚀 Running {len(entities)} extractors with {args.workers} workers: {', '.join(entities)}")
+    results = run_all(
+        entities,
+        workers=args.workers,
+        start=args.start,
+        end=args.end,
+        browsers=args.browsers,
+        incremental=args.incremental,
+        revalidate=args.revalidate,
+    )
+    print_report(results)
 
-    Returns:
-        ExtractorContract: An instance of the extractor class.
+    if any(r.status != "sucesso" for r in results):
+        sys.exit(1)
+
+def import_metadata(args):
+    """Imports the legacy per-file metadata JSON of every entity into the storage manifest."""
+    root = Path(args.root)
+    manifest = Manifest(root)
+    total = 0
+    for metadata_dir in sorted(root.glob("*/metadata")):
+        count = manifest.import_json_dir(metadata_dir)
+        print(f"📥 {metadata_dir}: {count} registros importados")
+        total += count
+    manifest.close()
+    print(f"✅ Manifesto {manifest.path} atualizado com {total} registros")
+
+def dedupe_storage(args):
+    """Moves every downloaded file into the content-addressed store, keeping one copy per content."""
+    manifest = Manifest(args.root)
+    seen, distinct, reclaimed = deduplicate(args.root, manifest)
+    manifest.close()
+    print(f"✅ {seen} arquivos, {distinct} conteúdos novos no repositório, {reclaimed / 1024 / 1024:.1f} MB recuperados")
+
+def process_text(args):
+    """Extracts the full text of every downloaded document into the processed storage."""
+    manifest = Manifest(args.root)
+    done, failed = process_documents(manifest, args.out, workers=args.workers, entity=args.only, force=args.force)
+    manifest.close()
+    print(f"✅ {done} documentos processados em {args.out}" + (f", {failed} com falha" if failed else ""))
+    if failed:
+        sys.exit(1)
 
-    Raises:
-        ValueError: If the extractor module or class cannot be found.
-        TypeError: If the loaded class does not inherit from ExtractorContract.
-    """
-    class_name = entity.upper().replace("_", "") + "Extractor"
+def load_db(args):
+    """Upserts the manifest catalog into the ``documentos`` table of Postgres."""
+    # Importados aqui: só este comando depende do psycopg2
+    from datapub.processing.load_db import load_documents
+    from datapub.shared.utils.database import connection_pool
 
+    manifest = Manifest(args.root)
+    pool = connection_pool(args.db_url, size=args.workers)
     try:
-        module = importlib.import_module(f"datapub.entities.{entity}.extractor")
-    except ModuleNotFoundError as e:
-        raise ValueError(f"Extractor module not found for entity '{entity}'") from e
+        loaded = load_documents(
+            manifest, pool, workers=args.workers, batch_size=args.batch_size, entity=args.only, full=args.full
+        )
+    finally:
+        pool.closeall()
+        manifest.close()
+    print(f"✅ {loaded} documentos carregados no banco")
 
-    if not hasattr(module, class_name):
-        raise AttributeError(f"The module '{entity}.extractor' must contain a class named '{class_name}'")
+def tag_entities(args):
+    """Tags people, agencies and places in the processed text into the ``entidades`` table."""
+    from datapub.processing.ner import extract_entities
+    from datapub.shared.utils.database import connection_pool
 
-    extractor_cls = getattr(module, class_name)
+    manifest = Manifest(args.root)
+    pool = connection_pool(args.db_url, size=1)
+    try:
+        tagged = extract_entities(
+            manifest,
+            pool,
+            args.text,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            gazetteer=args.gazetteer,
+            model=args.model,
+            entity=args.only,
+            full=args.full,
+        )
+    finally:
+        pool.closeall()
+        manifest.close()
+    print(f"✅ Entidades extraídas de {tagged} documentos")
 
-    if not issubclass(extractor_cls, ExtractorContract):
-        raise TypeError(f"Extractor class in '{entity}' must inherit from ExtractorContract")
+def extract_spending(args):
+    """Extracts the amounts in reais of the processed text into the ``gastos`` table."""
+    from datapub.processing.amounts import extract_spending as run
+    from datapub.shared.utils.database import connection_pool
 
-    return extractor_cls()
+    manifest = Manifest(args.root)
+    pool = connection_pool(args.db_url, size=1)
+    try:
+        scanned = run(
+            manifest, pool, args.text, workers=args.workers, batch_size=args.batch_size, entity=args.only, full=args.full
+        )
+    finally:
+        pool.closeall()
+        manifest.close()
+    print(f"✅ Valores extraídos de {scanned} documentos")
 
-def run_extractor(entity, args):
-    """Initializes and runs the appropriate extractor with CLI arguments."""
-    extractor = load_extractor(entity)
+def embed(args):
+    """Embeds the processed text of each document into the ``document_embeddings`` table."""
+    from datapub.processing.embeddings import DEFAULT_MODEL, embed_documents
+    from datapub.shared.utils.database import connection_pool
 
-    params = {}
-
-    if entity == "al_go":
-        # ALE-GO extractor: uses start/end dates
-        params["start_date"] = parse_date(args.start) if args.start else date(2007, 8, 1)
-        params["end_date"] = parse_date(args.end) if args.end else date.today()
-        print(f"🚀 Starting ALE-GO download from {params['start_date']} to {params['end_date']}")
-    
-    elif entity == "al_ms":
-        # ALE-MS extractor: uses edition numbers
-        params["start_num"] = int(args.start) if args.start else 1844
-        params["end_num"] = int(args.end) if args.end else None
-        print(f"🚀 Starting ALE-MS download from number {params['start_num']} to {'last available' if not params['end_num'] else params['end_num']}")
-
-    elif entity == "al_pa":
-        # ALE-PA extractor: uses start/end dates
-        params["start_date"] = parse_date(args.start) if args.start else date(2021, 1, 1)
-        params["end_date"] = parse_date(args.end) if args.end else date.today()
-        print(f"🚀 Starting ALE-PA download from {params['start_date']} to {params['end_date']}")
-
-    elif entity == "al_ce":
-        # ALE-CE extractor: uses start/end dates
-        params["start_date"] = parse_date(args.start) if args.start else date(2025, 5, 26)
-        params["end_date"] = parse_date(args.end) if args.end else date.today()
-        print(f"🚀 Starting ALE-CE download from {params['start_date']} to {params['end_date']}")
-
-    elif entity == "al_ac":
-        # ALE-AC extractor: uses start/end dates
-        params["start_date"] = parse_date(args.start) if args.start else date(2015, 1, 1)
-        params["end_date"] = parse_date(args.end) if args.end else date.today()
-        print(f"🚀 Starting ALE-AC download from {params['start_date']} to {params['end_date']}")
+    manifest = Manifest(args.root)
+    pool = connection_pool(args.db_url, size=1)
+    try:
+        embedded = embed_documents(
+            manifest,
+            pool,
+            args.text,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            model=args.model or DEFAULT_MODEL,
+            entity=args.only,
+            full=args.full,
+        )
+    finally:
+        pool.closeall()
+        manifest.close()
+    print(f"✅ Embeddings gerados para {embedded} documentos")
 
-    # Call the extractor's download method with collected parameters
-    extractor.download(**params)
+def index_search(args):
+    """Indexes the processed text of each document into Elasticsearch."""
+    from datapub.processing.search_index import index_documents
+
+    manifest = Manifest(args.root)
+    try:
+        indexed, failed = index_documents(
+            manifest,
+            args.text,
+            es_url=args.es_url,
+            index=args.index,
+            concurrency=args.concurrency,
+            max_docs=args.batch_size,
+            entity=args.only,
+            full=args.full,
+        )
+    finally:
+        manifest.close()
+    print(f"✅ {indexed} documentos indexados" + (f", {failed} com falha" if failed else ""))
+    if failed:
+        sys.exit(1)
 
 def main():
     """Entry point for CLI parsing and execution."""
     parser = argparse.ArgumentParser(description="Runner for official gazette extractors")
+    parser.add_argument("--metrics", help="Append timing spans and counters to this JSON lines file")
+    parser.add_argument("--prometheus", help="Write the run's metrics to this file in Prometheus text format")
     subparsers = parser.add_subparsers(dest="entity", required=True)
 
     # Define subcommands and their arguments for each 'entity'
     parser_algo = subparsers.add_parser("al_go", help="ALE-GO gazettes")
-    parser_algo.add_argument("--start")
-    parser_algo.add_argument("--end")
+    add_range_arguments(parser_algo)
 
     parser_alms = subparsers.add_parser("al_ms", help="ALE-MS gazettes")
-    parser_alms.add_argument("--start")
-    parser_alms.add_argument("--end")
+    add_range_arguments(parser_alms)
 
     parser_alepa = subparsers.add_parser("al_pa", help="ALE-PA gazettes")
-    parser_alepa.add_argument("--start")
-    parser_alepa.add_argument("--end")
+    add_range_arguments(parser_alepa)
 
     parser_alece = subparsers.add_parser("al_ce", help="ALE-CE gazettes")
-    parser_alece.add_argument("--start")
-    parser_alece.add_argument("--end")
+    add_range_arguments(parser_alece)
 
     parser_aleac = subparsers.add_parser("al_ac", help="ALE-AC gazettes")
-    parser_aleac.add_argument("--start")
-    parser_aleac.add_argument("--end")
+    add_range_arguments(parser_aleac)
+
+    parser_run = subparsers.add_parser("run", help="Run several extractors in parallel")
+    parser_run.add_argument("entities", nargs="*", help="Entities to run (e.g. al_go al_pa)")
+    parser_run.add_argument("--all", action="store_true", help="Run every implemented entity of sources.json")
+    parser_run.add_argument("--workers", type=int, default=2)
+    parser_run.add_argument("--browsers", type=int, help="Chrome instances shared by all workers")
+    parser_run.add_argument("--sources", default="sources.json")
+    add_range_arguments(parser_run)
+    parser_run.set_defaults(handler=run_many)
+
+    parser_import = subparsers.add_parser("import-metadata", help="Import legacy metadata JSON into the manifest")
+    parser_import.add_argument("--root", default=str(STORAGE_ROOT))
+    parser_import.set_defaults(handler=import_metadata)
+
+    parser_dedupe = subparsers.add_parser("dedupe", help="Store downloaded files once per content (SHA-256)")
+    parser_dedupe.add_argument("--root", default=str(STORAGE_ROOT))
+    parser_dedupe.set_defaults(handler=dedupe_storage)
+
+    parser_process = subparsers.add_parser("process", help="Extract the full text of downloaded documents")
+    parser_process.add_argument("--root", default=str(STORAGE_ROOT))
+    parser_process.add_argument("--out", default=str(PROCESSED_ROOT))
+    parser_process.add_argument("--workers", type=int, help="Worker processes (default: one per core)")
+    parser_process.add_argument("--only", help="Entity code as recorded in the manifest (e.g. ALGO)")
+    parser_process.add_argument("--force", action="store_true", help="Extract again documents already processed")
+    parser_process.set_defaults(handler=process_text)
+
+    parser_load = subparsers.add_parser("load-db", help="Load the manifest catalog into Postgres")
+    parser_load.add_argument("--root", default=str(STORAGE_ROOT))
+    parser_load.add_argument("--db-url", help="Postgres URL (default: $DB_URL)")
+    parser_load.add_argument("--workers", type=int, default=2, help="Connections loading batches at once")
+    parser_load.add_argument("--batch-size", type=int, default=5000)
+    parser_load.add_argument("--only", help="Entity code as recorded in the manifest (e.g. ALGO)")
+    parser_load.add_argument("--full", action="store_true", help="Send every document again")
+    parser_load.set_defaults(handler=load_db)
+
+    parser_ner = subparsers.add_parser("entities", help="Tag people, agencies and places into Postgres")
+    parser_ner.add_argument("--root", default=str(STORAGE_ROOT))
+    parser_ner.add_argument("--text", default=str(PROCESSED_ROOT), help="Processed storage root")
+    parser_ner.add_argument("--db-url", help="Postgres URL (default: $DB_URL)")
+    parser_ner.add_argument("--workers", type=int, help="Worker processes (default: one per core)")
+    parser_ner.add_argument("--batch-size", type=int, default=50, help="Documents per COPY")
+    parser_ner.add_argument("--gazetteer", help="JSON file with extra known names per entity type")
+    parser_ner.add_argument("--model", help="Local spaCy model (e.g. pt_core_news_sm)")
+    parser_ner.add_argument("--only", help="Entity code as recorded in the manifest (e.g. ALGO)")
+    parser_ner.add_argument("--full", action="store_true", help="Tag every document again")
+    parser_ner.set_defaults(handler=tag_entities)
+
+    parser_spending = subparsers.add_parser("spending", help="Extract amounts in reais into Postgres")
+    parser_spending.add_argument("--root", default=str(STORAGE_ROOT))
+    parser_spending.add_argument("--text", default=str(PROCESSED_ROOT), help="Processed storage root")
+    parser_spending.add_argument("--db-url", help="Postgres URL (default: $DB_URL)")
+    parser_spending.add_argument("--workers", type=int, help="Worker processes (default: one per core)")
+    parser_spending.add_argument("--batch-size", type=int, default=50, help="Documents per COPY")
+    parser_spending.add_argument("--only", help="Entity code as recorded in the manifest (e.g. ALGO)")
+    parser_spending.add_argument("--full", action="store_true", help="Scan every document again")
+    parser_spending.set_defaults(handler=extract_spending)
+
+    parser_embed = subparsers.add_parser("embed", help="Embed the processed text into Postgres")
+    parser_embed.add_argument("--root", default=str(STORAGE_ROOT))
+    parser_embed.add_argument("--text", default=str(PROCESSED_ROOT), help="Processed storage root")
+    parser_embed.add_argument("--db-url", help="Postgres URL (default: $DB_URL)")
+    parser_embed.add_argument(
+        "--model",
+        help="Local model name or path, or 'hashing' for the offline stand-in "
+        "(default: sentence-transformers/paraphrase-multilingual-mpnet-base-v2)",
+    )
+    parser_embed.add_argument(
+        "--workers", type=int, help="Worker processes (default: 1 with a model, one per core with hashing)"
+    )
+    parser_embed.add_argument("--batch-size", type=int, default=50, help="Documents per COPY")
+    parser_embed.add_argument("--only", help="Entity code as recorded in the manifest (e.g. ALGO)")
+    parser_embed.add_argument(
+        "--full", action="store_true", help="Embed every document again (cached vectors are reused)"
+    )
+    parser_embed.set_defaults(handler=embed)
+
+    parser_index = subparsers.add_parser("index", help="Index the processed text into Elasticsearch")
+    parser_index.add_argument("--root", default=str(STORAGE_ROOT))
+    parser_index.add_argument("--text", default=str(PROCESSED_ROOT), help="Processed storage root")
+    parser_index.add_argument("--es-url", help="Elasticsearch URL (default: $ES_URL)")
+    parser_index.add_argument("--index", default="diarios", help="Target index")
+    parser_index.add_argument("--concurrency", type=int, default=4, help="_bulk requests in flight")
+    parser_index.add_argument("--batch-size", type=int, default=500, help="Documents per _bulk request")
+    parser_index.add_argument("--only", help="Entity code as recorded in the manifest (e.g. ALGO)")
+    parser_index.add_argument("--full", action="store_true", help="Index every document again")
+    parser_index.set_defaults(handler=index_search)
 
     # Parse arguments
     args = parser.parse_args()
+    if args.metrics or args.prometheus:
+        metrics.configure(args.metrics, args.prometheus)
 
     try:
-        run_extractor(args.entity, args)
+        handler = getattr(args, "handler", None)
+        if handler:
+            handler(args)
+        else:
+            run_extractor(args.entity, args)
     except KeyboardInterrupt:
         print("\n⏹️ Execution interrupted by user")
         sys.exit(0)
@@ -1,43 +1,53 @@
-import os
-import json
-import hashlib
-import requests
 from bs4 import BeautifulSoup
-from datetime import datetime, timedelta
+from datetime import datetime, date
 from pathlib import Path
 
+from datapub.shared.utils.extractor_base import ExtractorBase, DownloadJob
+from datapub.shared.utils.rate_limit import HostPolicy
+
+
+class ALACExtractor(ExtractorBase):
+    # O JSF guarda um número limitado de ViewStates por sessão
+    max_per_host = 2
+    # Cada dia custa um GET e um POST no mesmo host
+    rate_policy = HostPolicy(rate=4.0, max_rate=12.0, burst=2)
 
-class Extractor:
     def __init__(self, base_dir="storage/raw/alac"):
-        self.session = requests.Session()
+        super().__init__(entity="ALAC", base_dir=base_dir)
         # Em transição para: https://www.al.ac.leg.br/
         self.base_url = "https://aleac.tceac.tc.br/faces/paginas/publico/dec/visualizarDOE.xhtml"
-        self.base_dir = Path(base_dir)
-        self.downloads_dir = self.base_dir / "downloads"
-        self.metadata_dir = self.base_dir / "metadata"
-
-        self.downloads_dir.mkdir(parents=True, exist_ok=True)
-        self.metadata_dir.mkdir(parents=True, exist_ok=True)
 
     def _format_date(self, date: datetime):
         return date.strftime("%d-%m-%Y")
 
-    def download(self, start_date=None, end_date=None, delay=0.5):
+    def download(self, start_date=None, end_date=None, sweep=False):
         if end_date is None:
-            end_date = datetime.date.today()
+            end_date = date.today()
         if start_date is None:
-            start_date = datetime.date(2007, 1, 1)
+            start_date = date(2007, 1, 1)
 
-        current_date = start_date
+        self.download_jobs(self._iter_jobs(self._plan_days(start_date, end_date, sweep=sweep)))
 
-        while current_date <= end_date:
+    def _iter_jobs(self, days):
+        for current_date in days:
+            if self.checkpoint.is_done(current_date):
+                continue
             try:
-                self._download_single(current_date)
+                job = self._build_job(current_date)
+                if job:
+                    yield job
+                else:
+                    self.checkpoint.completed(current_date, "ok")
             except Exception as e:
                 print(f"❌ Erro em {current_date}: {e}")
-            current_date += timedelta(days=1)
+                self.checkpoint.completed(current_date, "erro")
+
+    def _build_job(self, target_date: datetime):
+        nome_arquivo = f"diario-alac-{target_date.strftime('%Y-%m-%d')}.pdf"
+        if self.manifest.has_date(self.entity, target_date) or (self.downloads_dir / nome_arquivo).exists():
+            print(f"⏭️ [{target_date}] Já existe, pulando.")
+            return
 
-    def _download_single(self, target_date: datetime):
         print(f"📡 Consultando ALAC para {target_date}")
 
         params = {
@@ -46,16 +56,14 @@ class Extractor:
             "dataDEC": self._format_date(target_date)
         }
 
-        response = self.session.get(self.base_url, params=params)
+        response = self.resilience.call(self.base_url, lambda: self.session.get(self.base_url, params=params))
         if response.status_code != 200:
-            print("❌ Não foi possível carregar a página inicial:", response.status_code)
-            return
+            raise RuntimeError(f"Não foi possível carregar a página inicial: {response.status_code}")
 
         soup = BeautifulSoup(response.text, "html.parser")
         view_state = soup.find("input", {"name": "javax.faces.ViewState"})
         if not view_state:
-            print("❌ ViewState não encontrado.")
-            return
+            raise RuntimeError("ViewState não encontrado.")
 
         view_state_value = view_state["value"]
         form_id = "visualizarDoe"
@@ -72,42 +80,35 @@ class Extractor:
         }
 
         print("⏬ Enviando requisição de download...")
-        download_response = self.session.post(self.base_url, data=post_data, headers=headers)
+        return DownloadJob(
+            url=self.base_url,
+            target=self.downloads_dir / nome_arquivo,
+            metadata={"date": target_date, "unit": target_date, "label": target_date.strftime('%Y-%m-%d')},
+            method="POST",
+            data=post_data,
+            headers=headers,
+        )
 
-        content_type = download_response.headers.get("Content-Type", "")
-        if "application/pdf" not in content_type:
-            print("⚠️ Nenhum PDF disponível em", target_date.strftime('%Y-%m-%d'))
-            return
+    def _rebuild_job(self, job):
+        # O ViewState do POST expira com a sessão: consulta a página do dia de novo
+        return self._build_job(job.metadata["unit"])
 
-        nome_arquivo = f"diario-alac-{target_date.strftime('%Y-%m-%d')}.pdf"
-        local_path = self.downloads_dir / nome_arquivo
-
-        with open(local_path, "wb") as f:
-            f.write(download_response.content)
-
-        file_hash = hashlib.md5(download_response.content).hexdigest()
-        self._salvar_metadata(target_date, local_path, file_hash)
-        print(f"✅ PDF salvo: {nome_arquivo} | Hash: {file_hash[:8]}")
-
-    def _salvar_metadata(self, target_date: datetime, local_path: Path, file_hash: str):
-        metadata = {
-            "orgao": "ALAC",
-            "data_publicacao": target_date.strftime("%Y-%m-%d"),
-            "url_origem": self.base_url,
-            "caminho_local": str(local_path),
-            "data_download": datetime.now().isoformat(),
-            "tamanho_bytes": os.path.getsize(local_path),
-            "hash_md5": file_hash,
-            "status": "sucesso"
-        }
+    def _on_download_complete(self, result):
+        job = result.job
+        if result.ok:
+            self._salvar_metadata(job.metadata["date"], job.target, result.md5, sha256=result.sha256)
+            print(f"✅ PDF salvo: {job.target.name} | Hash: {result.md5[:8]}")
+        elif result.status == "invalido":
+            print("⚠️ Nenhum PDF disponível em", job.metadata["label"])
+        else:
+            super()._on_download_complete(result)
 
-        nome_metadata = f"metadata_{target_date.strftime('%Y-%m-%d')}.json"
-        with open(self.metadata_dir / nome_metadata, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+    def _salvar_metadata(self, target_date: datetime, local_path: Path, file_hash: str, sha256=None):
+        self._record_download(local_path, self.base_url, file_hash, data_publicacao=target_date, sha256=sha256)
 
 
 if __name__ == "__main__":
-    extractor = Extractor()
+    extractor = ALACExtractor()
     try:
         extractor.download(
             start_date=datetime(2015, 1, 1),
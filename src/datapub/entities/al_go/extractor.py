@@ -1,34 +1,44 @@
-import os
 import re
-import json
-import time
-import hashlib
-from pathlib import Path
 from datetime import datetime, date
+from urllib.parse import urljoin
 
 import requests
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 
-from datapub.shared.utils.extractor_base import ExtractorBase
+from datapub.shared.utils.browser_pool import browser_pool
+from datapub.shared.utils.extractor_base import ExtractorBase, DownloadJob
+from datapub.shared.utils.rate_limit import HostPolicy
+from datapub.shared.utils.resilience import CircuitOpenError
+
+# Links de PDF no HTML ou no JSON do FullCalendar (que escapa "/" como "\/")
+PDF_LINK_PATTERN = re.compile(r"[^\s\"'<>()]*diario-alego-(\d{4}-\d{2}-\d{2})\.pdf")
+EVENTS_FEED_PATTERN = re.compile(r"events\s*:\s*[\"']([^\"']+)[\"']")
 
 class ALGOExtractor(ExtractorBase):
-    def __init__(self):
-        super().__init__(entity="ALGO", base_dir="storage/raw/al_go")
+    # Uma página de calendário por mês; os diários são PDFs estáticos
+    rate_policy = HostPolicy(rate=4.0, max_rate=20.0, burst=4)
+
+    def __init__(self, base_dir="storage/raw/al_go", base_url="https://transparencia.al.go.leg.br"):
+        super().__init__(entity="ALGO", base_dir=base_dir)
 
-        self.page_url_template = "https://transparencia.al.go.leg.br/gestao-parlamentar/diario?ano={}&mes={}"
+        self.page_url_template = base_url + "/gestao-parlamentar/diario?ano={}&mes={}"
+        self._driver = None
 
-        chrome_options = Options()
-        if self.headless:
-            chrome_options.add_argument("--headless=new") 
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--no-sandbox")
-        
-        self.driver = webdriver.Chrome(options=chrome_options)
+    @property
+    def driver(self):
+        # O navegador só é iniciado se a listagem por HTTP falhar
+        if self._driver is None:
+            self._driver = browser_pool(headless=self.headless).acquire()
+        return self._driver
 
     def close(self):
-        self.driver.quit()
+        if self._driver is not None:
+            self._driver.quit()
+            self._driver = None
+        super().close()
 
     def download(self, start_date=None, end_date=None):
         if end_date is None:
@@ -36,27 +46,93 @@ class ALGOExtractor(ExtractorBase):
         if start_date is None:
             start_date = date(2007, 8, 1)
 
+        self.download_jobs(self._iter_jobs(start_date, end_date))
+
+    def _iter_jobs(self, start_date, end_date):
+        """Yields one DownloadJob per gazette listed in the monthly calendars."""
         current_date = start_date
         while current_date <= end_date:
             year = current_date.year
             month = current_date.month
             print(f"🔍 Processando {year}-{month:02d}")
-            links = self._get_pdf_links_for_month(year, month)
+            try:
+                links = self._get_pdf_links_for_month(year, month)
+            except Exception as e:
+                # Circuito aberto ou navegador esgotado: o mês fica pendente no checkpoint e a execução segue
+                print(f"❌ Falha ao listar {year}-{month:02d}: {e}")
+                self.checkpoint.completed(current_date, "erro")
+                links = {}
 
             for date_str, url in links.items():
-                self._download_single_url(date_str, url)
-                time.sleep(1)
+                job = self._build_job(date_str, url)
+                if job:
+                    yield job
 
             year = current_date.year + (current_date.month // 12)
             month = current_date.month % 12 + 1
             current_date = date(year, month, 1)
 
     def _get_pdf_links_for_month(self, year, month):
+        links = self._get_pdf_links_http(year, month)
+        if links is None:
+            links = self._get_pdf_links_browser(year, month)
+        return links
+
+    def _get_pdf_links_http(self, year, month):
+        """
+        Lists the month's gazettes from the calendar HTML or its FullCalendar events feed.
+
+        Returns:
+            dict | None: ISO date -> PDF URL, or ``None`` when the calendar could not be
+            read without a browser.
+        """
         url = self.page_url_template.format(year, month)
-        print(f"  - Carregando página: {url}")
-        self.driver.get(url)
+        try:
+            response = self.resilience.call(url, lambda: self.http_cache.get(self.session, url))
+            if response.status_code != 200:
+                return None
+
+            links = self._parse_pdf_links(response.text, response.url)
+            if links:
+                print(f"  - Encontrados {len(links)} links (HTTP)")
+                return links
+
+            feed = EVENTS_FEED_PATTERN.search(response.text)
+            if feed:
+                first_day = date(year, month, 1)
+                next_month = date(year + month // 12, month % 12 + 1, 1)
+                feed_url = urljoin(response.url, feed.group(1))
+                params = {"start": first_day.isoformat(), "end": next_month.isoformat()}
+                feed_response = self.resilience.call(
+                    feed_url, lambda: self.http_cache.get(self.session, feed_url, params=params)
+                )
+                if feed_response.status_code == 200:
+                    links = self._parse_pdf_links(feed_response.text, feed_response.url)
+                    print(f"  - Encontrados {len(links)} links (feed)")
+                    return links
+        except (requests.RequestException, CircuitOpenError) as e:
+            print(f"  - Listagem HTTP falhou ({e}), usando navegador")
+        return None
+
+    @staticmethod
+    def _parse_pdf_links(text, base_url):
+        links = {}
+        for match in PDF_LINK_PATTERN.finditer(text):
+            href = match.group(0).replace("\\/", "/")
+            links[match.group(1)] = urljoin(base_url, href)
+        return links
 
-        time.sleep(3)
+    def _get_pdf_links_browser(self, year, month):
+        url = self.page_url_template.format(year, month)
+        print(f"  - Carregando página: {url}")
+        self.resilience.call(url, lambda: self._load_page(url))
+        try:
+            # O calendário é montado por JavaScript depois do carregamento
+            WebDriverWait(self.driver, 5).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "a.fc-day-grid-event"))
+            )
+        except TimeoutException:
+            pass  # mês sem diários
 
         links = {}
 
@@ -73,40 +149,34 @@ class ALGOExtractor(ExtractorBase):
         print(f"  - Encontrados {len(links)} links")
         return links
 
-    def _download_single_url(self, date_str, url):
+    def _load_page(self, url):
+        with self.rate_limiter.request(url):
+            self.driver.get(url)
+
+    def _build_job(self, date_str, url):
         match = re.search(r"diario-alego-(\d{4}-\d{2}-\d{2})\.pdf", url)
+        if not match:
+            print(f"⚠️ [{date_str}] Link fora do padrão esperado: {url}")
+            return None
         date = match.group(1)
 
         filename = f"diario-alego-{date}.pdf"
         filepath = self.downloads_dir / filename
 
-        if filepath.exists():
+        if not self.revalidate and (self.manifest.has_date(self.entity, date) or filepath.exists()):
             print(f"⏭️ [{date}] Já existe, pulando.")
-            return True
+            return None
 
-        try:
-            response = requests.get(url, timeout=30)
-            if response.status_code == 200 and b"%PDF" in response.content[:10]:
-                with open(filepath, "wb") as f:
-                    f.write(response.content)
-
-                file_hash = hashlib.md5(response.content).hexdigest()
-                date = datetime.strptime(date, "%Y-%m-%d")
-                self._save_metadata(date, filename, url, filepath, file_hash)
-
-                print(f"✅ [{date_str}] Baixado com sucesso | Hash: {file_hash[:8]}")
-                return True
-            else:
-                print(f"⚠️ [{date_str}] Documento não encontrado ou inválido (HTTP {response.status_code})")
-                return False
-        except Exception as e:
-            print(f"❌ [{date_str}] Erro ao baixar: {e}")
-            return False
+        return DownloadJob(
+            url=url,
+            target=filepath,
+            metadata={"date": datetime.strptime(date, "%Y-%m-%d"), "unit": date, "label": date_str},
+        )
 
 if __name__ == "__main__":
     extractor = ALGOExtractor()
 
-    start_date = datetime.date(2007, 8, 1)
+    start_date = date(2007, 8, 1)
     end_date = datetime.now().date()
 
     print(f"🚀 Iniciando download de diários oficiais da AL-GO de {start_date} a {end_date}")
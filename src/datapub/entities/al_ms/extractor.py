@@ -1,31 +1,24 @@
-from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-import time
-import os
-import hashlib
 import json
-from pathlib import Path
 from datetime import datetime
-from pathlib import Path
-from datetime import datetime, timedelta
 
-class Extractor:
+from datapub.shared.utils.browser_pool import browser_pool
+from datapub.shared.utils.extractor_base import ExtractorBase, DownloadJob
+from datapub.shared.utils.probing import find_last
+from datapub.shared.utils.rate_limit import HostPolicy
+from datapub.shared.utils.resilience import NETWORK
+
+class ALMSExtractor(ExtractorBase):
+    # Cada busca é uma página inteira no navegador: começa devagar e sobe até 2 por segundo
+    rate_policy = HostPolicy(rate=1.0, max_rate=2.0, burst=1, target_latency=10.0)
+
     def __init__(self, base_dir="storage/raw/alms", headless=True):
-        self.base_dir = Path(base_dir)
-        self.downloads_dir = (self.base_dir / "downloads").resolve()
-        self.metadata_dir = self.base_dir / "metadata"
+        super().__init__(entity="ALMS", base_dir=base_dir, headless=headless)
+        self.base_url = "https://diariooficial.al.ms.gov.br/"
         self.logs_dir = self.base_dir / "logs"
-        
-        self.headless = headless
-        
-        # Cria os diretórios se não existirem
-        # self.downloads_dir.mkdir(parents=True, exist_ok=True)
-        os.makedirs(self.downloads_dir, exist_ok=True)
-        self.metadata_dir.mkdir(parents=True, exist_ok=True)
         self.logs_dir.mkdir(parents=True, exist_ok=True)
         
         # Configurações do navegador
@@ -33,32 +26,12 @@ class Extractor:
         
         # Configurações da busca
         self.start_number = 1  # Número inicial do diário
-        self.max_attempts = 2  # Tentativas por diário
-        self.delay_between = 1  # Delay entre requisições
-        self.max_consecutive_failures = 5  # Limite de falhas consecutivas
+        self.max_consecutive_failures = 2  # Números ausentes seguidos que encerram a busca
+        self._probes = {}  # número -> link do PDF (ou None) já consultados
     
     def _setup_driver(self):
-        """Configura o WebDriver do Chrome"""
-        chrome_options = webdriver.ChromeOptions()
-        
-        # Configurações de download
-        chrome_options.add_experimental_option("prefs", {
-            "download.default_directory": str(self.downloads_dir),
-            "download.prompt_for_download": False,
-            "plugins.always_open_pdf_externally": True,
-            "download.directory_upgrade": True,
-        })
-        
-        if self.headless:
-            chrome_options.add_argument("--headless=new")  # headless modo
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--no-sandbox")
-        
-        # Configura o serviço do Chrome
-        service = Service(ChromeDriverManager().install())
-        
-        # Inicia o navegador
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        """Obtém um Chrome do pool compartilhado; ele só é usado para a busca"""
+        self.driver = browser_pool(headless=self.headless).acquire()
         self.wait = WebDriverWait(self.driver, 15)
 
     def download(self, start_num=None, end_num=None):
@@ -69,200 +42,165 @@ class Extractor:
     def download_range(self, start_num=None, end_num=None):
         """Baixa diários em um intervalo numérico"""
         current_num = start_num or self.start_number
-        end_num = end_num or float('inf')
-        consecutive_failures = 0
-        
         self._log_start()
         
         try:
-            self.driver.get("https://diariooficial.al.ms.gov.br/")
-            
-            while current_num <= end_num:
-                num_str = str(current_num).zfill(4)
-                success = self._process_diario(num_str)
-                
-                if not success:
-                    consecutive_failures += 1
-                    if consecutive_failures >= self.max_consecutive_failures:
-                        print(f"🚧 {self.max_consecutive_failures} falhas consecutivas, encerrando...")
-                        break
-                else:
-                    consecutive_failures = 0
-                
-                current_num += 1
-                time.sleep(self.delay_between)
-        
+            self.driver.get(self.base_url)
+            self._sync_session()
+
+            held = self._held_editions()
+            if end_num is None:
+                end_num = self.find_latest_edition(known=max(max(held, default=0), current_num - 1))
+
+            pending = [
+                n for n in range(current_num, end_num + 1) if n not in held and not self.checkpoint.is_done(n)
+            ]
+            print(f"📋 {len(pending)} edições a baixar entre {current_num} e {end_num} ({len(held)} já no manifesto)")
+            self.download_jobs(self._iter_jobs(pending))
         finally:
             self._cleanup()
-    
-    def _process_diario(self, num_str):
-        """Processa um diário específico"""
-        for attempt in range(self.max_attempts):
-            try:
-                print(f"🔍 Tentando Diário nº {num_str} (tentativa {attempt + 1})")
-                
-                # Preenche e submete o formulário de busca
-                input_field = self.wait.until(EC.presence_of_element_located((By.ID, "pesquisa")))
-                input_field.clear()
-                input_field.send_keys(num_str)
-                
-                search_btn = self.driver.find_element(By.ID, "filtro")
-                search_btn.click()
 
-                # Aguarda a tabela de resultados atualizar
-                time.sleep(1)
+    def find_latest_edition(self, known=0):
+        """Descobre o último número publicado com busca exponencial seguida de binária"""
+        latest = find_last(self._probe_edition, known=known, confirm=self.max_consecutive_failures)
+        print(f"🔢 Última edição publicada: {latest} ({len(self._probes)} buscas)")
+        return latest
 
-                # Tenta localizar a tabela de resultados
-                try:
-                    tabela = self.driver.find_element(By.CSS_SELECTOR, "table.table")
-                    linhas = tabela.find_elements(By.TAG_NAME, "tr")
-
-                    if len(linhas) > 1:
-                        # Percorre todas as linhas a partir da segunda, tentando achar o link de download
-                        for linha in linhas[1:]:
-                            links = linha.find_elements(By.TAG_NAME, "a")
-                            if not links:
-                                continue  # pula se não tiver link
-
-                            link_download = links[-1]  # pega o último link (download)
-                            href = link_download.get_attribute("href")
-                            if href:
-                                print(f"📥 Baixando PDF: {href}")
-                                if self._download_pdf(num_str, href):
-                                    return True  # sucesso, retorna True
-                                else:
-                                    print(f"⚠️ Falha no download do PDF para o número {num_str}")
-                            else:
-                                print(f"⚠️ Link de download vazio para o número {num_str}")
-                        # Se não baixou nenhum, retorna False
-                        print(f"🚫 Nenhum PDF baixado para o número {num_str}")
-                        return False
-                    else:
-                        print(f"🚫 Diário nº {num_str} não encontrado.")
-                        return False
+    def _probe_edition(self, num):
+        if num not in self._probes:
+            try:
+                self._probes[num] = self._search(num)
+            except Exception as e:
+                # Na descoberta, uma busca que falhou conta como número ausente
+                print(f"⚠️ Busca do nº {num} falhou: {e}")
+                return False
+        return self._probes[num] is not None
 
+    def _held_editions(self):
+        return {int(n) for n in self.manifest.editions(self.entity) if n.isdigit()}
+    
+    def _iter_jobs(self, numbers):
+        """Busca cada número no navegador e produz o job de download do PDF encontrado"""
+        for num in numbers:
+            num_str = str(num).zfill(4)
+            if num in self._probes:
+                # Já buscado durante a descoberta da última edição
+                href = self._probes[num]
+            else:
+                try:
+                    href = self._search(num)
                 except Exception as e:
-                    print(f"❌ Nenhuma tabela encontrada para nº {num_str}: {str(e)}")
-                    return False
-                    
-            except Exception as e:
-                print(f"⚠️ Erro na tentativa {attempt + 1} para {num_str}: {str(e)}")
-                if attempt == self.max_attempts - 1:
+                    print(f"❌ Busca do Diário nº {num_str} falhou: {e}")
                     self._log_error(num_str, str(e))
-                time.sleep(1)
-        
-        return False
-    
-    def _download_pdf(self, num_str, pdf_url):
-        """Baixa e processa um PDF individual com tratamento robusto de erros"""
-        try:
-            print(f"⏳ Iniciando download do Diário {num_str}...")
+                    self.checkpoint.completed(num, "erro")
+                    continue
 
-            # Abre o PDF em nova aba
-            self.driver.execute_script("window.open(arguments[0], '_blank');", pdf_url)
-
-            # Aguarda o download com timeout
-            max_wait_time = 30  # segundos
-            start_time = time.time()
-            extracted = False
-            initial_files = set(self.downloads_dir.glob("*.pdf"))
-
-            while (time.time() - start_time) < max_wait_time:
-                current_files = set(f for f in self.downloads_dir.glob("*.pdf") if not f.name.endswith('.crdownload'))
-                new_files = current_files - initial_files
+            if href:
+                yield self._build_job(num_str, href)
+            else:
+                self.checkpoint.completed(num, "vazio")
+    
+    def _search(self, num):
+        """Busca um número respeitando o ritmo do portal; falhas passageiras são repetidas com backoff"""
+        num_str = str(num).zfill(4)
 
-                if new_files:
-                    # Assume o arquivo mais recente como o novo
-                    latest_file = max(new_files, key=lambda f: f.stat().st_mtime)
+        def attempt():
+            with self.rate_limiter.request(self.base_url):
+                return self._process_diario(num_str)
 
-                    # Verifica se o download está completo (tamanho estável por 2s)
-                    initial_size = latest_file.stat().st_size
-                    time.sleep(2)
-                    if latest_file.stat().st_size == initial_size:
-                        extracted = True
-                        break
-                time.sleep(1)
+        return self.resilience.call(self.base_url, attempt)
 
-            if not extracted:
-                print(f"❌ Timeout ao baixar Diário {num_str}")
-                self._log_error(num_str, "Timeout no download")
-                return False
-
-            # Verifica se é um PDF válido
-            try:
-                with latest_file.open('rb') as f:
-                    if not f.read(4).startswith(b'%PDF'):
-                        print(f"❌ Arquivo inválido para Diário {num_str}")
-                        latest_file.unlink(missing_ok=True)
-                        self._log_error(num_str, "Arquivo PDF inválido")
-                        return False
-            except Exception as e:
-                print(f"❌ Erro ao verificar PDF do Diário {num_str}: {str(e)}")
-                self._log_error(num_str, f"Erro de leitura do arquivo: {str(e)}")
-                return False
-
-            # Gera nome único para o arquivo
-            try:
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                new_filename = f"diario-alms-{num_str}_{timestamp}.pdf"
-                new_path = self.downloads_dir / new_filename
+    def _process_diario(self, num_str):
+        """Busca um diário específico e retorna o link do PDF, se houver"""
+        print(f"🔍 Buscando Diário nº {num_str}")
 
-                if new_path.exists():
-                    new_filename = f"diario-alms-{num_str}_{timestamp}_{hashlib.md5(str(time.time()).encode()).hexdigest()[:4]}.pdf"
-                    new_path = self.downloads_dir / new_filename
+        # Preenche e submete o formulário de busca
+        input_field = self.wait.until(EC.presence_of_element_located((By.ID, "pesquisa")))
+        input_field.clear()
+        input_field.send_keys(num_str)
 
-                latest_file.rename(new_path)
-            except Exception as e:
-                print(f"❌ Erro ao renomear arquivo do Diário {num_str}: {str(e)}")
-                self._log_error(num_str, f"Erro ao renomear arquivo: {str(e)}")
-                return False
+        # A tabela anterior sai do DOM quando a busca devolve os novos resultados
+        previous = self.driver.find_elements(By.CSS_SELECTOR, "table.table")
+        search_btn = self.driver.find_element(By.ID, "filtro")
+        search_btn.click()
 
-            # Salva metadados
+        # Espera a troca da tabela em vez de uma pausa fixa
+        if previous:
             try:
-                file_size = new_path.stat().st_size
-                if file_size == 0:
-                    print(f"❌ Arquivo vazio para Diário {num_str}")
-                    new_path.unlink(missing_ok=True)
-                    return False
-
-                self._save_metadata(num_str, pdf_url, new_path)
-                print(f"✅ Diário {num_str} baixado com sucesso ({file_size/1024:.2f} KB): {new_filename}")
-                return True
-
-            except Exception as e:
-                print(f"❌ Erro ao salvar metadados do Diário {num_str}: {str(e)}")
-                new_path.unlink(missing_ok=True)
-                return False
+                WebDriverWait(self.driver, 2, poll_frequency=0.1).until(EC.staleness_of(previous[0]))
+            except TimeoutException:
+                pass  # tabela atualizada no lugar
 
+        # Tenta localizar a tabela de resultados
+        try:
+            tabela = self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "table.table")))
+            linhas = tabela.find_elements(By.TAG_NAME, "tr")
         except Exception as e:
-            print(f"❌ Erro ao baixar Diário {num_str}: {str(e)}")
-            self._log_error(num_str, str(e))
-            return False
-  
-    def _save_metadata(self, num_str, url, filepath):
-        """Salva metadados do download"""
-        metadata = {
-            "orgao": "MS",
-            "numero_diario": num_str,
-            "url_origem": url,
-            "caminho_local": str(filepath),
-            "data_download": datetime.now().isoformat(),
-            "tamanho_bytes": os.path.getsize(filepath),
-            "hash_md5": self._calculate_hash(filepath),
-            "status": "sucesso"
-        }
-        
-        metadata_path = self.metadata_dir / f"metadata_{num_str}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(metadata_path, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
-    
-    def _calculate_hash(self, filepath):
-        """Calcula hash MD5 do arquivo"""
-        hash_md5 = hashlib.md5()
-        with open(filepath, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+            print(f"❌ Nenhuma tabela encontrada para nº {num_str}: {str(e)}")
+            return None
+
+        if len(linhas) <= 1:
+            print(f"🚫 Diário nº {num_str} não encontrado.")
+            return None
+
+        # Percorre as linhas a partir da segunda, procurando o link de download
+        for linha in linhas[1:]:
+            links = linha.find_elements(By.TAG_NAME, "a")
+            if not links:
+                continue  # pula se não tiver link
+
+            href = links[-1].get_attribute("href")  # o último link é o download
+            if href:
+                print(f"📥 PDF encontrado: {href}")
+                return href
+            print(f"⚠️ Link de download vazio para o número {num_str}")
+        print(f"🚫 Nenhum PDF encontrado para o número {num_str}")
+        return None
+
+    def _sync_session(self):
+        """Copia cookies e user-agent do navegador para a sessão HTTP"""
+        for cookie in self.driver.get_cookies():
+            self.session.cookies.set(
+                cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/")
+            )
+        self.session.headers["User-Agent"] = self.driver.execute_script("return navigator.userAgent")
+
+    def _build_job(self, num_str, pdf_url):
+        # Cookies podem ter sido renovados durante a busca
+        self._sync_session()
+        return DownloadJob(
+            url=pdf_url,
+            target=self.downloads_dir / f"diario-alms-{num_str}.pdf",
+            metadata={"numero": num_str, "unit": int(num_str), "label": f"Diário {num_str}"},
+            headers={"Referer": self.base_url},
+        )
+
+    def _rebuild_job(self, job):
+        # Recarrega cookies e user-agent do navegador para a nova rodada
+        return self._build_job(job.metadata["numero"], job.url)
+
+    def _on_download_complete(self, result):
+        job = result.job
+        num_str = job.metadata["numero"]
+
+        if result.ok and result.size > 0:
+            self._save_metadata(num_str, job.url, job.target, result.md5, sha256=result.sha256)
+            print(f"✅ Diário {num_str} baixado com sucesso ({result.size/1024:.2f} KB): {job.target.name}")
+            return
+
+        if result.ok:
+            job.target.unlink(missing_ok=True)
+            error = "Arquivo vazio"
+        elif result.status == "invalido":
+            error = f"Arquivo PDF inválido (HTTP {result.http_status})"
+        else:
+            error = result.error or result.status
+        print(f"❌ Falha ao baixar Diário {num_str}: {error}")
+        self._log_error(num_str, error)
+
+    def _save_metadata(self, num_str, url, filepath, file_hash, sha256=None):
+        """Registra o download no manifesto"""
+        self._record_download(filepath, url, file_hash, numero_edicao=num_str, sha256=sha256)
     
     def _log_start(self):
         """Registra início do processo"""
@@ -270,8 +208,8 @@ class Extractor:
             "inicio": datetime.now().isoformat(),
             "start_number": self.start_number,
             "config": {
-                "max_attempts": self.max_attempts,
-                "delay": self.delay_between,
+                "max_attempts": self.resilience.policies[NETWORK].attempts,
+                "max_rate": self.rate_policy.max_rate,
                 "max_consecutive_failures": self.max_consecutive_failures
             }
         }
@@ -294,28 +232,14 @@ class Extractor:
     
     def _cleanup(self):
         """Finaliza o navegador"""
-        if hasattr(self, 'driver'):
+        if getattr(self, 'driver', None):
             self.driver.quit()
+            self.driver = None
 
-    def get_recent_complete_pdfs(downloads_dir: Path, since: float = 60.0) -> set[Path]:
-        """Retorna arquivos PDF completos, excluindo temporários e antigos."""
-        now = datetime.now()
-        pdfs = set()
-
-        for file in downloads_dir.iterdir():
-            if not file.name.lower().endswith(".pdf"):
-                continue
-            if file.name.endswith(".crdownload") or file.name.startswith("~"):
-                continue  # arquivo ainda em download ou temporário
-            try:
-                mtime = datetime.fromtimestamp(file.stat().st_mtime)
-                if (now - mtime).total_seconds() <= since:
-                    pdfs.add(file)
-            except Exception:
-                continue  # em caso de falha ao acessar stats
-
-        return pdfs
+    def close(self):
+        self._cleanup()
+        super().close()
 
 if __name__ == "__main__":
-    extractor = Extractor()
+    extractor = ALMSExtractor()
     extractor.download_range()
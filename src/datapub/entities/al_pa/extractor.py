@@ -1,158 +1,179 @@
-import time
-import os
-import json
-import hashlib
-import random
 from pathlib import Path
-from datetime import datetime, timedelta, date
+from dataclasses import replace
+from datetime import datetime, date
 import re
-import dateparser
 import pdfplumber
 
-import requests
-from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
 import pyperclip
 from selenium.webdriver import ActionChains
 from selenium.webdriver.common.keys import Keys
-from datapub.shared.utils.extractor_base import ExtractorBase
+from datapub.shared.utils.browser_pool import browser_pool
+from datapub.shared.utils.extractor_base import ExtractorBase, DownloadJob
+from datapub.shared.utils.intervals import DateIntervalIndex
+from datapub.shared.utils.rate_limit import HostPolicy
+from datapub.entities.al_pa.header import read_date_range
+
+# diario-alpa-AAAA-MM-DD.pdf ou diario-alpa-INICIO_FIM.pdf
+COVERAGE_PATTERN = re.compile(r"diario-alpa-(\d{4}-\d{2}-\d{2})(?:_(\d{4}-\d{2}-\d{2}))?\.pdf$")
 
 class ALPAExtractor(ExtractorBase):
+    # Cada dia é uma consulta no navegador: começa devagar e sobe até 2 por segundo
+    rate_policy = HostPolicy(rate=1.0, max_rate=2.0, burst=1, target_latency=10.0)
+
     def __init__(self, base_dir="storage/raw/alpa", headless=True):
-        super().__init__(entity="ALPA", base_dir=base_dir)
+        super().__init__(entity="ALPA", base_dir=base_dir, headless=headless)
 
         self.base_url = "https://www.alepa.pa.gov.br/Comunicacao/Diarios"   
 
-        chrome_options = Options()
-        
-        if self.headless:
-            print("🚀 Headless mode enabled")
-            chrome_options.add_argument("--headless=new")  # headless modo
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--no-sandbox")
-        else:
-            print("🚀 Headless mode disabled")
-
-        chrome_options.add_argument("--log-level=3")
-        self.driver = webdriver.Chrome(options=chrome_options)
+        print(f"🚀 Headless mode {'enabled' if self.headless else 'disabled'}")
+        self.driver = browser_pool(headless=self.headless).acquire()
         self.wait = WebDriverWait(self.driver, 20)
 
-    def download(self, start_date, end_date):
-        self.download_range(start_date, end_date)
+        self.coverage = self._load_coverage()
+
+    def _load_coverage(self):
+        """Indexa uma única vez os dias cobertos pelos PDFs já baixados."""
+        coverage = DateIntervalIndex()
+        for f in self.downloads_dir.iterdir():
+            match = COVERAGE_PATTERN.match(f.name)
+            if not match:
+                continue
+            start_str, end_str = match.groups()
+            try:
+                start_date = date.fromisoformat(start_str)
+                end_date = date.fromisoformat(end_str) if end_str else start_date
+            except ValueError:
+                continue
+            coverage.add(start_date, end_date)
+        return coverage
+
+    def download(self, start_date, end_date, sweep=False):
+        self.download_range(start_date, end_date, sweep=sweep)
         print("✅ Download concluído")
 
-    def download_range(self, start_date, end_date):
-        current_date = start_date
-        while current_date <= end_date:
+    def download_range(self, start_date, end_date, sweep=False):
+        self.download_jobs(self._iter_jobs(self._plan_days(start_date, end_date, sweep=sweep)))
+
+    def _iter_jobs(self, days):
+        # Edições semanais aparecem em vários dias; cada URL vira um único job
+        seen_urls = set()
+        for current_date in days:
+            if self.checkpoint.is_done(current_date):
+                continue
             try:
-                self._download_single(current_date)
+                # Falhas do navegador ou da rede são repetidas com backoff antes de marcar o dia com erro
+                job = self.resilience.call(self.base_url, lambda: self._build_job(current_date))
+                if job and job.url not in seen_urls:
+                    seen_urls.add(job.url)
+                    yield job
+                else:
+                    # Sem diário, já coberto ou mesma edição de outro dia
+                    self.checkpoint.completed(current_date, "vazio" if job is None else "ok")
             except Exception as e:
                 print(f"⚠️ Erro ao processar {current_date.strftime('%d/%m/%Y')}: {e}")
-            current_date += timedelta(days=1)
-            time.sleep(random.uniform(0, 0.2))
-
-    def _download_single(self, day: datetime):
-        day_str = day.isoformat() 
+                self.checkpoint.completed(current_date, "erro")
 
-        for f in self.downloads_dir.iterdir():
-            name = f.name
-
-            if name == f"diario-alpa-{day_str}.pdf":
-                print(f"⏭️ Já existe (exato): {name}")
-                return
-
-            match = re.match(r"diario-alpa-(\d{4}-\d{2}-\d{2})_(\d{4}-\d{2}-\d{2})\.pdf", name)
-            if match:
-                start_str, end_str = match.groups()
-                try:
-                    start_date = datetime.fromisoformat(start_str).date()
-                    end_date = datetime.fromisoformat(end_str).date()
-                    if start_date <= day <= end_date:
-                        print(f"⏭️ Já existe (intervalo): {name}")
-                        return
-                except ValueError                   :
-                    continue 
+    def _build_job(self, day: datetime):
+        covered = self.coverage.find(day)
+        if covered:
+            print(f"⏭️ Já existe: {covered[0]} a {covered[1]}")
+            return
 
         print(f"📅 Buscando: {day.strftime('%d/%m/%Y')}")
-        self.driver.get(self.base_url)
-
-        sleep_time = random.uniform(0.1, 0.3)
-        time.sleep(sleep_time)
-
-        try:
-            date_str = day.strftime("%d/%m/%Y")
-
+        with self.rate_limiter.request(self.base_url):
+            self.driver.get(self.base_url)
             input_field = self.wait.until(EC.presence_of_element_located((By.ID, "dateEdit_I")))
-            input_field.clear()
-
-            calendar_button = self.driver.find_element(By.ID, "dateEdit_B-1")
-            calendar_button.click()
-
-            time.sleep(random.uniform(0.1, 0.3))
-
-            input_field.send_keys(date_str)
-
-            ActionChains(self.driver).send_keys(Keys.TAB).perform()
-
-            time.sleep(random.uniform(0.1, 0.3))
-
-            button = self.driver.find_elements(By.XPATH, "//button[contains(text(), 'Visualizar o arquivo')]")
-            if not button:
-                print(f"⚠️ Nenhum diário para {day.strftime('%d/%m/%Y')}")
-                return
 
-            button[0].click()
-            time.sleep(4)
+        date_str = day.strftime("%d/%m/%Y")
+        input_field.clear()
 
-            if len(self.driver.window_handles) < 2:
-                print(f"❌ PDF não abriu em nova aba para {day.strftime('%d/%m/%Y')}")
-                return
+        calendar_button = self.driver.find_element(By.ID, "dateEdit_B-1")
+        calendar_button.click()
 
-            self.driver.switch_to.window(self.driver.window_handles[-1])
-            pdf_url = self.driver.current_url
-            self.driver.close()
-            self.driver.switch_to.window(self.driver.window_handles[0])
+        input_field.send_keys(date_str)
 
-            self._download_pdf(pdf_url, day)
+        ActionChains(self.driver).send_keys(Keys.TAB).perform()
 
-        except Exception as e:
-            print(f"❌ Erro em {day.strftime('%d/%m/%Y')}: {e}")
-
-    def _download_pdf(self, url, day):
+        # Espera o botão aparecer em vez de uma pausa fixa; dias sem diário esgotam o prazo curto
+        button_xpath = "//button[contains(text(), 'Visualizar o arquivo')]"
+        try:
+            button = WebDriverWait(self.driver, 2, poll_frequency=0.1).until(
+                lambda driver: driver.find_elements(By.XPATH, button_xpath)
+            )
+        except TimeoutException:
+            print(f"⚠️ Nenhum diário para {day.strftime('%d/%m/%Y')}")
+            return
+
+        button[0].click()
+        try:
+            WebDriverWait(self.driver, 10, poll_frequency=0.2).until(EC.number_of_windows_to_be(2))
+        except TimeoutException:
+            raise RuntimeError(f"PDF não abriu em nova aba para {day.strftime('%d/%m/%Y')}")
+
+        self.driver.switch_to.window(self.driver.window_handles[-1])
+        pdf_url = self.driver.current_url
+        self.driver.close()
+        self.driver.switch_to.window(self.driver.window_handles[0])
+
+        return DownloadJob(
+            url=pdf_url,
+            target=self.downloads_dir / f"diario-alpa-{day.isoformat()}.pdf",
+            metadata={"date": day, "unit": day, "label": day.strftime('%d/%m/%Y')},
+        )
+
+    def _rebuild_job(self, job):
+        # O link do PDF sai do visualizador; busca o dia de novo no navegador
+        day = job.metadata["unit"]
+        rebuilt = self.resilience.call(self.base_url, lambda: self._build_job(day))
+        if rebuilt is None and not self.coverage.find(day):
+            raise RuntimeError(f"diário de {day.strftime('%d/%m/%Y')} não apareceu de novo")
+        return rebuilt
+
+    def _postprocess_download(self, result):
+        # Roda na thread da transferência: o pdfplumber não trava o laço de eventos
+        job = result.job
+        date_range = self._read_date_range(job.target)
+        if not (date_range and date_range[0] and date_range[1]):
+            return result
+
+        print(f"📋 Encontrado intervalo de datas: {date_range}")
+        # Renomeia com intervalo de datas
+        final_path = self.downloads_dir / f"diario-alpa-{date_range[0]}_{date_range[1]}.pdf"
+        job.target.rename(final_path)
+        # A entrada do cache_http ainda aponta para o nome temporário
+        self.http_cache.relocate(job.url, final_path)
+        metadata = {**job.metadata, "date_range": date_range}
+        return replace(result, job=replace(job, target=final_path, metadata=metadata))
+
+    def _on_download_complete(self, result):
+        if not result.ok:
+            return super()._on_download_complete(result)
+
+        job = result.job
+        day = job.metadata["date"]
+        date_range = job.metadata.get("date_range")
+        if date_range:
+            self.coverage.add(date.fromisoformat(date_range[0]), date.fromisoformat(date_range[1]))
+        self.coverage.add(day)
+        self._save_metadata(job.url, job.target, day, result.md5, sha256=result.sha256)
+        print(f"✅ Salvo: {job.target.name} | Hash: {result.md5[:8]}")
+
+    def _read_date_range(self, pdf_path):
+        """Período do cabeçalho: leitura rápida do topo da página, com o caminho antigo como reserva."""
         try:
-            response = requests.get(url, timeout=15)
-            if response.status_code == 200 and b"%PDF" in response.content[:10]:
-                temp_filename = f"diario-alpa-{day.isoformat()}.pdf"
-                temp_path = self.downloads_dir / temp_filename
-
-                with open(temp_path, "wb") as f:
-                    f.write(response.content)
-
-                path = temp_path  # Caminho final, pode ser alterado se houver range
-                text = self._extract_text_from_pdf(temp_path)
-
-                if text:
-                    date_range = self._extract_date_range(text)
-                    if date_range[0] and date_range[1]:
-                        print(f"📋 Encontrado intervalo de datas: {date_range}")
-                        # Renomeia com intervalo de datas
-                        final_filename = f"diario-alpa-{date_range[0]}_{date_range[1]}.pdf"
-                        final_path = self.downloads_dir / final_filename
-                        temp_path.rename(final_path)
-                        path = final_path  # Atualiza o caminho final
-
-                file_hash = hashlib.md5(response.content).hexdigest()
-                self._save_metadata(url, path, day, file_hash)
-                print(f"✅ Salvo: {path.name} | Hash: {file_hash[:8]}")
-
-            else:
-                print(f"⚠️ Conteúdo não é PDF válido: {url}")
+            date_range = read_date_range(pdf_path)
+            if date_range:
+                return date_range
+            text = self._extract_text_from_pdf(pdf_path)
+            return self._extract_date_range(text) if text else None
         except Exception as e:
-            print(f"❌ Falha ao baixar PDF: {e}")
-
+            # PDF que o pdfplumber não lê: fica com a data da consulta
+            print(f"⚠️ Não foi possível ler o período de {pdf_path.name}: {e}")
+            return None
 
     def _extract_text_from_pdf(self, pdf_path):
         full_text = ""
@@ -163,6 +184,9 @@ class ALPAExtractor(ExtractorBase):
         return full_text
 
     def _extract_date_range(self, text):
+        # Importado só aqui: o dateparser é lento para carregar
+        import dateparser
+
         patterns = [
             # 29 de Janeiro a 05 de Fevereiro de 2021
             r'(\d{1,2})\s*de\s*([a-zç]+)\s*a\s*(\d{1,2})\s*de\s*([a-zç]+)\s*de\s*(\d{4})',
@@ -194,29 +218,18 @@ class ALPAExtractor(ExtractorBase):
                 except:
                     continue
 
-        return results[0]
-
-    def _save_metadata(self, url, path, date, file_hash):
-        metadata = {
-            "orgao": "ALEPA",
-            "data_publicacao": date.isoformat(),
-            "url_origem": url,
-            "caminho_local": str(path),
-            "data_download": datetime.now().isoformat(),
-            "tamanho_bytes": os.path.getsize(path),
-            "hash_md5": file_hash,
-            "status": "sucesso"
-        }
-        
-        with open(self.metadata_dir / f"metadata_{date.isoformat()}.json", "w", encoding="utf-8") as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        return results[0] if results else None
+
+    def _save_metadata(self, url, path, date, file_hash, sha256=None):
+        self._record_download(path, url, file_hash, data_publicacao=date, sha256=sha256)
 
     def close(self):
         self.driver.quit()
+        super().close()
 
 
 if __name__ == "__main__":
-    extractor = Extractor()
+    extractor = ALPAExtractor()
     try:
         start = datetime(2021, 1, 1)
         end = datetime.today()
@@ -0,0 +1,92 @@
+"""
+Fast reader of the period printed in the header of ALEPA gazettes.
+
+Weekly issues print their period at the top of page 1 (e.g. "22 a 29 de Janeiro de
+2021"). Only that strip of the page is handed to pdfplumber, and the dates are read
+with precompiled patterns and a static month table, without dateparser.
+"""
+
+import re
+from datetime import date
+from typing import Optional, Tuple
+
+# Fração superior da primeira página onde fica o cabeçalho
+HEADER_FRACTION = 0.25
+
+MONTHS = {
+    "janeiro": 1,
+    "fevereiro": 2,
+    "março": 3,
+    "marco": 3,
+    "abril": 4,
+    "maio": 5,
+    "junho": 6,
+    "julho": 7,
+    "agosto": 8,
+    "setembro": 9,
+    "outubro": 10,
+    "novembro": 11,
+    "dezembro": 12,
+}
+
+_DAY = r"(\d{1,2})º?"
+_MONTH = r"([^\W\d_]+)"
+_YEAR = r"(\d{4})"
+
+# 29 de Dezembro de 2020 a 04 de Janeiro de 2021
+CROSS_YEAR_PATTERN = re.compile(
+    rf"{_DAY}\s*de\s*{_MONTH}\s*de\s*{_YEAR}\s*a\s*{_DAY}\s*de\s*{_MONTH}\s*de\s*{_YEAR}", re.IGNORECASE
+)
+# 29 de Janeiro a 05 de Fevereiro de 2021
+CROSS_MONTH_PATTERN = re.compile(
+    rf"{_DAY}\s*de\s*{_MONTH}\s*a\s*{_DAY}\s*de\s*{_MONTH}\s*de\s*{_YEAR}", re.IGNORECASE
+)
+# 22 a 29 de Janeiro de 2021
+SAME_MONTH_PATTERN = re.compile(rf"{_DAY}\s*a\s*{_DAY}\s*de\s*{_MONTH}\s*de\s*{_YEAR}", re.IGNORECASE)
+
+
+def _date(day, month, year) -> Optional[date]:
+    month_number = MONTHS.get(month.lower())
+    if month_number is None:
+        return None
+    try:
+        return date(int(year), month_number, int(day))
+    except ValueError:
+        return None
+
+
+def parse_date_range(text: str) -> Optional[Tuple[str, str]]:
+    """
+    Reads the first period found in ``text``.
+
+    Returns:
+        tuple[str, str] | None: Start and end as ISO dates, or ``None`` if no period
+        with valid dates was found.
+    """
+    for pattern in (CROSS_YEAR_PATTERN, CROSS_MONTH_PATTERN, SAME_MONTH_PATTERN):
+        for match in pattern.finditer(text):
+            groups = match.groups()
+            if pattern is CROSS_YEAR_PATTERN:
+                start, end = _date(*groups[0:3]), _date(*groups[3:6])
+            elif pattern is CROSS_MONTH_PATTERN:
+                start, end = _date(groups[0], groups[1], groups[4]), _date(groups[2], groups[3], groups[4])
+            else:
+                start, end = _date(groups[0], groups[2], groups[3]), _date(groups[1], groups[2], groups[3])
+            if start and end and start <= end:
+                return start.isoformat(), end.isoformat()
+    return None
+
+
+def header_text(pdf_path, fraction: float = HEADER_FRACTION) -> str:
+    """Text of the top ``fraction`` of the first page, without laying out the rest of it."""
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        page = pdf.pages[0]
+        header = page.crop((0, 0, page.width, page.height * fraction))
+        return header.extract_text() or ""
+
+
+def read_date_range(pdf_path) -> Optional[Tuple[str, str]]:
+    """Period printed in the header of the gazette at ``pdf_path``, if any."""
+    return parse_date_range(header_text(pdf_path))
@@ -0,0 +1,119 @@
+"""
+Extractor discovery and default run parameters for each entity.
+"""
+
+import importlib
+import importlib.util
+from datetime import datetime, date
+
+from datapub.shared.contracts.extractor_contract import ExtractorContract
+
+EXTRACTORS_PACKAGE = "datapub.entities"
+
+# Tipo de intervalo aceito por cada extrator e o ponto de partida padrão
+ENTITY_DEFAULTS = {
+    "al_go": {"label": "ALE-GO", "kind": "date", "start": date(2007, 8, 1)},
+    "al_ms": {"label": "ALE-MS", "kind": "number", "start": 1844},
+    "al_pa": {"label": "ALE-PA", "kind": "date", "start": date(2021, 1, 1)},
+    "al_ce": {"label": "ALE-CE", "kind": "date", "start": date(2025, 5, 26)},
+    "al_ac": {"label": "ALE-AC", "kind": "date", "start": date(2015, 1, 1)},
+}
+
+
+def parse_date(date_str):
+    """Parses a date string in YYYY-MM-DD format into a date object."""
+    return datetime.strptime(date_str, "%Y-%m-%d").date()
+
+
+def is_implemented(entity: str) -> bool:
+    """Tells whether ``datapub.entities.<entity>.extractor`` exists."""
+    try:
+        return importlib.util.find_spec(f"{EXTRACTORS_PACKAGE}.{entity}.extractor") is not None
+    except ModuleNotFoundError:
+        return False
+
+
+def load_extractor(entity: str) -> ExtractorContract:
+    """
+    Dynamically loads and returns the Extractor class instance for a given entity.
+
+    Args:
+        entity (str): Name of the entity folder (e.g., 'al_go').
+
+    Returns:
+        ExtractorContract: An instance of the extractor class.
+
+    Raises:
+        ValueError: If the extractor module or class cannot be found.
+        TypeError: If the loaded class does not inherit from ExtractorContract.
+    """
+    class_name = entity.upper().replace("_", "") + "Extractor"
+
+    try:
+        module = importlib.import_module(f"{EXTRACTORS_PACKAGE}.{entity}.extractor")
+    except ModuleNotFoundError as e:
+        raise ValueError(f"Extractor module not found for entity '{entity}'") from e
+
+    if not hasattr(module, class_name):
+        raise AttributeError(f"The module '{entity}.extractor' must contain a class named '{class_name}'")
+
+    extractor_cls = getattr(module, class_name)
+
+    if not issubclass(extractor_cls, ExtractorContract):
+        raise TypeError(f"Extractor class in '{entity}' must inherit from ExtractorContract")
+
+    return extractor_cls()
+
+
+def build_params(entity: str, start=None, end=None) -> dict:
+    """
+    Builds the keyword arguments of ``download`` for an entity from optional CLI bounds.
+
+    Args:
+        entity (str): Name of the entity folder (e.g., 'al_go').
+        start (str): First date (YYYY-MM-DD) or edition number; defaults per entity.
+        end (str): Last date or edition number; defaults to today or the last edition.
+
+    Returns:
+        dict: Parameters for the extractor's ``download`` method.
+    """
+    defaults = ENTITY_DEFAULTS.get(entity)
+    if defaults is None:
+        return {}
+
+    label = defaults["label"]
+    if defaults["kind"] == "number":
+        params = {
+            "start_num": int(start) if start else defaults["start"],
+            "end_num": int(end) if end else None,
+        }
+        last = params["end_num"] or "last available"
+        print(f"🚀 Starting {label} download from number {params['start_num']} to {last}")
+    else:
+        params = {
+            "start_date": parse_date(start) if start else defaults["start"],
+            "end_date": parse_date(end) if end else date.today(),
+        }
+        print(f"🚀 Starting {label} download from {params['start_date']} to {params['end_date']}")
+
+    return params
+
+
+def run_download(extractor, params: dict, incremental=False):
+    """Runs an extractor through its checkpointed ``sync`` when it has one, else ``download``."""
+    sync = getattr(extractor, "sync", None)
+    if callable(sync):
+        sync(params, incremental=incremental)
+    elif incremental:
+        raise ValueError(f"{type(extractor).__name__} não suporta o modo incremental")
+    else:
+        extractor.download(**params)
+
+
+def close_extractor(extractor):
+    """Releases browsers and other resources held by an extractor, if it has any."""
+    for name in ("close", "_cleanup"):
+        method = getattr(extractor, name, None)
+        if callable(method):
+            method()
+            return
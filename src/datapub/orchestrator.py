@@ -0,0 +1,144 @@
+"""
+Runs every implemented extractor listed in ``sources.json`` on a process pool.
+
+Each entity runs in its own worker process, so a crashed browser, a leaked
+driver or an exception in one portal cannot affect the others. The output of
+each run goes to its own log file and the caller gets one result per entity.
+"""
+
+import sys
+import json
+import time
+import traceback
+import multiprocessing
+from pathlib import Path
+from datetime import datetime
+from dataclasses import dataclass
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from datapub.factory import build_params, close_extractor, is_implemented, load_extractor, run_download
+
+SOURCES_FILE = Path("sources.json")
+LOGS_DIR = Path("storage/logs")
+
+
+@dataclass
+class EntityRunResult:
+    entity: str
+    status: str  # 'sucesso' ou 'erro'
+    elapsed: float
+    log_path: str
+    error: str = None
+
+
+def load_sources(path=SOURCES_FILE) -> list:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def implemented_entities(path=SOURCES_FILE) -> list:
+    """Siglas of ``sources.json`` that have an extractor in ``datapub.entities``."""
+    return [source["sigla"] for source in load_sources(path) if is_implemented(source["sigla"])]
+
+
+def run_entity(
+    entity: str, start=None, end=None, logs_dir=LOGS_DIR, incremental=False, revalidate=False
+) -> EntityRunResult:
+    """Runs one extractor to completion, capturing its output in a per-entity log file."""
+    logs_dir = Path(logs_dir)
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    log_path = logs_dir / f"{entity}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+
+    started = time.monotonic()
+    with open(log_path, "w", encoding="utf-8", buffering=1) as log:
+        with redirect_stdout(log), redirect_stderr(log):
+            extractor = None
+            try:
+                extractor = load_extractor(entity)
+                extractor.revalidate = revalidate
+                run_download(extractor, build_params(entity, start, end), incremental=incremental)
+                status, error = "sucesso", None
+            except Exception as e:
+                traceback.print_exc()
+                status, error = "erro", str(e)
+            finally:
+                if extractor is not None:
+                    try:
+                        close_extractor(extractor)
+                    except Exception:
+                        pass
+
+    return EntityRunResult(entity, status, time.monotonic() - started, str(log_path), error)
+
+
+def _init_worker(browser_budget):
+    if browser_budget is not None:
+        # Importado aqui para que entidades sem Selenium não dependam dele
+        from datapub.shared.utils.browser_pool import set_browser_budget
+        set_browser_budget(browser_budget)
+
+
+def run_all(
+    entities,
+    workers: int = 2,
+    start=None,
+    end=None,
+    logs_dir=LOGS_DIR,
+    browsers: int = None,
+    incremental=False,
+    revalidate=False,
+) -> list:
+    """
+    Runs several extractors in parallel, one process per entity.
+
+    Args:
+        entities (list[str]): Siglas to run (e.g., ['al_go', 'al_pa']).
+        workers (int): Number of worker processes.
+        start (str): Optional lower bound forwarded to every extractor.
+        end (str): Optional upper bound forwarded to every extractor.
+        browsers (int): Maximum number of Chrome instances alive across all workers.
+        incremental (bool): Each extractor only fetches what its previous runs have not covered.
+        revalidate (bool): Re-checks files already on disk with conditional requests.
+
+    Returns:
+        list[EntityRunResult]: One result per entity, in completion order.
+    """
+    # spawn: cada worker começa limpo, sem drivers ou conexões herdados do pai
+    context = multiprocessing.get_context("spawn")
+    budget = context.BoundedSemaphore(browsers) if browsers else None
+    options = {
+        "max_workers": max(1, workers),
+        "mp_context": context,
+        "initializer": _init_worker,
+        "initargs": (budget,),
+    }
+    if sys.version_info[:2] >= (3, 11):
+        # Um processo novo por entidade: nada vaza de um portal para o outro
+        options["max_tasks_per_child"] = 1
+
+    results = []
+    with ProcessPoolExecutor(**options) as pool:
+        futures = {pool.submit(run_entity, entity, start, end, logs_dir, incremental, revalidate): entity for entity in entities}
+        for future in as_completed(futures):
+            entity = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # O processo morreu (ex.: falta de memória) antes de devolver um resultado
+                result = EntityRunResult(entity, "erro", 0.0, "", f"worker encerrado: {e}")
+            icon = "✅" if result.status == "sucesso" else "❌"
+            print(f"{icon} {entity}: {result.status} em {result.elapsed:.1f}s | log: {result.log_path}")
+            results.append(result)
+
+    return results
+
+
+def print_report(results):
+    """Prints a per-entity summary table of a run."""
+    print("\n📊 Resumo da execução")
+    for result in sorted(results, key=lambda r: r.entity):
+        line = f"  {result.entity:<10} {result.status:<8} {result.elapsed:>8.1f}s"
+        if result.error:
+            line += f"  {result.error}"
+        print(line)
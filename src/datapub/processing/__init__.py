@@ -0,0 +1,6 @@
+"""
+Processing stages that turn the raw documents of ``storage/raw`` into derived data.
+
+Every stage works on distinct contents (SHA-256 of the manifest), so a document
+fetched by several entities, or several times, is processed only once.
+"""
@@ -0,0 +1,133 @@
+"""
+Extracts the amounts in reais of the processed text into ``gastos`` (stage ``gastos``).
+
+One compiled regex finds every ``R$ 1.234.567,89`` of a document in a single
+pass; the matches are then normalized as numpy arrays: digits are joined and
+converted to integer cents (exact for ``NUMERIC(15,2)``), and the category comes
+from vectorized keyword searches over the lowercased contexts.
+"""
+
+import re
+from functools import partial
+from typing import List, NamedTuple
+
+import numpy as np
+
+from datapub.processing.stage import run_stage
+from datapub.processing.text import TextStore
+from datapub.shared.utils.database import copy_rows, pooled_connection
+
+STAGE = "gastos"
+CONTEXT_CHARS = 120
+AMOUNT_COLUMNS = ("documento_id", "orgao", "valor", "descricao", "data", "categoria")
+
+AMOUNT_PATTERN = re.compile(r"R\$\s*(\d{1,3}(?:\.\d{3})+|\d+),(\d{2})\b")
+
+# Palavra-chave no contexto -> categoria; a primeira que aparecer vence
+CATEGORIES = (
+    ("licita", "licitacao"),
+    ("aditivo", "aditivo"),
+    ("contrat", "contrato"),
+    ("convênio", "convenio"),
+    ("diária", "diarias"),
+    ("diarias", "diarias"),
+    ("suprimento de fundos", "suprimento"),
+    ("remunera", "pessoal"),
+    ("subsídio", "pessoal"),
+    ("vencimento", "pessoal"),
+    ("empenho", "empenho"),
+    ("pagamento", "pagamento"),
+)
+DEFAULT_CATEGORY = "outros"
+
+
+class Amounts(NamedTuple):
+    valores: np.ndarray  # centavos (int64)
+    descricoes: List[str]
+    categorias: np.ndarray
+
+
+def parse_amounts(integers, cents) -> np.ndarray:
+    """Integer cents of amounts given as ``"1.234.567"`` and ``"89"`` string arrays."""
+    integers = np.char.replace(np.asarray(integers, dtype=str), ".", "")
+    return integers.astype(np.int64) * 100 + np.asarray(cents, dtype=str).astype(np.int64)
+
+
+def format_cents(values: np.ndarray) -> np.ndarray:
+    """Formats integer cents as ``"1234567.89"`` strings, exact for NUMERIC columns."""
+    values = np.asarray(values, dtype=np.int64)
+    whole = (values // 100).astype(str)
+    fraction = np.char.zfill((values % 100).astype(str), 2)
+    return np.char.add(np.char.add(whole, "."), fraction)
+
+
+def categorize(contexts) -> np.ndarray:
+    lowered = np.char.lower(np.asarray(contexts, dtype=str))
+    conditions = [np.char.find(lowered, keyword) >= 0 for keyword, _ in CATEGORIES]
+    return np.select(conditions, [category for _, category in CATEGORIES], default=DEFAULT_CATEGORY)
+
+
+def extract_amounts(text: str) -> Amounts:
+    matches = list(AMOUNT_PATTERN.finditer(text))
+    if not matches:
+        return Amounts(np.empty(0, dtype=np.int64), [], np.empty(0, dtype=str))
+
+    spans = np.array([m.span() for m in matches])
+    groups = np.array([m.groups() for m in matches])
+    # O contexto começa no máximo onde terminou o valor anterior
+    previous_ends = np.concatenate(([0], spans[:-1, 1]))
+    starts = np.maximum(spans[:, 0] - CONTEXT_CHARS, previous_ends)
+    contexts = [" ".join(text[s:e].split()) for s, e in zip(starts.tolist(), spans[:, 1].tolist())]
+    return Amounts(parse_amounts(groups[:, 0], groups[:, 1]), contexts, categorize(contexts))
+
+
+def amounts_document(text_root, sha256: str) -> Amounts:
+    """Worker task: extracts the amounts of one content."""
+    return extract_amounts(TextStore(text_root).read(sha256))
+
+
+def write_amounts(pool, batch) -> List[str]:
+    """Replaces the amounts of each document of the batch with one COPY; returns the hashes written."""
+    with pooled_connection(pool) as conn, conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT hash_arquivo, id, orgao, data_publicacao FROM documentos WHERE hash_arquivo = ANY(%s)",
+            ([sha256 for sha256, _ in batch],),
+        )
+        documents = {row[0]: row[1:] for row in cursor.fetchall()}
+        cursor.execute(
+            "DELETE FROM gastos WHERE documento_id = ANY(%s)", ([doc_id for doc_id, _, _ in documents.values()],)
+        )
+
+        def rows():
+            for sha256, amounts in batch:
+                if sha256 not in documents:
+                    continue
+                doc_id, orgao, published = documents[sha256]
+                valores = format_cents(amounts.valores).tolist()
+                for valor, descricao, categoria in zip(valores, amounts.descricoes, amounts.categorias.tolist()):
+                    yield doc_id, orgao, valor, descricao, published, categoria
+
+        copy_rows(cursor, "gastos", AMOUNT_COLUMNS, rows())
+    if len(documents) < len(batch):
+        print(f"⚠️ {len(batch) - len(documents)} documentos ainda não estão no banco (rode load-db)")
+    return list(documents)
+
+
+def extract_spending(manifest, pool, text_root, workers=None, batch_size=50, entity=None, full=False) -> int:
+    """
+    Extracts the amounts of every processed content not yet scanned into ``gastos``.
+
+    Returns:
+        int: Number of documents scanned.
+    """
+    return run_stage(
+        manifest,
+        STAGE,
+        TextStore(text_root),
+        partial(amounts_document, str(text_root)),
+        partial(write_amounts, pool),
+        workers=workers,
+        batch_size=batch_size,
+        entity=entity,
+        full=full,
+    )
@@ -0,0 +1,242 @@
+"""
+Document embeddings for ``document_embeddings`` (stage ``embeddings:<model>``).
+
+The stored text is split into overlapping chunks, the chunks are encoded in large
+batches by a local model on the CPU, and the chunk vectors are mean-pooled
+(weighted by chunk length) into one normalized vector per document. Vectors are
+cached on disk by content hash and model, so a ``--full`` rerun or the same
+content published twice never goes through the model again. Progress is recorded
+per model, so switching models embeds every document again without ``--full``.
+"""
+
+import re
+import os
+import hashlib
+from pathlib import Path
+from functools import partial
+from typing import List, Optional
+
+import numpy as np
+
+from datapub.processing.stage import run_stage
+from datapub.processing.text import PROCESSED_ROOT, TextStore
+from datapub.shared.utils.database import copy_upsert, document_ids, pooled_connection
+
+STAGE = "embeddings"
+DIMENSIONS = 768
+CHUNK_CHARS = 1500
+CHUNK_OVERLAP = 200
+ENCODE_BATCH = 64
+HASHING_MODEL = "hashing"
+DEFAULT_MODEL = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
+
+_TOKEN = re.compile(r"\w+")
+
+
+def chunk_text(text: str, size: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Splits ``text`` into chunks of about ``size`` characters, cut at whitespace and overlapping by ``overlap``."""
+    text = " ".join(text.split())
+    chunks, start = [], 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            # Corta no último espaço para não partir palavras
+            cut = text.rfind(" ", start + overlap + 1, end)
+            end = cut if cut > 0 else end
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+        if text[start - 1] != " ":
+            # Recomeça no início da próxima palavra
+            space = text.find(" ", start, end)
+            start = space + 1 if space >= 0 else start
+    return chunks
+
+
+def pool_vectors(vectors: np.ndarray, weights) -> np.ndarray:
+    """Weighted mean of the chunk vectors, L2-normalized."""
+    pooled = np.average(vectors, axis=0, weights=np.asarray(weights, dtype=np.float32))
+    norm = np.linalg.norm(pooled)
+    return (pooled / norm if norm else pooled).astype(np.float32)
+
+
+class HashingEmbedder:
+    """
+    Deterministic stand-in model: hashes tokens into a fixed number of buckets.
+
+    Needs no download and gives the same vector for the same text on any machine,
+    which is what tests and dry runs of the stage need.
+    """
+
+    name = HASHING_MODEL
+
+    def __init__(self, dimensions: int = DIMENSIONS):
+        self.dimensions = dimensions
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in _TOKEN.findall(text.lower()):
+                digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+                vectors[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class TransformerEmbedder:
+    """
+    Local Hugging Face model run on the CPU, mean-pooled over its tokens.
+
+    Args:
+        name (str): Model name or path; must produce ``DIMENSIONS``-wide vectors.
+        batch_size (int): Chunks per forward pass.
+        threads (int): Torch threads of this process.
+    """
+
+    def __init__(self, name: str = DEFAULT_MODEL, batch_size: int = ENCODE_BATCH, threads: Optional[int] = None):
+        # Importados só quando um modelo real é pedido: torch leva segundos para carregar
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.torch = torch
+        self.name = name
+        self.batch_size = batch_size
+        self.tokenizer = AutoTokenizer.from_pretrained(name)
+        self.model = AutoModel.from_pretrained(name).eval()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = []
+        with self.torch.inference_mode():
+            for i in range(0, len(texts), self.batch_size):
+                inputs = self.tokenizer(
+                    texts[i:i + self.batch_size], padding=True, truncation=True, max_length=512, return_tensors="pt"
+                )
+                hidden = self.model(**inputs).last_hidden_state
+                mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+                vectors.append(self.torch.nn.functional.normalize(pooled, dim=1).numpy())
+        return np.concatenate(vectors).astype(np.float32)
+
+
+def load_embedder(model: str = DEFAULT_MODEL, threads: Optional[int] = None):
+    """``"hashing"`` gives the stand-in model; anything else is loaded with transformers."""
+    if model == HASHING_MODEL:
+        return HashingEmbedder()
+    return TransformerEmbedder(model, threads=threads)
+
+
+def stage_name(model: str = DEFAULT_MODEL) -> str:
+    """Manifest stage of the vectors of ``model``."""
+    return f"{STAGE}:{model}"
+
+
+class EmbeddingCache:
+    """
+    Document vectors on disk, at ``<root>/embeddings/<model>/<2 hex>/<sha256>.npy``.
+
+    Args:
+        root (Path): Processed storage root.
+        model (str): Model name; each model gets its own folder.
+    """
+
+    def __init__(self, root=PROCESSED_ROOT, model: str = HASHING_MODEL):
+        self.root = Path(root) / "embeddings" / re.sub(r"[^\w.-]+", "_", model)
+
+    def path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / f"{sha256}.npy"
+
+    def get(self, sha256: str) -> Optional[np.ndarray]:
+        path = self.path(sha256)
+        return np.load(path) if path.exists() else None
+
+    def put(self, sha256: str, vector: np.ndarray):
+        path = self.path(sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{sha256}.{os.getpid()}.tmp.npy")
+        np.save(tmp, vector)
+        tmp.replace(path)
+
+
+_embedder = None
+
+
+def init_worker(model=DEFAULT_MODEL, threads=None):
+    global _embedder
+    _embedder = load_embedder(model, threads)
+
+
+def embed_document(text_root, sha256: str) -> np.ndarray:
+    """Worker task: the pooled vector of one content, from the cache when possible."""
+    global _embedder
+    if _embedder is None:
+        _embedder = load_embedder()
+    cache = EmbeddingCache(text_root, _embedder.name)
+    vector = cache.get(sha256)
+    if vector is not None:
+        return vector
+
+    chunks = chunk_text(TextStore(text_root).read(sha256)) or [""]
+    vector = pool_vectors(_embedder.encode(chunks), [max(len(c), 1) for c in chunks])
+    cache.put(sha256, vector)
+    return vector
+
+
+def vector_literal(vector: np.ndarray) -> str:
+    """Text form accepted by pgvector (``[0.1,0.2,...]``)."""
+    return "[" + ",".join(f"{v:.7g}" for v in vector.tolist()) + "]"
+
+
+def write_embeddings(pool, batch) -> List[str]:
+    """Upserts the vectors of the batch with one COPY; returns the hashes written."""
+    with pooled_connection(pool) as conn:
+        with conn.cursor() as cursor:
+            ids = document_ids(cursor, [sha256 for sha256, _ in batch])
+        rows = ((ids[sha256], vector_literal(vector)) for sha256, vector in batch if sha256 in ids)
+        copy_upsert(conn, "document_embeddings", ("document_id", "embedding"), rows, key=("document_id",))
+    if len(ids) < len(batch):
+        print(f"⚠️ {len(batch) - len(ids)} documentos ainda não estão no banco (rode load-db)")
+    return list(ids)
+
+
+def embed_documents(
+    manifest, pool, text_root, workers=None, batch_size=50, model=DEFAULT_MODEL, entity=None, full=False
+) -> int:
+    """
+    Embeds every processed content not yet embedded into ``document_embeddings``.
+
+    A real model is already multi-threaded, so it runs on a single worker by default
+    with every core; the stand-in model gets one worker per core.
+
+    Args:
+        manifest (Manifest): Manifest of the raw storage root.
+        pool (ThreadedConnectionPool): Postgres connections.
+        text_root (Path): Processed storage root; the vector cache lives there too.
+        workers (int): Worker processes.
+        batch_size (int): Documents per COPY.
+        model (str): Local model name or path; ``"hashing"`` uses the stand-in.
+        entity (str): Restricts the run to one entity.
+        full (bool): Embeds every content again (cached vectors are reused).
+
+    Returns:
+        int: Number of documents embedded.
+    """
+    real_model = model != HASHING_MODEL
+    cores = os.cpu_count() or 1
+    workers = workers or (1 if real_model else cores)
+    return run_stage(
+        manifest,
+        stage_name(model),
+        TextStore(text_root),
+        partial(embed_document, str(text_root)),
+        partial(write_embeddings, pool),
+        workers=workers,
+        batch_size=batch_size,
+        initializer=init_worker,
+        initargs=(model, max(1, cores // workers) if real_model else None),
+        entity=entity,
+        full=full,
+    )
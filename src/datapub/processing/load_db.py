@@ -0,0 +1,89 @@
+"""
+Bulk load of the manifest catalog into the ``documentos`` table of Postgres.
+
+Records are sent in batches with COPY into a staging table and a single upsert on
+``hash_arquivo`` per batch, spread over a small connection pool. Each committed
+batch is recorded in the manifest (stage ``load-db``), so an interrupted load
+resumes after the last batch and a rerun only sends new or changed contents.
+"""
+
+from datetime import date
+from itertools import islice
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, List
+
+from datapub.shared.utils.database import copy_upsert, pooled_connection
+from datapub.shared.utils.metrics import metrics
+
+STAGE = "load-db"
+BATCH_SIZE = 5000
+DOCUMENT_COLUMNS = ("orgao", "data_publicacao", "caminho_arquivo", "hash_arquivo", "metadata")
+
+# Colunas do manifesto que viram o JSON de metadados do documento
+_METADATA_KEYS = ("numero_edicao", "url_origem", "tamanho_bytes", "hash_md5", "data_download")
+
+
+def document_row(record: dict) -> tuple:
+    """Maps a manifest record to a ``documentos`` row."""
+    metadata = {k: record[k] for k in _METADATA_KEYS if record.get(k) is not None}
+    metadata.update(record.get("extra") or {})
+
+    published = record.get("data_publicacao")
+    if not published:
+        # Diários numerados (ex.: ALMS) não têm data no manifesto; usa a do download
+        published = (record.get("data_download") or date.today().isoformat())[:10]
+        metadata["data_publicacao_estimada"] = True
+
+    return record["entity"], published[:10], record["caminho_local"], record["hash_sha256"], metadata
+
+
+def _batches(records: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def load_documents(manifest, pool, workers: int = 2, batch_size: int = BATCH_SIZE, entity=None, full=False) -> int:
+    """
+    Upserts every distinct manifest content not yet loaded into ``documentos``.
+
+    Args:
+        manifest (Manifest): Manifest of the raw storage root.
+        pool (ThreadedConnectionPool): Postgres connections; one batch in flight per worker.
+        workers (int): Batches loaded concurrently.
+        batch_size (int): Records per COPY.
+        entity (str): Restricts the load to one entity.
+        full (bool): Forgets the progress of previous loads and sends everything again.
+
+    Returns:
+        int: Number of documents loaded.
+    """
+    if full:
+        manifest.reset_stage(STAGE)
+
+    def load(batch):
+        with metrics.span(STAGE, entity), pooled_connection(pool) as conn:
+            copy_upsert(conn, "documentos", DOCUMENT_COLUMNS, map(document_row, batch), key=("hash_arquivo",))
+        # Só depois do commit: uma interrupção no meio do lote o reenvia na próxima execução
+        manifest.mark_done(STAGE, (r["hash_sha256"] for r in batch))
+        metrics.count("documentos", len(batch), entity=entity, stage=STAGE, status="sucesso")
+        return len(batch)
+
+    loaded = 0
+    batches = _batches(manifest.pending_contents(STAGE, entity), batch_size)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        in_flight = set()
+        for batch in batches:
+            in_flight.add(executor.submit(load, batch))
+            if len(in_flight) >= workers:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    loaded += future.result()
+                    print(f"🗄️ {loaded} documentos carregados")
+        for future in in_flight:
+            loaded += future.result()
+
+    return loaded
@@ -0,0 +1,209 @@
+"""
+Tags PESSOA, ORGAO and LOCAL mentions in the extracted text (stage ``entidades``).
+
+Mentions come from three sources, all compiled once per worker: a gazetteer of
+known names (built in, plus an optional JSON file), regex rules anchored on the
+formulas of official acts ("nomear FULANO DE TAL", "Secretaria de Estado de ..."),
+and, when a local spaCy model is given, its PER/ORG/LOC entities. Offsets are
+character positions in the document text stored by :class:`TextStore`.
+"""
+
+import re
+import bisect
+import json
+from functools import partial
+from typing import List, NamedTuple, Optional
+
+from datapub.processing.stage import run_stage
+from datapub.processing.text import PAGE_SEPARATOR, TextStore
+from datapub.shared.utils.database import copy_rows, document_ids, pooled_connection
+
+STAGE = "entidades"
+CONTEXT_CHARS = 60
+ENTITY_COLUMNS = ("documento_id", "tipo_entidade", "valor", "contexto", "inicio_pos", "fim_pos")
+MODEL_LABELS = {"PER": "PESSOA", "ORG": "ORGAO", "LOC": "LOCAL"}
+
+_UPPER = "A-ZÁÉÍÓÚÂÊÔÃÕÇ"
+_LOWER = "a-záéíóúâêôãõçü"
+_WORD = rf"(?:[{_UPPER}][{_LOWER}]+|[{_UPPER}]{{2,}})"
+_LINK = r"(?:\s+(?:de|da|do|das|dos|e|DE|DA|DO|DAS|DOS|E))?"
+_NAME = rf"{_WORD}(?:{_LINK}\s+{_WORD}){{1,6}}"
+
+GAZETTEER = {
+    "ORGAO": (
+        "Assembleia Legislativa", "Mesa Diretora", "Tribunal de Contas do Estado", "Tribunal de Justiça",
+        "Ministério Público", "Defensoria Pública", "Procuradoria-Geral do Estado", "Controladoria-Geral do Estado",
+        "Polícia Militar", "Polícia Civil", "Corpo de Bombeiros Militar", "Casa Civil", "Governo do Estado",
+    ),
+    "LOCAL": (
+        "Acre", "Alagoas", "Amapá", "Amazonas", "Bahia", "Ceará", "Distrito Federal", "Espírito Santo", "Goiás",
+        "Maranhão", "Mato Grosso do Sul", "Mato Grosso", "Minas Gerais", "Pará", "Paraíba", "Paraná",
+        "Pernambuco", "Piauí", "Rio de Janeiro", "Rio Grande do Norte", "Rio Grande do Sul", "Rondônia",
+        "Roraima", "Santa Catarina", "São Paulo", "Sergipe", "Tocantins", "Rio Branco", "Maceió", "Macapá",
+        "Manaus", "Salvador", "Fortaleza", "Brasília", "Vitória", "Goiânia", "São Luís", "Cuiabá",
+        "Campo Grande", "Belo Horizonte", "Belém", "João Pessoa", "Curitiba", "Recife", "Teresina", "Natal",
+        "Porto Alegre", "Porto Velho", "Boa Vista", "Florianópolis", "Aracaju", "Palmas",
+    ),
+}
+
+# Regras: o grupo 1 é a menção
+RULES = {
+    "PESSOA": (
+        rf"(?i:nomear|exonerar|designar|dispensar|aposentar|conceder\s+a|servidora?|deputad[oa]|vereador[a]?"
+        rf"|senhora?|sr\.|sra\.|dr\.|dra\.)\s*,?\s+({_NAME})",
+        rf"\b([{_UPPER}]{{2,}}(?:\s+(?:DE|DA|DO|DAS|DOS|E))?(?:\s+[{_UPPER}]{{2,}}){{1,6}}),?\s+"
+        rf"(?i:matr[íi]cula|cpf|rg|portador)",
+    ),
+    "ORGAO": (
+        rf"\b((?:Secretaria|Prefeitura Municipal|Câmara Municipal|Departamento|Fundação|Instituto|Agência"
+        rf"|Universidade|Companhia|Coordenadoria|Diretoria|Superintendência|Comissão)"
+        rf"(?:{_LINK}\s+{_WORD}){{1,8}})",
+    ),
+    "LOCAL": (
+        rf"(?i:munic[íi]pio|cidade|comarca)\s+de\s+({_WORD}(?:{_LINK}\s+{_WORD}){{0,4}})",
+    ),
+}
+
+
+class Mention(NamedTuple):
+    tipo_entidade: str
+    valor: str
+    contexto: str
+    inicio_pos: int
+    fim_pos: int
+
+
+def load_gazetteer(path=None) -> dict:
+    """Built-in gazetteer extended with a JSON file of ``{"PESSOA": [...], "ORGAO": [...], ...}``."""
+    gazetteer = {kind: list(names) for kind, names in GAZETTEER.items()}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for kind, names in json.load(f).items():
+                gazetteer.setdefault(kind.upper(), []).extend(names)
+    return gazetteer
+
+
+class EntityTagger:
+    """
+    Finds entity mentions in a document's text.
+
+    Args:
+        gazetteer (dict): Known names per entity type (see :func:`load_gazetteer`).
+        model (str): Name or path of a spaCy model; ``None`` uses only gazetteer and rules.
+    """
+
+    def __init__(self, gazetteer: Optional[dict] = None, model: Optional[str] = None):
+        gazetteer = gazetteer if gazetteer is not None else load_gazetteer()
+        self.patterns = []
+        for kind, names in gazetteer.items():
+            if names:
+                # Nomes mais longos primeiro: "Mato Grosso do Sul" antes de "Mato Grosso"
+                alternatives = "|".join(re.escape(n) for n in sorted(set(names), key=len, reverse=True))
+                self.patterns.append((kind, re.compile(rf"\b({alternatives})\b")))
+        for kind, rules in RULES.items():
+            self.patterns.extend((kind, re.compile(rule)) for rule in rules)
+
+        self.nlp = None
+        if model:
+            import spacy
+
+            self.nlp = spacy.load(model, disable=["parser", "lemmatizer"])
+
+    def tag(self, text: str) -> List[Mention]:
+        spans = []
+        for kind, pattern in self.patterns:
+            spans.extend((m.start(1), m.end(1), kind) for m in pattern.finditer(text))
+        if self.nlp is not None:
+            spans.extend(self._model_spans(text))
+
+        # Sobreposições: fica a menção mais longa (a mais cedo, em caso de empate)
+        spans.sort(key=lambda s: (s[0] - s[1], s[0]))
+        accepted = []  # (início, fim, tipo) aceitos, em ordem de início
+        for span in spans:
+            i = bisect.bisect(accepted, span)
+            if (i and accepted[i - 1][1] > span[0]) or (i < len(accepted) and accepted[i][0] < span[1]):
+                continue
+            accepted.insert(i, span)
+
+        mentions = []
+        for start, end, kind in accepted:
+            context = " ".join(text[max(0, start - CONTEXT_CHARS):end + CONTEXT_CHARS].split())
+            mentions.append(Mention(kind, " ".join(text[start:end].split()), context, start, end))
+        return mentions
+
+    def _model_spans(self, text):
+        # Página a página: um diário inteiro passa do limite de tamanho do spaCy
+        pages = text.split(PAGE_SEPARATOR)
+        offset = 0
+        for page, doc in zip(pages, self.nlp.pipe(pages, batch_size=16)):
+            for ent in doc.ents:
+                if ent.label_ in MODEL_LABELS:
+                    yield offset + ent.start_char, offset + ent.end_char, MODEL_LABELS[ent.label_]
+            offset += len(page) + len(PAGE_SEPARATOR)
+
+
+_tagger = None
+
+
+def init_worker(gazetteer_path=None, model=None):
+    global _tagger
+    _tagger = EntityTagger(load_gazetteer(gazetteer_path), model)
+
+
+def tag_document(text_root, sha256: str) -> List[Mention]:
+    """Worker task: tags the stored text of one content."""
+    global _tagger
+    if _tagger is None:
+        _tagger = EntityTagger()
+    return _tagger.tag(TextStore(text_root).read(sha256))
+
+
+def write_mentions(pool, batch) -> List[str]:
+    """Replaces the mentions of each document of the batch with one COPY; returns the hashes written."""
+    with pooled_connection(pool) as conn, conn.cursor() as cursor:
+        ids = document_ids(cursor, [sha256 for sha256, _ in batch])
+        cursor.execute("DELETE FROM entidades WHERE documento_id = ANY(%s)", (list(ids.values()),))
+        copy_rows(
+            cursor,
+            "entidades",
+            ENTITY_COLUMNS,
+            ((ids[sha256], *mention) for sha256, mentions in batch if sha256 in ids for mention in mentions),
+        )
+    if len(ids) < len(batch):
+        print(f"⚠️ {len(batch) - len(ids)} documentos ainda não estão no banco (rode load-db)")
+    return list(ids)
+
+
+def extract_entities(
+    manifest, pool, text_root, workers=None, batch_size=50, gazetteer=None, model=None, entity=None, full=False
+) -> int:
+    """
+    Tags every processed content not yet tagged and bulk-inserts the mentions into ``entidades``.
+
+    Args:
+        manifest (Manifest): Manifest of the raw storage root.
+        pool (ThreadedConnectionPool): Postgres connections.
+        text_root (Path): Processed storage root.
+        workers (int): Worker processes; defaults to one per core.
+        batch_size (int): Documents per COPY.
+        gazetteer (Path): Optional JSON file with extra known names.
+        model (str): Optional spaCy model.
+        entity (str): Restricts the run to one entity.
+        full (bool): Tags every content again.
+
+    Returns:
+        int: Number of documents tagged.
+    """
+    return run_stage(
+        manifest,
+        STAGE,
+        TextStore(text_root),
+        partial(tag_document, str(text_root)),
+        partial(write_mentions, pool),
+        workers=workers,
+        batch_size=batch_size,
+        initializer=init_worker,
+        initargs=(str(gazetteer) if gazetteer else None, model),
+        entity=entity,
+        full=full,
+    )
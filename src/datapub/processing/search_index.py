@@ -0,0 +1,230 @@
+"""
+Full-text index of the processed documents in Elasticsearch (stage ``elasticsearch``).
+
+Documents are streamed from the manifest into NDJSON ``_bulk`` bodies capped by
+size and count, and several bodies are in flight at once on a thread pool. A
+whole request answered with 429 is sent again after a backoff; when only some
+items are rejected with 429, just those items are retried. The hashes of each
+acknowledged body are marked done in the manifest, so reruns only send new
+contents; a body that fails for any other reason counts as failed and the run
+goes on.
+"""
+
+import os
+import json
+import time
+import random
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+
+from datapub.processing.load_db import document_row
+from datapub.processing.text import PROCESSED_ROOT, TextStore
+from datapub.shared.utils.http_client import build_session
+from datapub.shared.utils.metrics import metrics
+from datapub.shared.utils.rate_limit import HostPolicy, RateLimiter
+
+STAGE = "elasticsearch"
+# Mesma variável usada pela API no docker-compose
+DEFAULT_ES_URL = os.environ.get("ES_URL", "http://localhost:9200")
+INDEX = "diarios"
+MAX_BULK_BYTES = 8 * 1024 * 1024
+MAX_BULK_DOCS = 500
+MAX_RETRIES = 5
+# O cluster é nosso: o limite só reage a 429 e Retry-After, e um _bulk grande pode levar um minuto
+ES_POLICY = HostPolicy(rate=50.0, max_rate=200.0, burst=16, target_latency=60.0)
+
+MAPPINGS = {
+    "properties": {
+        "orgao": {"type": "keyword"},
+        "data_publicacao": {"type": "date"},
+        "numero_edicao": {"type": "keyword"},
+        "url_origem": {"type": "keyword", "index": False},
+        "caminho_arquivo": {"type": "keyword", "index": False},
+        "texto": {"type": "text", "analyzer": "brazilian"},
+    }
+}
+
+
+class BulkChunk(NamedTuple):
+    hashes: List[str]
+    lines: List[bytes]  # pares ação + documento, na ordem dos hashes
+
+
+class BulkResult(NamedTuple):
+    indexed: List[str]
+    failed: List[str]
+
+
+def index_actions(records: Iterable[dict], store: TextStore, index: str = INDEX) -> Iterator[Tuple[str, bytes]]:
+    """Yields ``(sha256, action and source lines)`` for each record with extracted text."""
+    for record in records:
+        sha256 = record["hash_sha256"]
+        if not store.has(sha256):
+            continue
+        orgao, published, path, _, metadata = document_row(record)
+        source = {
+            "orgao": orgao,
+            "data_publicacao": published,
+            "numero_edicao": metadata.get("numero_edicao"),
+            "url_origem": metadata.get("url_origem"),
+            "caminho_arquivo": path,
+            "texto": store.read(sha256),
+        }
+        action = {"index": {"_index": index, "_id": sha256}}
+        yield sha256, (
+            json.dumps(action).encode("utf-8") + b"\n" + json.dumps(source, ensure_ascii=False).encode("utf-8") + b"\n"
+        )
+
+
+def bulk_chunks(
+    actions: Iterable[Tuple[str, bytes]], max_bytes: int = MAX_BULK_BYTES, max_docs: int = MAX_BULK_DOCS
+) -> Iterator[BulkChunk]:
+    """Groups actions into bodies of at most ``max_bytes`` and ``max_docs`` (a bigger document goes alone)."""
+    hashes, lines, size = [], [], 0
+    for sha256, data in actions:
+        if hashes and (size + len(data) > max_bytes or len(hashes) >= max_docs):
+            yield BulkChunk(hashes, lines)
+            hashes, lines, size = [], [], 0
+        hashes.append(sha256)
+        lines.append(data)
+        size += len(data)
+    if hashes:
+        yield BulkChunk(hashes, lines)
+
+
+class BulkIndexer:
+    """
+    Sends ``_bulk`` bodies to Elasticsearch, retrying on backpressure.
+
+    Args:
+        url (str): Base URL of the cluster.
+        session (requests.Session): Shared keep-alive session; one is created if omitted.
+        timeout (float): Seconds per request.
+        pool_maxsize (int): Connections kept alive by the session created here; match the concurrency.
+        max_retries (int): Attempts after a 429 before the rejected items count as failed.
+        backoff (float): Base delay in seconds; doubles on every retry, with jitter.
+    """
+
+    def __init__(
+        self, url=DEFAULT_ES_URL, session=None, timeout=120, max_retries=MAX_RETRIES, backoff=1.0, pool_maxsize=4
+    ):
+        self.url = url.rstrip("/")
+        self.session = session or build_session(RateLimiter(ES_POLICY), pool_maxsize=pool_maxsize, timeout=timeout)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def ensure_index(self, index: str = INDEX):
+        """Creates ``index`` with the text mappings when it does not exist yet."""
+        response = self.session.head(f"{self.url}/{index}", timeout=self.timeout)
+        if response.status_code == 404:
+            response = self.session.put(f"{self.url}/{index}", json={"mappings": MAPPINGS}, timeout=self.timeout)
+            # Outro processo pode ter criado o índice entre o HEAD e o PUT
+            if response.status_code != 400 or "already_exists" not in response.text:
+                response.raise_for_status()
+        else:
+            response.raise_for_status()
+
+    def send(self, chunk: BulkChunk) -> BulkResult:
+        pending = dict(zip(chunk.hashes, chunk.lines))
+        indexed, failed = [], []
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+            response = self.session.post(
+                f"{self.url}/_bulk",
+                data=b"".join(pending.values()),
+                headers={"Content-Type": "application/x-ndjson"},
+                timeout=self.timeout,
+            )
+            if response.status_code == 429:
+                continue
+            response.raise_for_status()
+
+            rejected = {}
+            for sha256, item in zip(list(pending), response.json()["items"]):
+                status = next(iter(item.values()))
+                if status.get("status") == 429:
+                    rejected[sha256] = pending[sha256]
+                elif "error" in status:
+                    print(f"❌ {sha256[:12]}: {status['error'].get('reason', status['error'])}")
+                    failed.append(sha256)
+                else:
+                    indexed.append(sha256)
+            pending = rejected
+            if not pending:
+                break
+        return BulkResult(indexed, failed + list(pending))
+
+
+def index_documents(
+    manifest,
+    text_root=PROCESSED_ROOT,
+    es_url: str = None,
+    index: str = INDEX,
+    concurrency: int = 4,
+    max_bytes: int = MAX_BULK_BYTES,
+    max_docs: int = MAX_BULK_DOCS,
+    entity=None,
+    full=False,
+    indexer: BulkIndexer = None,
+) -> Tuple[int, int]:
+    """
+    Indexes every processed content not yet indexed with concurrent ``_bulk`` requests.
+
+    Args:
+        manifest (Manifest): Manifest of the raw storage root.
+        text_root (Path): Processed storage root.
+        es_url (str): Elasticsearch URL (default: ``$ES_URL``).
+        index (str): Target index, created with :data:`MAPPINGS` if missing.
+        concurrency (int): ``_bulk`` requests in flight.
+        max_bytes (int): Size cap of each request body.
+        max_docs (int): Documents per request.
+        entity (str): Restricts the run to one entity.
+        full (bool): Forgets previous progress and indexes everything again.
+        indexer (BulkIndexer): Client to use instead of one built from ``es_url``.
+
+    Returns:
+        tuple[int, int]: Documents indexed and documents that failed.
+    """
+    indexer = indexer or BulkIndexer(es_url or DEFAULT_ES_URL, pool_maxsize=max(1, concurrency))
+    indexer.ensure_index(index)
+    if full:
+        manifest.reset_stage(STAGE)
+
+    def send(chunk):
+        try:
+            with metrics.span(STAGE, entity):
+                result = indexer.send(chunk)
+        except Exception as e:
+            # Erro de rede ou do cluster: o lote fica pendente para a próxima execução
+            print(f"❌ Falha ao enviar lote de {len(chunk.hashes)} documentos: {e}")
+            result = BulkResult([], list(chunk.hashes))
+        manifest.mark_done(STAGE, result.indexed)
+        metrics.count("documentos", len(result.indexed), entity=entity, stage=STAGE, status="sucesso")
+        if result.failed:
+            metrics.count("documentos", len(result.failed), entity=entity, stage=STAGE, status="erro")
+        return result
+
+    actions = index_actions(manifest.pending_contents(STAGE, entity), TextStore(text_root), index)
+    indexed = failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        in_flight = set()
+
+        def collect(futures):
+            nonlocal indexed, failed
+            for future in futures:
+                result = future.result()
+                indexed += len(result.indexed)
+                failed += len(result.failed)
+
+        # Poucos corpos em memória: o próximo só é montado quando um pedido termina
+        for chunk in bulk_chunks(actions, max_bytes, max_docs):
+            in_flight.add(executor.submit(send, chunk))
+            if len(in_flight) >= concurrency:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+                print(f"🔎 {indexed} documentos indexados")
+        collect(in_flight)
+
+    return indexed, failed
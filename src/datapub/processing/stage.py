@@ -0,0 +1,101 @@
+"""
+Runner shared by the stages that derive data from the extracted text.
+
+Contents are streamed from the manifest, skipping those the stage already
+finished and those without text yet. A process pool runs the stage's ``task``
+once per content hash, and the parent hands the results to ``write`` in batches.
+The hashes of a batch are marked done in the manifest only after ``write``
+returns, so an interrupted run resumes with the first uncommitted batch.
+"""
+
+import os
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Iterator, List, Tuple
+
+from datapub.processing.text import TextStore
+from datapub.shared.utils.metrics import metrics
+
+
+def pending_hashes(manifest, stage: str, store: TextStore, entity=None, full=False) -> Iterator[str]:
+    if full:
+        manifest.reset_stage(stage)
+    for record in manifest.pending_contents(stage, entity):
+        if store.has(record["hash_sha256"]):
+            yield record["hash_sha256"]
+
+
+def run_stage(
+    manifest,
+    stage: str,
+    store: TextStore,
+    task: Callable,
+    write: Callable[[List[Tuple[str, object]]], List[str]],
+    workers: int = None,
+    batch_size: int = 50,
+    initializer=None,
+    initargs=(),
+    entity=None,
+    full=False,
+) -> int:
+    """
+    Runs ``task(sha256)`` on a process pool for every pending content and writes the results.
+
+    Args:
+        manifest (Manifest): Manifest of the raw storage root.
+        stage (str): Name under which progress is recorded in the manifest.
+        store (TextStore): Where the extracted text lives.
+        task (Callable): Picklable function run in the workers; gets a hash, returns a result.
+        write (Callable): Gets ``[(sha256, result), ...]`` in the parent and returns the
+            hashes it persisted; only those are marked done.
+        workers (int): Worker processes; defaults to one per core.
+        batch_size (int): Contents per ``write`` call.
+        initializer (Callable): Runs once in each worker (e.g. to load a model).
+        entity (str): Restricts the run to one entity.
+        full (bool): Forgets previous progress and processes everything again.
+
+    Returns:
+        int: Number of contents written.
+    """
+    workers = workers or os.cpu_count() or 1
+    hashes = pending_hashes(manifest, stage, store, entity, full)
+    written = 0
+    batch = []
+
+    def flush():
+        nonlocal written, batch
+        if batch:
+            with metrics.span(stage, entity):
+                done = write(batch)
+            manifest.mark_done(stage, done)
+            written += len(done)
+            metrics.count("documentos", len(done), entity=entity, stage=stage, status="sucesso")
+            batch = []
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=initializer, initargs=initargs) as pool:
+        in_flight = {}
+        while True:
+            while len(in_flight) < workers * 2:
+                sha256 = next(hashes, None)
+                if sha256 is None:
+                    break
+                in_flight[pool.submit(task, sha256)] = sha256
+            if not in_flight:
+                break
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                sha256 = in_flight.pop(future)
+                try:
+                    batch.append((sha256, future.result()))
+                except Exception as e:
+                    print(f"❌ {sha256[:12]}: falha na etapa {stage} ({e})")
+                    metrics.count("documentos", entity=entity, stage=stage, status="erro")
+                    continue
+                if len(batch) >= batch_size:
+                    flush()
+                    print(f"⚙️ {stage}: {written} documentos")
+        flush()
+
+    return written
@@ -0,0 +1,214 @@
+"""
+Full-text extraction of every document in the manifest (``storage/raw`` → ``storage/processed``).
+
+pdfplumber is CPU-bound, so documents are extracted on a process pool with one
+worker per core. Large gazettes are split into chunks of ``PAGES_PER_TASK`` pages:
+the first chunk of a document also reports its page count, and the remaining
+chunks are then spread over the pool, so a 2,000-page issue does not hold up a
+single core while the others sit idle.
+"""
+
+import os
+import json
+import multiprocessing
+from pathlib import Path
+from dataclasses import dataclass, field
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, List, Optional
+
+from datapub.shared.utils.blob_store import BlobStore
+from datapub.shared.utils.metrics import metrics
+
+PROCESSED_ROOT = Path("storage/processed")
+PAGES_PER_TASK = 16
+PAGE_SEPARATOR = "\f"
+
+
+class TextStore:
+    """
+    Extracted text of each document, keyed by the SHA-256 of its content.
+
+    A document is stored as ``<root>/text/<2 hex>/<sha256>.txt``, the UTF-8 text of
+    its pages separated by form feeds, plus ``<sha256>.pages.json`` holding the byte
+    offset where each page starts followed by the size of the file, so a single
+    page can be read with one seek.
+
+    Args:
+        root (Path): Processed storage root (e.g. ``storage/processed``).
+    """
+
+    def __init__(self, root=PROCESSED_ROOT):
+        self.root = Path(root) / "text"
+
+    def paths(self, sha256: str):
+        folder = self.root / sha256[:2]
+        return folder / f"{sha256}.txt", folder / f"{sha256}.pages.json"
+
+    def has(self, sha256: str) -> bool:
+        return self.paths(sha256)[1].exists()
+
+    def hashes(self) -> Iterator[str]:
+        for index in sorted(self.root.glob("*/*.pages.json")):
+            yield index.name[: -len(".pages.json")]
+
+    def write(self, sha256: str, pages: List[str]):
+        text_path, index_path = self.paths(sha256)
+        text_path.parent.mkdir(parents=True, exist_ok=True)
+
+        separator = PAGE_SEPARATOR.encode("utf-8")
+        encoded = [page.replace(PAGE_SEPARATOR, "\n").encode("utf-8") for page in pages]
+        offsets, position = [], 0
+        for data in encoded:
+            offsets.append(position)
+            position += len(data) + len(separator)
+        offsets.append(max(position - len(separator), 0))
+
+        tmp = text_path.with_suffix(".txt.tmp")
+        with open(tmp, "wb") as f:
+            f.write(separator.join(encoded))
+        tmp.replace(text_path)
+
+        # O índice é gravado por último: a presença dele marca o documento como processado
+        tmp = index_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"sha256": sha256, "pages": len(pages), "offsets": offsets}, f)
+        tmp.replace(index_path)
+
+    def offsets(self, sha256: str) -> List[int]:
+        with open(self.paths(sha256)[1], encoding="utf-8") as f:
+            return json.load(f)["offsets"]
+
+    def read(self, sha256: str) -> str:
+        return self.paths(sha256)[0].read_text(encoding="utf-8")
+
+    def pages(self, sha256: str) -> List[str]:
+        return self.read(sha256).split(PAGE_SEPARATOR)
+
+    def page(self, sha256: str, number: int) -> str:
+        """Text of page ``number`` (0-based), read straight from its offset."""
+        offsets = self.offsets(sha256)
+        start = offsets[number]
+        end = offsets[number + 1] - (len(PAGE_SEPARATOR) if number + 1 < len(offsets) - 1 else 0)
+        with open(self.paths(sha256)[0], "rb") as f:
+            f.seek(start)
+            return f.read(end - start).decode("utf-8")
+
+
+def extract_pages(path: str, start: int, stop: int):
+    """
+    Extracts the text of pages ``start`` to ``stop - 1`` of a PDF (runs in a worker).
+
+    Returns:
+        tuple[int, list[str], int]: ``start``, the page texts and the document's page count.
+    """
+    # Importado no worker: o processo principal não paga o custo do pdfminer
+    import pdfplumber
+
+    texts = []
+    with pdfplumber.open(path) as pdf:
+        total = len(pdf.pages)
+        for page in pdf.pages[start:min(stop, total)]:
+            texts.append(page.extract_text() or "")
+            page.close()
+    return start, texts, total
+
+
+@dataclass
+class _Document:
+    sha256: str
+    path: str
+    total: Optional[int] = None
+    pages: dict = field(default_factory=dict)
+    pending: int = 0
+    failed: bool = False
+
+
+def _document_path(record: dict, blobs: BlobStore) -> Optional[Path]:
+    path = Path(record["caminho_local"])
+    if path.exists():
+        return path
+    blob = blobs.path_for(record["hash_sha256"], path.suffix or ".pdf")
+    return blob if blob.exists() else None
+
+
+def process_documents(manifest, out_root=PROCESSED_ROOT, workers: int = None, entity: str = None, force=False):
+    """
+    Extracts the full text of every distinct document of the manifest into a TextStore.
+
+    Args:
+        manifest (Manifest): Manifest of the raw storage root.
+        out_root (Path): Processed storage root.
+        workers (int): Worker processes; defaults to one per core.
+        entity (str): Restricts the run to one entity.
+        force (bool): Extracts again documents that already have text.
+
+    Returns:
+        tuple[int, int]: Documents extracted and documents that failed.
+    """
+    store = TextStore(out_root)
+    blobs = BlobStore(manifest.path.parent)
+    workers = workers or os.cpu_count() or 1
+
+    def pending_documents():
+        for record in manifest.contents(entity):
+            if not force and store.has(record["hash_sha256"]):
+                continue
+            path = _document_path(record, blobs)
+            if path is None:
+                print(f"⚠️ Arquivo ausente: {record['caminho_local']}")
+                continue
+            yield _Document(record["hash_sha256"], str(path))
+
+    documents = pending_documents()
+    done = failed = 0
+    in_flight = {}
+
+    def submit(doc, start):
+        doc.pending += 1
+        future = pool.submit(extract_pages, doc.path, start, start + PAGES_PER_TASK)
+        in_flight[future] = doc
+
+    # spawn: workers não herdam conexões SQLite nem threads do processo principal
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        while True:
+            # Mantém a fila curta: os textos ficam em memória até o documento fechar
+            while len(in_flight) < workers * 2:
+                doc = next(documents, None)
+                if doc is None:
+                    break
+                submit(doc, 0)
+            if not in_flight:
+                break
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                doc = in_flight.pop(future)
+                doc.pending -= 1
+                try:
+                    start, texts, total = future.result()
+                except Exception as e:
+                    print(f"❌ {Path(doc.path).name}: falha na extração ({e})")
+                    doc.failed = True
+                else:
+                    doc.pages[start] = texts
+                    if doc.total is None:
+                        doc.total = total
+                        # Documento grande: as demais fatias vão para os outros núcleos
+                        for chunk_start in range(PAGES_PER_TASK, total, PAGES_PER_TASK):
+                            submit(doc, chunk_start)
+
+                if doc.pending:
+                    continue
+                if doc.failed:
+                    failed += 1
+                    metrics.count("documentos", entity=entity, stage="process", status="erro")
+                    continue
+                with metrics.span("process", entity):
+                    store.write(doc.sha256, [text for start in sorted(doc.pages) for text in doc.pages[start]])
+                done += 1
+                metrics.count("documentos", entity=entity, stage="process", status="sucesso")
+                metrics.count("paginas", doc.total, entity=entity)
+                print(f"📝 {Path(doc.path).name}: {doc.total} páginas extraídas")
+
+    return done, failed
@@ -0,0 +1,105 @@
+import os
+import shutil
+from pathlib import Path
+
+from datapub.shared.utils.download import hash_file
+
+BLOBS_DIRNAME = "blobs"
+
+
+class BlobStore:
+    """
+    Content-addressed store of downloaded documents, keyed by SHA-256.
+
+    Each distinct content is kept once, at ``<root>/blobs/sha256/<2 hex>/<sha256><ext>``.
+    The per-entity ``downloads/`` files are name views of those blobs: hardlinks,
+    so existing code keeps opening documents by name while identical bytes fetched
+    by several entities, or several times by the same one, take the space of one
+    copy. On filesystems without hardlinks the view falls back to a symlink.
+
+    Args:
+        root (Path): Storage root shared by every entity (e.g. ``storage/raw``).
+    """
+
+    def __init__(self, root):
+        self.root = Path(root) / BLOBS_DIRNAME / "sha256"
+
+    def path_for(self, sha256: str, suffix: str = ".pdf") -> Path:
+        return self.root / sha256[:2] / f"{sha256}{suffix}"
+
+    def put(self, path, sha256: str) -> bool:
+        """
+        Adds the file at ``path`` to the store and turns ``path`` into a view of its blob.
+
+        Returns:
+            bool: ``True`` if the content was new, ``False`` if it was already stored
+            (the bytes at ``path`` are then dropped in favour of the existing blob).
+        """
+        path = Path(path)
+        blob = self.path_for(sha256, path.suffix)
+        if blob.exists():
+            if not os.path.samefile(blob, path):
+                self._link_view(blob, path)
+            return False
+
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(path, blob)
+        except FileExistsError:
+            # Outra thread guardou o mesmo conteúdo no meio tempo
+            self._link_view(blob, path)
+            return False
+        except OSError:
+            shutil.copy2(path, blob)
+            self._link_view(blob, path)
+        return True
+
+    def _link_view(self, blob: Path, view: Path):
+        tmp = view.with_name(f".{view.name}.link")
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(blob, tmp)
+        except OSError:
+            try:
+                os.symlink(blob.resolve(), tmp)
+            except OSError:
+                return  # sem hardlink nem symlink: a visão continua sendo uma cópia
+        os.replace(tmp, view)
+
+
+def deduplicate(root, manifest) -> tuple:
+    """
+    Moves every file under ``<root>/*/downloads`` into the blob store.
+
+    The SHA-256 recorded in the manifest is reused when present; other files are
+    hashed once and the digest is written back to their manifest record.
+
+    Returns:
+        tuple[int, int, int]: Files seen, distinct contents and bytes reclaimed.
+    """
+    root = Path(root)
+    store = BlobStore(root)
+    records = {r["caminho_local"]: r for r in manifest.documents()}
+
+    seen = distinct = reclaimed = 0
+    with manifest.batch(500):
+        for path in sorted(root.glob("*/downloads/*")):
+            if not path.is_file() or path.name.startswith("."):
+                continue
+            seen += 1
+
+            record = records.get(str(path))
+            sha256 = record and record["hash_sha256"]
+            if not sha256:
+                md5, sha256 = hash_file(path)
+                if record:
+                    record = {k: v for k, v in record.items() if k != "id"}
+                    manifest.add({**record, "hash_md5": record["hash_md5"] or md5, "hash_sha256": sha256})
+
+            linked = path.stat().st_nlink > 1
+            if store.put(path, sha256):
+                distinct += 1
+            elif not linked:
+                reclaimed += path.stat().st_size
+
+    return seen, distinct, reclaimed
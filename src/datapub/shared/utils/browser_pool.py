@@ -0,0 +1,251 @@
+import os
+import atexit
+import threading
+from pathlib import Path
+from typing import Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import InvalidSessionIdException, WebDriverException
+from selenium.webdriver.chrome.service import Service
+
+DEFAULT_POOL_SIZE = int(os.environ.get("DATAPUB_BROWSERS", "2"))
+DEFAULT_MAX_PAGES = int(os.environ.get("DATAPUB_BROWSER_MAX_PAGES", "300"))
+DRIVER_CACHE_DIRS = (
+    Path.home() / ".cache" / "datapub" / "drivers",
+    Path.home() / ".wdm" / "drivers" / "chromedriver",
+    Path.home() / ".cache" / "selenium" / "chromedriver",
+)
+
+# Orçamento de navegadores compartilhado entre processos (definido pelo orquestrador)
+_process_budget = None
+_resolved_driver = None
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def set_browser_budget(semaphore):
+    """Installs a cross-process semaphore that bounds how many browsers run at once."""
+    global _process_budget
+    _process_budget = semaphore
+
+
+def resolve_driver_path() -> Optional[str]:
+    """
+    Finds a chromedriver binary without touching the network.
+
+    Looks at ``CHROMEDRIVER_PATH``, then at the local driver caches (ours,
+    webdriver-manager's and Selenium Manager's), newest first. Returns ``None``
+    when nothing is cached, letting Selenium Manager resolve the driver itself.
+    """
+    global _resolved_driver
+    if _resolved_driver:
+        return _resolved_driver
+
+    candidate = os.environ.get("CHROMEDRIVER_PATH")
+    if candidate and Path(candidate).is_file():
+        _resolved_driver = candidate
+        return candidate
+
+    names = ("chromedriver", "chromedriver.exe")
+    for cache_dir in DRIVER_CACHE_DIRS:
+        if not cache_dir.is_dir():
+            continue
+        found = [p for name in names for p in cache_dir.rglob(name) if p.is_file() and os.access(p, os.X_OK)]
+        if found:
+            _resolved_driver = str(max(found, key=lambda p: p.stat().st_mtime))
+            return _resolved_driver
+
+    return None
+
+
+def chrome_options(headless=True) -> webdriver.ChromeOptions:
+    options = webdriver.ChromeOptions()
+    options.add_experimental_option("prefs", {
+        "download.prompt_for_download": False,
+        "plugins.always_open_pdf_externally": True,
+        "download.directory_upgrade": True,
+    })
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--no-sandbox")
+    options.add_argument("--log-level=3")
+    return options
+
+
+class PooledDriver:
+    """
+    Lease of one pooled Chrome, usable wherever a ``webdriver.Chrome`` is expected.
+
+    Attribute access is forwarded to the underlying driver. ``get`` counts pages and
+    transparently replaces the browser after ``max_pages`` navigations or when the
+    session has crashed; ``quit`` hands the browser back to the pool instead of
+    closing it.
+    """
+
+    def __init__(self, pool, driver, download_dir=None):
+        self._pool = pool
+        self._driver = driver
+        self._download_dir = download_dir
+        self._apply_download_dir()
+
+    def __getattr__(self, name):
+        if self._driver is None:
+            raise InvalidSessionIdException("Navegador já devolvido ao pool")
+        return getattr(self._driver, name)
+
+    @property
+    def pages(self) -> int:
+        return self._pool._pages.get(id(self._driver), 0)
+
+    def get(self, url):
+        if self.pages >= self._pool.max_pages:
+            self._recycle()
+        try:
+            self._driver.get(url)
+        except (InvalidSessionIdException, WebDriverException) as e:
+            if not self._pool.is_crash(e):
+                raise
+            # O navegador morreu: troca por um novo e tenta mais uma vez
+            self._recycle()
+            self._driver.get(url)
+        self._pool._pages[id(self._driver)] = self.pages + 1
+
+    def quit(self):
+        if self._driver is not None:
+            self._pool.release(self._driver)
+            self._driver = None
+
+    def _recycle(self):
+        self._driver = self._pool.replace(self._driver)
+        self._apply_download_dir()
+
+    def _apply_download_dir(self):
+        if not self._download_dir:
+            return
+        # Ajusta a pasta de downloads em tempo de execução, sem reiniciar o navegador
+        self._driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": str(Path(self._download_dir).resolve()),
+        })
+
+
+class BrowserPool:
+    """
+    Fixed budget of headless Chrome instances shared by the Selenium-based extractors.
+
+    Browsers start lazily on first use, are handed out one lease at a time (Selenium
+    drives a single window per session, so a lease is a whole browser context), and
+    are recycled after ``max_pages`` navigations or on crash. The chromedriver binary
+    is resolved from the local caches, so startup needs no network access.
+
+    Args:
+        size (int): Maximum number of browsers alive in this process.
+        headless (bool): Runs Chrome without a window.
+        max_pages (int): Navigations after which a browser is replaced.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, headless=True, max_pages=DEFAULT_MAX_PAGES):
+        self.size = max(1, size)
+        self.headless = headless
+        self.max_pages = max_pages
+        self._idle = []
+        self._alive = 0
+        self._pages = {}
+        self._cond = threading.Condition()
+
+    def acquire(self, download_dir=None, timeout=None) -> PooledDriver:
+        """Leases a browser, starting one if the budget allows, else waiting for a release."""
+        with self._cond:
+            while not self._idle and self._alive >= self.size:
+                if not self._cond.wait(timeout):
+                    raise TimeoutError("Nenhum navegador livre no pool")
+            if self._idle:
+                driver = self._idle.pop()
+            else:
+                self._alive += 1
+                driver = None
+
+        if driver is None:
+            try:
+                driver = self._start()
+            except Exception:
+                with self._cond:
+                    self._alive -= 1
+                    self._cond.notify()
+                raise
+        return PooledDriver(self, driver, download_dir)
+
+    def release(self, driver):
+        if self._pages.get(id(driver), 0) >= self.max_pages:
+            self._stop(driver)
+            return
+        try:
+            # O próximo extrator não herda a sessão do anterior
+            driver.delete_all_cookies()
+        except Exception:
+            self._stop(driver)
+            return
+        with self._cond:
+            self._idle.append(driver)
+            self._cond.notify()
+
+    def replace(self, driver):
+        """Stops ``driver`` and returns a fresh one occupying the same slot."""
+        self._quit(driver)
+        return self._launch()
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._stop(driver)
+
+    @staticmethod
+    def is_crash(error: Exception) -> bool:
+        if isinstance(error, InvalidSessionIdException):
+            return True
+        message = str(error).lower()
+        return any(s in message for s in ("session deleted", "chrome not reachable", "disconnected", "tab crashed"))
+
+    def _start(self):
+        if _process_budget is not None:
+            _process_budget.acquire()
+        try:
+            return self._launch()
+        except Exception:
+            if _process_budget is not None:
+                _process_budget.release()
+            raise
+
+    def _launch(self):
+        path = resolve_driver_path()
+        service = Service(executable_path=path) if path else Service()
+        driver = webdriver.Chrome(service=service, options=chrome_options(self.headless))
+        self._pages[id(driver)] = 0
+        return driver
+
+    def _quit(self, driver):
+        self._pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _stop(self, driver):
+        self._quit(driver)
+        if _process_budget is not None:
+            _process_budget.release()
+        with self._cond:
+            self._alive -= 1
+            self._cond.notify()
+
+
+def browser_pool(headless=True) -> BrowserPool:
+    """Returns the process-wide pool, creating it on first use."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = BrowserPool(headless=headless)
+            atexit.register(_default_pool.close)
+        return _default_pool
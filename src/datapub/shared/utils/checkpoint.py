@@ -0,0 +1,222 @@
+import json
+import threading
+from pathlib import Path
+from datetime import date, datetime, timedelta
+from dataclasses import dataclass, field
+from typing import Optional
+
+# Situações que encerram uma unidade (dia ou número de edição)
+DONE_STATUSES = ("ok", "vazio")
+
+
+def _to_json(unit):
+    if isinstance(unit, datetime):
+        unit = unit.date()
+    return unit.isoformat() if isinstance(unit, date) else unit
+
+
+def _from_json(kind, value):
+    if value is None:
+        return None
+    return date.fromisoformat(value) if kind == "date" else int(value)
+
+
+def next_unit(unit):
+    """The unit right after ``unit``: the next day or the next edition number."""
+    if isinstance(unit, datetime):
+        unit = unit.date()
+    return unit + timedelta(days=1) if isinstance(unit, date) else unit + 1
+
+
+def previous_unit(unit):
+    if isinstance(unit, datetime):
+        unit = unit.date()
+    return unit - timedelta(days=1) if isinstance(unit, date) else unit - 1
+
+
+@dataclass
+class RunState:
+    kind: str  # 'date' ou 'number'
+    start: object
+    end: object
+    listed: set = field(default_factory=set)
+    done: set = field(default_factory=set)
+    failed: set = field(default_factory=set)
+    # Dias que o planejador deixou de fora; não seguram a marca d'água, mas ficam para a varredura
+    skipped: set = field(default_factory=set)
+
+    @property
+    def outstanding(self) -> set:
+        """Units handed to a download that never finished, or that failed."""
+        return (self.listed | self.failed) - self.done
+
+    def record(self, unit, status):
+        if status == "listado":
+            self.listed.add(unit)
+        elif status == "pulado":
+            self.skipped.add(unit)
+        elif status in DONE_STATUSES:
+            self.done.add(unit)
+            self.failed.discard(unit)
+        else:
+            self.failed.add(unit)
+
+
+class Checkpoint:
+    """
+    Per-entity high-water mark plus an append-only log of the current run.
+
+    Every unit (a day, or an edition number) is logged when it is handed to the
+    download engine and again when it completes, so an interrupted run can be
+    replayed skipping every unit that already completed. A run that finishes
+    cleanly moves the high-water mark (``checkpoint.json``) to its end and clears
+    the log (``checkpoint.jsonl``); one that left failures behind only moves the
+    mark up to its first failure and keeps the log for the next run.
+
+    Days the publication planner skipped are logged as ``'pulado'``: the mark
+    moves past them, but they are kept in ``checkpoint.json`` until a later run
+    probes them, so the planner's sweep still reaches them behind the mark.
+
+    Args:
+        base_dir (Path): Storage folder of the entity (e.g. ``storage/raw/al_go``).
+    """
+
+    def __init__(self, base_dir):
+        base_dir = Path(base_dir)
+        self.state_path = base_dir / "checkpoint.json"
+        self.log_path = base_dir / "checkpoint.jsonl"
+        self.run: Optional[RunState] = None
+        self._log = None
+        self._lock = threading.Lock()
+
+    # ---- Marca d'água ----
+
+    def high_water(self, kind: str):
+        if not self.state_path.exists():
+            return None
+        with open(self.state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("kind") != kind:
+            return None
+        return _from_json(kind, state.get("high_water"))
+
+    def skipped_days(self, kind: str = "date") -> set:
+        """Units skipped by the planner in earlier runs and not probed since."""
+        if not self.state_path.exists():
+            return set()
+        with open(self.state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("kind") != kind:
+            return set()
+        return {_from_json(kind, unit) for unit in state.get("skipped", [])}
+
+    def _save_state(self, kind, unit, skipped=()):
+        state = {
+            "kind": kind,
+            "high_water": _to_json(unit),
+            "skipped": sorted(_to_json(u) for u in skipped),
+            "updated_at": datetime.now().isoformat(),
+        }
+        tmp = self.state_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        tmp.replace(self.state_path)
+
+    # ---- Log da execução ----
+
+    def pending_run(self) -> Optional[RunState]:
+        """State of the last run if it was interrupted or left failures behind."""
+        if not self.log_path.exists():
+            return None
+
+        run = None
+        with open(self.log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # linha truncada por uma interrupção
+                if entry.get("event") == "inicio":
+                    kind = entry["kind"]
+                    run = RunState(kind, _from_json(kind, entry["start"]), _from_json(kind, entry["end"]))
+                elif run is not None and "unit" in entry:
+                    run.record(_from_json(run.kind, entry["unit"]), entry["status"])
+        return run
+
+    def begin(self, kind: str, start, end, resume: Optional[RunState] = None):
+        """Starts logging a run; ``resume`` carries over the units an interrupted run finished."""
+        with self._lock:
+            start, end = _from_json(kind, _to_json(start)), _from_json(kind, _to_json(end))
+            if resume is not None:
+                self.run = resume
+                self.run.end = end
+                self._log = open(self.log_path, "a", encoding="utf-8", buffering=1)
+            else:
+                self.run = RunState(kind, start, end)
+                self._log = open(self.log_path, "w", encoding="utf-8", buffering=1)
+                self._write({"event": "inicio", "kind": kind, "start": _to_json(start), "end": _to_json(end)})
+
+    def listed(self, unit):
+        self._mark(unit, "listado")
+
+    def skipped(self, unit):
+        """Records a unit the planner left out of this run."""
+        self._mark(unit, "pulado")
+
+    def completed(self, unit, status: str = "ok"):
+        """Records the outcome of a unit: 'ok', 'vazio' (nothing published) or 'erro'."""
+        self._mark(unit, status)
+
+    def is_done(self, unit) -> bool:
+        return self.run is not None and _from_json(self.run.kind, _to_json(unit)) in self.run.done
+
+    def finish(self):
+        """Closes a run that went to the end and advances the high-water mark as far as it is safe to."""
+        with self._lock:
+            run = self._close()
+            if run is None:
+                return
+
+            if run.outstanding:
+                # Mantém o log: a próxima execução incremental repete só as unidades pendentes
+                high_water = previous_unit(min(run.outstanding))
+            else:
+                high_water = run.end if run.end is not None else max(run.done, default=None)
+                self.log_path.unlink(missing_ok=True)
+
+            if run.kind == "date" and high_water is not None:
+                # O diário de hoje pode sair mais tarde: hoje fica para a próxima execução
+                high_water = min(_from_json("date", _to_json(high_water)), date.today() - timedelta(days=1))
+
+            current = self.high_water(run.kind)
+            previous_skipped = self.skipped_days(run.kind)
+            skipped = (previous_skipped | run.skipped) - run.done
+            # Só avança se a execução emenda com o que já estava coberto
+            contiguous = current is None or run.start is None or run.start <= next_unit(current)
+            if high_water is not None and contiguous and (current is None or high_water > current):
+                self._save_state(run.kind, high_water, skipped)
+            elif skipped != previous_skipped:
+                self._save_state(run.kind, current, skipped)
+
+    def abort(self):
+        """Closes an interrupted run, keeping its log so the next incremental run resumes it."""
+        with self._lock:
+            self._close()
+
+    def _close(self) -> Optional[RunState]:
+        run, self.run = self.run, None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        return run
+
+    def _mark(self, unit, status):
+        with self._lock:
+            if self.run is None:
+                return
+            value = _from_json(self.run.kind, _to_json(unit))
+            self.run.record(value, status)
+            self._write({"unit": _to_json(value), "status": status})
+
+    def _write(self, entry):
+        self._log.write(json.dumps(entry, ensure_ascii=False) + "\n")
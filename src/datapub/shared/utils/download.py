@@ -0,0 +1,99 @@
+import os
+import hashlib
+import tempfile
+from pathlib import Path
+from dataclasses import dataclass
+
+CHUNK_SIZE = 64 * 1024
+PDF_MAGIC = b"%PDF"
+
+
+class InvalidDocumentError(ValueError):
+    """Raised when a response body is not the kind of document we expected."""
+
+
+@dataclass
+class StreamedFile:
+    path: Path
+    size: int
+    md5: str
+    sha256: str
+
+
+def stream_to_file(chunks, target, expect_magic: bytes = PDF_MAGIC) -> StreamedFile:
+    """
+    Streams an iterable of byte chunks into ``target``, hashing each byte as it passes.
+
+    The data goes to a temporary file next to the target, which is fsynced and then
+    atomically renamed into place, so readers never see a partial file and a crash
+    leaves at most a stray ``.part`` file behind. Memory use is bounded by the chunk size.
+
+    Args:
+        chunks (Iterable[bytes]): Body of the document, e.g. ``response.iter_content()``.
+        target (Path): Final location of the file.
+        expect_magic (bytes): Signature that must appear in the first 10 bytes; ``None``
+            disables the check.
+
+    Returns:
+        StreamedFile: Final path, size and digests of the written file.
+
+    Raises:
+        InvalidDocumentError: If the body does not carry ``expect_magic``.
+    """
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    size = 0
+    head = b""
+
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                if expect_magic is not None and len(head) < 10:
+                    head += chunk[:10]
+                    if len(head) >= 10 and expect_magic not in head[:10]:
+                        raise InvalidDocumentError("conteúdo não corresponde ao tipo esperado")
+                md5.update(chunk)
+                sha256.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+
+            if expect_magic is not None and expect_magic not in head[:10]:
+                raise InvalidDocumentError("conteúdo não corresponde ao tipo esperado")
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_name, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+    return StreamedFile(target, size, md5.hexdigest(), sha256.hexdigest())
+
+
+def stream_response(response, target, chunk_size: int = CHUNK_SIZE, expect_magic: bytes = PDF_MAGIC) -> StreamedFile:
+    """Streams a ``requests`` response opened with ``stream=True`` into ``target``."""
+    try:
+        return stream_to_file(response.iter_content(chunk_size), target, expect_magic)
+    finally:
+        response.close()
+
+
+def hash_file(path, chunk_size: int = CHUNK_SIZE):
+    """Returns the (md5, sha256) hex digests of a file already on disk, in a single read."""
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            md5.update(chunk)
+            sha256.update(chunk)
+    return md5.hexdigest(), sha256.hexdigest()
@@ -1,12 +1,236 @@
 import os
-import json
+import asyncio
 import hashlib
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+from urllib.parse import urlsplit
+
+import requests
+
 from datapub.shared.contracts.extractor_contract import ExtractorContract
+from datapub.shared.utils.blob_store import BlobStore
+from datapub.shared.utils.checkpoint import Checkpoint, next_unit
+from datapub.shared.utils.download import InvalidDocumentError, stream_response
+from datapub.shared.utils.http_cache import HttpCache
+from datapub.shared.utils.http_client import DEFAULT_TIMEOUT, USER_AGENT, build_session
+from datapub.shared.utils.manifest import Manifest
+from datapub.shared.utils.metrics import metrics
+from datapub.shared.utils.planner import PublicationPlanner
+from datapub.shared.utils.rate_limit import HostPolicy, RateLimiter
+from datapub.shared.utils.resilience import DEFINITIVE, Resilience, RetryQueue, status_class
+
+
+@dataclass
+class DownloadJob:
+    """A single file to fetch: where it comes from, where it goes and what it is."""
+    url: str
+    target: Path
+    metadata: dict = field(default_factory=dict)
+    method: str = "GET"
+    data: Optional[dict] = None
+    headers: Optional[dict] = None
+
+
+@dataclass
+class DownloadResult:
+    job: DownloadJob
+    status: str  # 'sucesso', 'existente', 'invalido' ou 'erro'
+    size: int = 0
+    md5: Optional[str] = None
+    sha256: Optional[str] = None
+    http_status: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "sucesso"
+
+
+class DownloadEngine:
+    """
+    Runs a stream of DownloadJob with a global concurrency limit and per-host limits.
+
+    Jobs are pulled lazily from the iterable in a worker thread, so a producer that
+    scrapes listing pages keeps running while earlier files are being transferred.
+    Transfers use blocking ``requests`` calls on a dedicated thread pool and are
+    streamed to disk with ``stream_response``; the event loop only schedules them
+    and serializes the ``on_result`` callbacks, so slow work on a downloaded file
+    (parsing, renaming) belongs in ``postprocess``, which runs on the transfer
+    thread. Network errors, 429 and 5xx are retried through ``resilience`` and end
+    as ``'erro'``; other statuses are ``'invalido'``.
+
+    Args:
+        concurrency (int): Maximum number of transfers in flight overall.
+        per_host (int): Default maximum number of transfers in flight per host.
+        host_limits (dict): Overrides of ``per_host`` keyed by hostname.
+        session (requests.Session): Session used for every transfer.
+        timeout (float): Timeout in seconds for each request.
+        cache (HttpCache): Stores the validators of every GET; required to revalidate.
+        revalidate (bool): Re-checks files already on disk with conditional requests
+            instead of skipping them; a 304 leaves the file untouched.
+        entity (str): Label of the ``fetch`` and ``write`` spans and download counters.
+        resilience (Resilience): Retry policies and circuit breakers of the transfers.
+        postprocess (Callable): Gets each successful result on the transfer thread and
+            returns the result handed to ``on_result``; an exception makes it an ``'erro'``.
+    """
+
+    def __init__(
+        self,
+        concurrency=8,
+        per_host=2,
+        host_limits=None,
+        session=None,
+        timeout=30,
+        cache=None,
+        revalidate=False,
+        entity="",
+        resilience=None,
+        postprocess=None,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.per_host = max(1, per_host)
+        self.host_limits = host_limits or {}
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.cache = cache
+        self.revalidate = revalidate
+        self.entity = entity
+        self.resilience = resilience or Resilience(entity=entity)
+        self.postprocess = postprocess
+
+    def run(self, jobs: Iterable[DownloadJob], on_result: Callable[[DownloadResult], None] = None):
+        """Downloads every job and returns the list of results in completion order."""
+        return asyncio.run(self._run(iter(jobs), on_result))
+
+    async def _run(self, jobs, on_result):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.concurrency)
+        host_slots = {}
+        results = []
+        tasks = set()
+
+        async def worker(job):
+            host = urlsplit(job.url).hostname or ""
+            if host not in host_slots:
+                host_slots[host] = asyncio.Semaphore(self.host_limits.get(host, self.per_host))
+            try:
+                async with host_slots[host]:
+                    result = await loop.run_in_executor(pool, self._fetch, job)
+                results.append(result)
+                metrics.count("downloads", entity=self.entity, status=result.status)
+                if result.ok:
+                    metrics.count("bytes", result.size, entity=self.entity)
+                if on_result:
+                    on_result(result)
+            finally:
+                slots.release()
+
+        sentinel = object()
+        # One extra thread for the producer, which may block on listing pages
+        with ThreadPoolExecutor(max_workers=self.concurrency + 1) as pool:
+            try:
+                while True:
+                    await slots.acquire()
+                    job = await loop.run_in_executor(pool, next, jobs, sentinel)
+                    if job is sentinel:
+                        slots.release()
+                        break
+                    task = asyncio.create_task(worker(job))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            finally:
+                # Se o produtor falhar, os downloads em andamento ainda chegam ao manifesto e ao checkpoint
+                if tasks:
+                    await asyncio.gather(*tasks)
+
+        return results
+
+    def _fetch(self, job: DownloadJob) -> DownloadResult:
+        try:
+            result = self.resilience.call(job.url, lambda: self._fetch_once(job), status=lambda r: r.http_status)
+            if result.ok and self.postprocess:
+                result = self.postprocess(result)
+            return result
+        except Exception as e:
+            return DownloadResult(job, "erro", error=str(e))
+
+    def _fetch_once(self, job: DownloadJob) -> DownloadResult:
+        """One attempt; network errors propagate so that they can be retried."""
+        cacheable = self.cache is not None and job.method == "GET"
+        headers = dict(job.headers or {})
+
+        if job.target.exists():
+            entry = self.cache.entry(job.url) if cacheable and self.revalidate else None
+            if entry is None:
+                return DownloadResult(job, "existente", size=job.target.stat().st_size)
+
+            conditional = self.cache.conditional_headers(entry)
+            if not conditional:
+                unchanged = self.cache.same_length(self.session, job.url, entry, self.timeout, job.headers)
+                if unchanged is not False:
+                    return DownloadResult(job, "existente", size=job.target.stat().st_size)
+            headers.update(conditional)
+
+        # fetch: até os cabeçalhos chegarem; write: transferência, validação e hashes numa só passada
+        with metrics.span("fetch", self.entity):
+            response = self.session.request(
+                job.method, job.url, data=job.data, headers=headers or None, timeout=self.timeout, stream=True
+            )
+        if response.status_code == 304:
+            response.close()
+            self.cache.touch(job.url)
+            return DownloadResult(job, "existente", size=job.target.stat().st_size, http_status=304)
+        if response.status_code != 200:
+            response.close()
+            # 429 e 5xx são falhas passageiras, não ausência do documento
+            transient = status_class(response.status_code) not in (None, DEFINITIVE)
+            return DownloadResult(
+                job,
+                "erro" if transient else "invalido",
+                http_status=response.status_code,
+                error=f"HTTP {response.status_code}" if transient else None,
+            )
+
+        try:
+            with metrics.span("write", self.entity):
+                streamed = stream_response(response, job.target)
+        except InvalidDocumentError:
+            return DownloadResult(job, "invalido", http_status=response.status_code)
+        if cacheable:
+            self.cache.remember(job.url, response, job.target, size=streamed.size)
+        return DownloadResult(
+            job,
+            "sucesso",
+            size=streamed.size,
+            md5=streamed.md5,
+            sha256=streamed.sha256,
+            http_status=response.status_code,
+        )
+
+
+# Situação de cada resultado no log de checkpoints
+CHECKPOINT_STATUS = {"sucesso": "ok", "existente": "ok", "invalido": "vazio", "erro": "erro"}
 
 
 class ExtractorBase(ExtractorContract):
+    # Politeness limits for the download engine; entities may override them
+    max_concurrency = 8
+    max_per_host = 2
+    # Limites de transferências por hostname que diferem de max_per_host
+    host_limits = {}
+    # Política comum do cliente HTTP; http2 exige o httpx instalado
+    timeout = DEFAULT_TIMEOUT
+    user_agent = USER_AGENT
+    http2 = False
+    # Com revalidate, arquivos já baixados são conferidos com requisições condicionais
+    revalidate = False
+    # Ritmo inicial e teto de requisições por segundo em cada host do portal. O padrão é
+    # prudente para um portal desconhecido e limita a vazão: cada entidade ajusta o seu
+    rate_policy = HostPolicy()
+
     def __init__(self, entity: str, base_dir: str, headless=True):
         self.entity = entity
         self.headless = headless
@@ -15,29 +239,263 @@ class ExtractorBase(ExtractorContract):
         self.metadata_dir = self.base_dir / "metadata"
 
         self.downloads_dir.mkdir(parents=True, exist_ok=True)
-        self.metadata_dir.mkdir(parents=True, exist_ok=True)
+
+        # Um manifesto por raiz de armazenamento (ex.: storage/raw), compartilhado entre entidades
+        self.manifest = Manifest(self.base_dir.parent)
+        self.checkpoint = Checkpoint(self.base_dir)
+        self.http_cache = HttpCache(self.manifest)
+        self.blobs = BlobStore(self.base_dir.parent)
+        self.progress = metrics.progress("download", entity=entity)
+        self.rate_limiter = RateLimiter(self.rate_policy, entity=entity)
+        self.resilience = Resilience(entity=entity)
+        self.retry_queue = RetryQueue(self.base_dir, DownloadJob)
+        self.session = self._build_session()
 
     def _format_date(self, date: datetime, fmt: str = "%Y-%m-%d") -> str:
         return date.strftime(fmt)
 
-    def _save_metadata(self, date, filename, url, path, hash):
-        metadata = {
-            "entity": self.entity,
-            "data_publicacao": date.isoformat(),
-            "url_origem": url,
-            "caminho_local": str(path),
-            "data_download": datetime.now().isoformat(),
-            "tamanho_bytes": os.path.getsize(path),
-            "hash_md5": hash,
-            "status": "sucesso"
-        }
-
-        nome_metadata = f"metadata_{filename}.json"
-        with open(self.metadata_dir / nome_metadata, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, ensure_ascii=False, indent=2)
+    def _plan_days(self, start_date, end_date, sweep=False):
+        """
+        Days worth probing in the range, most likely first, learned from the manifest.
+
+        Days skipped by earlier runs (kept by the checkpoint, possibly behind the
+        high-water mark) join the candidates, so the rotating sweep still reaches
+        them; the days left out of this run are recorded as skipped.
+        """
+        start_date = start_date.date() if isinstance(start_date, datetime) else start_date
+        end_date = end_date.date() if isinstance(end_date, datetime) else end_date
+        total = (end_date - start_date).days + 1
+        candidates = {start_date + timedelta(days=i) for i in range(total)}
+        backlog = {d for d in self.checkpoint.skipped_days("date") if d < start_date}
+        with metrics.span("planning", self.entity):
+            planner = PublicationPlanner.from_manifest(self.manifest, self.entity)
+            days = planner.plan_days(candidates | backlog, sweep=sweep)
+        for day in sorted(candidates - set(days)):
+            self.checkpoint.skipped(day)
+        if len(days) < total or backlog:
+            swept = len(backlog & set(days))
+            print(f"🗓️ {len(days)} de {total} dias planejados pelo calendário de publicação ({swept} da varredura)")
+        return days
+
+    def _record_download(self, path, url, file_hash, data_publicacao=None, numero_edicao=None, sha256=None, **extra):
+        """Registers a downloaded file in the storage manifest and in the content-addressed store."""
+        with metrics.span("blob", self.entity):
+            stored = not sha256 or self.blobs.put(path, sha256)
+        if not stored:
+            print(f"♻️ {Path(path).name}: conteúdo idêntico já armazenado, mantendo uma única cópia")
+        with metrics.span("metadata", self.entity):
+            self.manifest.add({
+                "entity": self.entity,
+                "data_publicacao": data_publicacao,
+                "numero_edicao": numero_edicao,
+                "url_origem": url,
+                "caminho_local": str(path),
+                "data_download": datetime.now().isoformat(),
+                "tamanho_bytes": os.path.getsize(path),
+                "hash_md5": file_hash,
+                "hash_sha256": sha256,
+                "status": "sucesso",
+                "extra": extra,
+            })
+
+    def _save_metadata(self, date, filename, url, path, hash, sha256=None):
+        self._record_download(path, url, hash, data_publicacao=date, sha256=sha256)
 
     def _generate_file_hash(self, content: bytes) -> str:
         return hashlib.md5(content).hexdigest()
 
+    def _build_session(self) -> requests.Session:
+        """Keep-alive session shared by the listing and the download engine of the entity."""
+        # Uma conexão a mais por host para a listagem, que corre junto com as transferências
+        return build_session(
+            self.rate_limiter,
+            pool_maxsize=self.max_per_host + 1,
+            host_pools={host: limit + 1 for host, limit in self.host_limits.items()},
+            timeout=self.timeout,
+            user_agent=self.user_agent,
+            http2=self.http2,
+        )
+
+    def close(self):
+        """Closes the pooled connections."""
+        self.session.close()
+
+    def _download_engine(self) -> DownloadEngine:
+        return DownloadEngine(
+            concurrency=self.max_concurrency,
+            per_host=self.max_per_host,
+            host_limits=self.host_limits,
+            session=self.session,
+            timeout=self.timeout,
+            cache=self.http_cache,
+            revalidate=self.revalidate,
+            entity=self.entity,
+            resilience=self.resilience,
+            postprocess=self._postprocess_download,
+        )
+
+    def _postprocess_download(self, result: DownloadResult) -> DownloadResult:
+        """Work on a downloaded file done off the event loop, before ``_on_download_complete``."""
+        return result
+
+    def download_jobs(self, jobs: Iterable[DownloadJob]):
+        """
+        Fetches a stream of jobs concurrently and hands each result to ``_on_download_complete``.
+
+        Downloads that fail after their retries go to the retry queue, which is
+        drained once the stream is exhausted (together with what earlier runs left there).
+
+        Returns:
+            list[DownloadResult]: One result per job, in completion order; a retried
+            download appears once per round.
+        """
+        def on_result(result, replay=False):
+            self._on_download_complete(result)
+            if result.status == "erro":
+                self.retry_queue.push(result.job, result.error)
+            unit = result.job.metadata.get("unit")
+            if unit is not None:
+                status = CHECKPOINT_STATUS[result.status]
+                # O download já foi listado antes: sumir agora não prova que a unidade está vazia
+                if replay and status == "vazio":
+                    status = "erro"
+                self.checkpoint.completed(unit, status)
+            run = self.checkpoint.run
+            if run is not None:
+                # Inclui as unidades encerradas sem download (sem edição, já existentes)
+                self.progress.update(len(run.done | run.failed))
+
+        engine = self._download_engine()
+        with self.manifest.batch(50):
+            results = engine.run(self._checkpointed(jobs), on_result=on_result)
+            results += self._drain_retry_queue(engine, on_result)
+        self.http_cache.evict()
+        return results
+
+    def _drain_retry_queue(self, engine: DownloadEngine, on_result) -> list:
+        """Gives every queued download one more round, once its host's circuit lets it through."""
+        queued = self.retry_queue.take()
+        if not queued:
+            return []
+        print(f"🔁 Repetindo {len(queued)} downloads que falharam")
+        for url in {job.url for job in queued}:
+            self.resilience.wait_for(url)
+        results = engine.run(self._rebuilt(queued), on_result=lambda result: on_result(result, replay=True))
+        self.retry_queue.settle()
+        return results
+
+    def _rebuilt(self, queued):
+        for job in queued:
+            unit = job.metadata.get("unit")
+            try:
+                rebuilt = self._rebuild_job(job)
+            except Exception as e:
+                print(f"❌ [{job.metadata.get('label', job.target.name)}] Erro ao refazer o download: {e}")
+                self.retry_queue.push(job, str(e))
+                rebuilt, status = None, "erro"
+            else:
+                status = "ok"  # nada mais a baixar: a unidade já foi coberta
+            if rebuilt is not None:
+                yield rebuilt
+            elif unit is not None:
+                self.checkpoint.completed(unit, status)
+
+    def _rebuild_job(self, job: DownloadJob) -> Optional[DownloadJob]:
+        """
+        Turns a job taken from the retry queue back into a request.
+
+        The queue keeps only the URL, target and metadata of a job, which is all a
+        plain GET needs. Entities whose jobs carry a form body or session state
+        rebuild them from ``job.metadata["unit"]``.
+
+        Returns:
+            DownloadJob | None: The job to fetch, or ``None`` when there is nothing left to download.
+        """
+        return job
+
+    def _checkpointed(self, jobs):
+        # A unidade fica pendente no log até o resultado do download chegar
+        jobs = iter(jobs)
+        while True:
+            # listing: tempo gasto pelo extrator para produzir o próximo job (páginas, buscas, navegador)
+            with metrics.span("listing", self.entity):
+                job = next(jobs, None)
+            if job is None:
+                return
+            unit = job.metadata.get("unit")
+            if unit is not None:
+                self.checkpoint.listed(unit)
+            yield job
+
+    def _on_download_complete(self, result: DownloadResult):
+        job = result.job
+        label = job.metadata.get("label", job.target.name)
+
+        if result.ok:
+            self._save_metadata(
+                job.metadata["date"], job.target.name, job.url, job.target, result.md5, sha256=result.sha256
+            )
+            print(f"✅ [{label}] Baixado com sucesso | Hash: {result.md5[:8]}")
+        elif result.status == "existente":
+            print(f"⏭️ [{label}] Já existe, pulando.")
+        elif result.status == "invalido":
+            print(f"⚠️ [{label}] Documento não encontrado ou inválido (HTTP {result.http_status})")
+        else:
+            print(f"❌ [{label}] Erro ao baixar: {result.error}")
+
+    def sync(self, params: dict, incremental=False):
+        """
+        Runs ``download`` with ``params`` while keeping the entity's checkpoint up to date.
+
+        In incremental mode an interrupted run is resumed from its own start, skipping
+        the units it already completed, and otherwise the run starts right after the
+        high-water mark (or, before the first checkpointed run, after the newest
+        document in the manifest).
+
+        Args:
+            params (dict): Keyword arguments of ``download``, as built by ``build_params``.
+            incremental (bool): Only fetches what previous runs have not covered.
+        """
+        kind = "number" if "start_num" in params else "date"
+        start_key, end_key = ("start_num", "end_num") if kind == "number" else ("start_date", "end_date")
+        params = dict(params)
+
+        resume = None
+        if incremental:
+            resume = self.checkpoint.pending_run()
+            if resume is not None and resume.kind == kind:
+                params[start_key] = resume.start
+                print(f"♻️ Retomando execução interrompida desde {resume.start} ({len(resume.done)} já concluídos)")
+            else:
+                resume = None
+                high_water = self.checkpoint.high_water(kind) or self._manifest_high_water(kind)
+                if high_water is not None:
+                    params[start_key] = next_unit(high_water)
+                    print(f"⏩ Modo incremental: continuando após {high_water}")
+
+            end = params.get(end_key)
+            if end is not None and params[start_key] > end:
+                print("✅ Nada novo desde a última execução")
+                return
+
+        self.checkpoint.begin(kind, params[start_key], params.get(end_key), resume)
+        run = self.checkpoint.run
+        if run.end is not None:
+            span = run.end - run.start
+            self.progress = metrics.progress("download", (span.days if kind == "date" else span) + 1, self.entity)
+        try:
+            self.download(**params)
+        except BaseException:
+            self.checkpoint.abort()
+            raise
+        self.checkpoint.finish()
+
+    def _manifest_high_water(self, kind: str):
+        if kind == "number":
+            numbers = [int(n) for n in self.manifest.editions(self.entity) if str(n).isdigit()]
+            return max(numbers, default=None)
+        dates = self.manifest.dates(self.entity)
+        return date.fromisoformat(max(dates)) if dates else None
+
     def download(self, *args, **kwargs):
         raise NotImplementedError("Você deve implementar o método `download`.")
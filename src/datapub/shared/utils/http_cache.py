@@ -0,0 +1,167 @@
+import os
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Optional
+
+import requests
+
+from datapub.shared.utils.download import stream_to_file
+
+DEFAULT_MAX_BYTES = int(os.environ.get("DATAPUB_HTTP_CACHE_MB", "256")) * 1024 * 1024
+DEFAULT_MAX_ENTRIES = int(os.environ.get("DATAPUB_HTTP_CACHE_ENTRIES", "200000"))
+
+
+class HttpCache:
+    """
+    Conditional-request cache backed by the ``cache_http`` table of the manifest.
+
+    For every URL it remembers the ETag, Last-Modified and Content-Length of the
+    last 200 response and where the body lives on disk: either a downloaded
+    document (owned by the extractor) or a small body such as a listing page, which
+    the cache keeps itself under ``cache_dir``. Re-fetching a known URL sends
+    ``If-None-Match``/``If-Modified-Since`` and a 304 costs only the headers; when a
+    server offers no validators, a HEAD comparing Content-Length stands in for them
+    (see :meth:`same_length`).
+
+    Entries are evicted least recently used first once the bodies kept by the cache
+    exceed ``max_bytes`` or the table exceeds ``max_entries``; entries whose file
+    has disappeared are dropped on the same pass.
+
+    Args:
+        manifest (Manifest): Manifest of the storage root.
+        cache_dir (Path): Folder for the bodies owned by the cache.
+        max_bytes (int): Budget for the bodies owned by the cache.
+        max_entries (int): Budget for the number of URLs remembered.
+    """
+
+    def __init__(self, manifest, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MAX_ENTRIES):
+        self.manifest = manifest
+        self.cache_dir = Path(cache_dir) if cache_dir else manifest.path.parent / "cache" / "http"
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._added_bytes = 0
+        self._lock = threading.Lock()
+
+    # ---- Validadores ----
+
+    def entry(self, url: str) -> Optional[dict]:
+        """Cache entry of ``url`` whose body is still on disk."""
+        entry = self.manifest.cache_entry(url)
+        if entry and entry["caminho_local"] and Path(entry["caminho_local"]).exists():
+            return entry
+        return None
+
+    @staticmethod
+    def conditional_headers(entry: Optional[dict]) -> dict:
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def remember(self, url: str, response, path, size: int = None, owned=False):
+        """Stores the validators of a 200 ``response`` whose body was saved at ``path``."""
+        length = response.headers.get("Content-Length")
+        now = datetime.now().isoformat()
+        self.manifest.put_cache_entry({
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "tamanho_bytes": size if size is not None else (int(length) if length and length.isdigit() else None),
+            "caminho_local": str(path),
+            "corpo_em_cache": int(owned),
+            "validado_em": now,
+            "usado_em": now,
+        })
+        if owned and size:
+            with self._lock:
+                self._added_bytes += size
+                over_budget = self._added_bytes > self.max_bytes // 10
+            if over_budget:
+                self.evict()
+
+    def relocate(self, url: str, path):
+        """Points the entry of ``url`` at ``path`` after the extractor moved the downloaded file."""
+        entry = self.manifest.cache_entry(url)
+        if entry:
+            entry["caminho_local"] = str(path)
+            self.manifest.put_cache_entry(entry)
+
+    def touch(self, url: str):
+        self.manifest.touch_cache_entry(url)
+
+    def same_length(self, session, url: str, entry: dict, timeout=30, headers=None) -> Optional[bool]:
+        """
+        Re-validates, with a HEAD, an entry whose server sent no ETag or Last-Modified.
+
+        Returns:
+            bool | None: Whether the Content-Length is still the one stored, or ``None``
+            when there is no length to compare.
+        """
+        if not entry.get("tamanho_bytes"):
+            return None
+        response = session.head(url, headers=headers, timeout=timeout, allow_redirects=True)
+        length = response.headers.get("Content-Length")
+        if response.status_code != 200 or not length or not length.isdigit():
+            return None
+        unchanged = int(length) == entry["tamanho_bytes"]
+        if unchanged:
+            self.touch(url)
+        return unchanged
+
+    # ---- Corpos pequenos (páginas de listagem, APIs) ----
+
+    def get(self, session, url: str, params=None, timeout=None, **kwargs):
+        """
+        ``session.get`` that answers from the cache when the server replies 304.
+
+        The body of every 200 response is kept under ``cache_dir``; a 304 is turned
+        into a 200 response carrying the cached body, flagged with ``from_cache``.
+        """
+        url = requests.Request("GET", url, params=params).prepare().url
+        entry = self.entry(url)
+        headers = {**(kwargs.pop("headers", None) or {}), **self.conditional_headers(entry)}
+
+        response = session.get(url, headers=headers, timeout=timeout, **kwargs)
+        response.from_cache = False
+
+        if response.status_code == 304 and entry:
+            response.status_code = 200
+            response._content = Path(entry["caminho_local"]).read_bytes()
+            response.from_cache = True
+            self.touch(url)
+        elif response.status_code == 200:
+            body_path = self.cache_dir / hashlib.sha1(url.encode()).hexdigest()
+            stream_to_file([response.content], body_path, expect_magic=None)
+            self.remember(url, response, body_path, size=len(response.content), owned=True)
+        return response
+
+    # ---- Expiração ----
+
+    def evict(self) -> int:
+        """Drops stale entries and least recently used bodies over budget; returns how many."""
+        with self._lock:
+            self._added_bytes = 0
+
+        entries = self.manifest.cache_entries()
+        alive, gone = [], []
+        for e in entries:
+            (alive if e["caminho_local"] and Path(e["caminho_local"]).exists() else gone).append(e)
+
+        owned_bytes = sum(e["tamanho_bytes"] or 0 for e in alive if e["corpo_em_cache"])
+        evicted = []
+        for e in alive:
+            if owned_bytes <= self.max_bytes and len(alive) - len(evicted) <= self.max_entries:
+                break
+            if e["corpo_em_cache"]:
+                Path(e["caminho_local"]).unlink(missing_ok=True)
+                owned_bytes -= e["tamanho_bytes"] or 0
+            elif owned_bytes > self.max_bytes and len(alive) - len(evicted) <= self.max_entries:
+                continue  # só o corpo próprio conta para o orçamento em bytes
+            evicted.append(e)
+
+        self.manifest.delete_cache_entries(e["url"] for e in gone + evicted)
+        return len(gone) + len(evicted)
@@ -0,0 +1,164 @@
+"""
+Keep-alive HTTP client owned by each extractor.
+
+:func:`build_session` returns one ``requests.Session`` for everything an
+extractor sends over HTTP: listing pages, APIs and the document transfers of
+the download engine. Connections are kept alive in a pool per host sized to the
+transfers allowed on that host, so a backfill pays one TCP/TLS handshake per
+connection instead of one per document. Every request carries the same
+user-agent, goes through the entity's rate limiter and, unless the caller passes
+its own, gets the same timeout.
+
+With ``http2=True`` the transfers go through ``httpx`` (``pip install
+httpx[http2]``), imported only then, and share multiplexed HTTP/2 connections
+with portals that offer them; the session API stays the same.
+"""
+
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from datapub import __version__
+from datapub.shared.utils.rate_limit import RateLimitedAdapter, RateLimiter
+
+DEFAULT_TIMEOUT = 30.0
+USER_AGENT = f"datapub/{__version__} (+https://github.com/dadoaberto/datapub)"
+# Cabeçalhos de conexão do HTTP/1.1 que o HTTP/2 proíbe
+HOP_BY_HOP = ("connection", "keep-alive", "proxy-connection", "transfer-encoding", "upgrade")
+
+
+class PooledAdapter(RateLimitedAdapter):
+    """Rate-limited adapter with a keep-alive pool and a default timeout."""
+
+    def __init__(self, limiter: RateLimiter, timeout: float = DEFAULT_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(limiter, **kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=self.timeout if timeout is None else timeout, **kwargs)
+
+
+class _HttpxBody:
+    """File-like view of an ``httpx`` response body, read by ``Response.iter_content``."""
+
+    def __init__(self, response):
+        self._response = response
+        self._chunks = response.iter_bytes()
+        self._buffer = b""
+
+    def read(self, size=-1, **kwargs):
+        while size is None or size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size is None or size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def close(self):
+        self._response.close()
+
+
+class Http2Transport(HTTPAdapter):
+    """Sends through an ``httpx`` client with HTTP/2 and hands back a ``requests`` response."""
+
+    def __init__(self, *args, **kwargs):
+        import httpx  # noqa: F401 - falha cedo, na montagem da sessão, se o extra não estiver instalado
+
+        self._client = None
+        self._client_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _httpx_client(self, verify):
+        import httpx
+
+        with self._client_lock:
+            if self._client is None:
+                size = self._pool_maxsize
+                limits = httpx.Limits(max_connections=size, max_keepalive_connections=size)
+                self._client = httpx.Client(http2=True, limits=limits, verify=verify)
+            return self._client
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        import httpx
+
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        client = self._httpx_client(verify)
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP}
+        outgoing = client.build_request(
+            request.method, request.url, headers=headers, content=request.body, timeout=timeout
+        )
+        try:
+            incoming = client.send(outgoing, stream=True)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(e, request=request)
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(e, request=request)
+
+        response = requests.Response()
+        response.status_code = incoming.status_code
+        response.headers = CaseInsensitiveDict(incoming.headers.items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = _HttpxBody(incoming)
+        response.reason = incoming.reason_phrase
+        response.url = str(incoming.url)
+        response.request = request
+        response.connection = self
+        if not stream:
+            response.content  # noqa: B018 - lê o corpo e devolve a conexão ao pool
+        return response
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        super().close()
+
+
+class Http2Adapter(PooledAdapter, Http2Transport):
+    """:class:`PooledAdapter` whose transfers go over HTTP/2."""
+
+
+def build_session(
+    limiter: RateLimiter,
+    pool_maxsize: int = 3,
+    host_pools: Optional[Dict[str, int]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    user_agent: str = USER_AGENT,
+    http2: bool = False,
+) -> requests.Session:
+    """
+    Keep-alive session with a connection pool per host and the common request policy.
+
+    Args:
+        limiter (RateLimiter): Rate limiter every request goes through.
+        pool_maxsize (int): Connections kept alive per host.
+        host_pools (dict): Overrides of ``pool_maxsize`` keyed by hostname.
+        timeout (float): Seconds of every request that does not pass its own timeout.
+        user_agent (str): ``User-Agent`` header of every request.
+        http2 (bool): Uses HTTP/2 through ``httpx`` (must be installed).
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    adapter_class = Http2Adapter if http2 else PooledAdapter
+    session = requests.Session()
+    session.headers["User-Agent"] = user_agent
+
+    adapter = adapter_class(limiter, timeout=timeout, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # Prefixos mais longos têm precedência: cada host listado ganha um pool do seu tamanho
+    for host, size in (host_pools or {}).items():
+        host_adapter = adapter_class(limiter, timeout=timeout, pool_maxsize=size)
+        session.mount(f"http://{host}/", host_adapter)
+        session.mount(f"https://{host}/", host_adapter)
+    return session
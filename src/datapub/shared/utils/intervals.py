@@ -0,0 +1,59 @@
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+
+class DateIntervalIndex:
+    """
+    Sorted set of disjoint, closed date intervals with logarithmic membership tests.
+
+    Overlapping or adjacent intervals are merged on insertion, so ``contains`` is a
+    single binary search over the interval starts no matter how many files were added.
+    """
+
+    def __init__(self, intervals=()):
+        self._starts = []
+        self._ends = []
+        self._lock = threading.Lock()
+        for start, end in intervals:
+            self.add(start, end)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        return iter(list(zip(self._starts, self._ends)))
+
+    def add(self, start: date, end: date = None):
+        """Marks ``[start, end]`` (or the single day ``start``) as covered."""
+        end = end or start
+        if end < start:
+            start, end = end, start
+
+        with self._lock:
+            # Primeiro intervalo que termina a partir da véspera de `start` (adjacência conta)
+            lo = bisect_left(self._ends, start - timedelta(days=1))
+            # Intervalos que começam até o dia seguinte a `end` se fundem com o novo
+            hi = bisect_right(self._starts, end + timedelta(days=1))
+
+            if lo < hi:
+                start = min(start, self._starts[lo])
+                end = max(end, self._ends[hi - 1])
+
+            self._starts[lo:hi] = [start]
+            self._ends[lo:hi] = [end]
+
+    def contains(self, day: date) -> bool:
+        with self._lock:
+            i = bisect_right(self._starts, day) - 1
+            return i >= 0 and day <= self._ends[i]
+
+    __contains__ = contains
+
+    def find(self, day: date):
+        """Returns the covering ``(start, end)`` interval, or ``None``."""
+        with self._lock:
+            i = bisect_right(self._starts, day) - 1
+            if i >= 0 and day <= self._ends[i]:
+                return self._starts[i], self._ends[i]
+        return None
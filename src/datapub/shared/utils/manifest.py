@@ -0,0 +1,357 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import date, datetime
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+MANIFEST_FILENAME = "manifest.sqlite3"
+
+COLUMNS = (
+    "entity",
+    "data_publicacao",
+    "numero_edicao",
+    "url_origem",
+    "caminho_local",
+    "tamanho_bytes",
+    "hash_md5",
+    "hash_sha256",
+    "data_download",
+    "status",
+    "extra",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documentos (
+    id INTEGER PRIMARY KEY,
+    entity TEXT NOT NULL,
+    data_publicacao TEXT,
+    numero_edicao TEXT,
+    url_origem TEXT,
+    caminho_local TEXT NOT NULL,
+    tamanho_bytes INTEGER,
+    hash_md5 TEXT,
+    hash_sha256 TEXT,
+    data_download TEXT,
+    status TEXT NOT NULL DEFAULT 'sucesso',
+    extra TEXT,
+    UNIQUE (entity, caminho_local)
+);
+CREATE INDEX IF NOT EXISTS idx_documentos_data ON documentos (entity, data_publicacao);
+CREATE INDEX IF NOT EXISTS idx_documentos_edicao ON documentos (entity, numero_edicao);
+CREATE INDEX IF NOT EXISTS idx_documentos_url ON documentos (url_origem);
+CREATE INDEX IF NOT EXISTS idx_documentos_md5 ON documentos (hash_md5);
+CREATE INDEX IF NOT EXISTS idx_documentos_sha256 ON documentos (hash_sha256);
+CREATE TABLE IF NOT EXISTS cache_http (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    tamanho_bytes INTEGER,
+    caminho_local TEXT,
+    corpo_em_cache INTEGER NOT NULL DEFAULT 0,
+    validado_em TEXT,
+    usado_em TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_cache_http_uso ON cache_http (usado_em);
+CREATE TABLE IF NOT EXISTS etapas (
+    etapa TEXT NOT NULL,
+    hash_sha256 TEXT NOT NULL,
+    concluido_em TEXT,
+    PRIMARY KEY (etapa, hash_sha256)
+);
+"""
+
+CACHE_COLUMNS = (
+    "url",
+    "etag",
+    "last_modified",
+    "tamanho_bytes",
+    "caminho_local",
+    "corpo_em_cache",
+    "validado_em",
+    "usado_em",
+)
+
+# Chaves dos JSON de metadados legados que têm coluna própria no manifesto
+_LEGACY_KEYS = {
+    "entity": "entity",
+    "orgao": "entity",
+    "data_publicacao": "data_publicacao",
+    "numero_diario": "numero_edicao",
+    "url_origem": "url_origem",
+    "caminho_local": "caminho_local",
+    "tamanho_bytes": "tamanho_bytes",
+    "hash_md5": "hash_md5",
+    "data_download": "data_download",
+    "status": "status",
+}
+
+# Nomes de órgão gravados pelos extratores antigos que diferem do código da entidade
+_LEGACY_ENTITIES = {"MS": "ALMS", "ALEPA": "ALPA"}
+
+
+def _as_text(value):
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class Manifest:
+    """
+    Indexed catalog of every downloaded document under one storage root.
+
+    A single SQLite file (``<root>/manifest.sqlite3``) holds one row per local file,
+    indexed by entity + publication date, entity + edition number, source URL and
+    hashes, so "do we already have X?" is an index lookup instead of a directory walk.
+    Writes can be grouped with :meth:`batch`, which commits them in one transaction.
+
+    Args:
+        path (Path): SQLite file, or a storage root directory that will hold it.
+    """
+
+    def __init__(self, path):
+        path = Path(path)
+        if path.is_dir() or not path.suffix:
+            path = path / MANIFEST_FILENAME
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.RLock()
+        self._pending = []
+        self._batch_size = None
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    # ---- Escrita ----
+
+    def add(self, record: dict):
+        """Inserts or updates one record; buffered while inside :meth:`batch`."""
+        with self._lock:
+            self._pending.append(self._to_row(record))
+            if self._batch_size is None or len(self._pending) >= self._batch_size:
+                self.flush()
+
+    def add_many(self, records: Iterable[dict]):
+        """Inserts or updates many records in a single transaction."""
+        with self._lock:
+            self._pending.extend(self._to_row(r) for r in records)
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            rows, self._pending = self._pending, []
+            placeholders = ", ".join("?" for _ in COLUMNS)
+            updates = ", ".join(f"{c} = excluded.{c}" for c in COLUMNS if c not in ("entity", "caminho_local"))
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT INTO documentos ({', '.join(COLUMNS)}) VALUES ({placeholders}) "
+                    f"ON CONFLICT (entity, caminho_local) DO UPDATE SET {updates}",
+                    rows,
+                )
+
+    @contextmanager
+    def batch(self, size: int = 500):
+        """Buffers :meth:`add` calls and commits them every ``size`` records and on exit."""
+        with self._lock:
+            previous, self._batch_size = self._batch_size, size
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_size = previous
+                self.flush()
+
+    def _to_row(self, record: dict):
+        record = dict(record)
+        extra = record.pop("extra", None) or {}
+        known = {c: _as_text(record.pop(c)) for c in COLUMNS if c in record}
+        extra.update(record)
+
+        if not known.get("entity") or not known.get("caminho_local"):
+            raise ValueError("Registros do manifesto precisam de 'entity' e 'caminho_local'")
+        if known.get("numero_edicao") is not None:
+            known["numero_edicao"] = str(known["numero_edicao"])
+        known.setdefault("status", "sucesso")
+        known["extra"] = json.dumps(extra, ensure_ascii=False, default=str) if extra else None
+        return tuple(known.get(c) for c in COLUMNS)
+
+    # ---- Consulta ----
+
+    def _query(self, sql: str, params=()):
+        with self._lock:
+            self.flush()
+            return self._conn.execute(sql, params).fetchall()
+
+    def has_date(self, entity: str, day) -> bool:
+        return bool(self._query(
+            "SELECT 1 FROM documentos WHERE entity = ? AND data_publicacao = ? AND status = 'sucesso' LIMIT 1",
+            (entity, _as_text(day)),
+        ))
+
+    def has_edition(self, entity: str, numero) -> bool:
+        return bool(self._query(
+            "SELECT 1 FROM documentos WHERE entity = ? AND numero_edicao = ? AND status = 'sucesso' LIMIT 1",
+            (entity, str(numero)),
+        ))
+
+    def has_url(self, url: str) -> bool:
+        return bool(self._query("SELECT 1 FROM documentos WHERE url_origem = ? LIMIT 1", (url,)))
+
+    def find_by_hash(self, digest: str) -> list:
+        """Returns the records whose MD5 or SHA-256 equals ``digest``."""
+        column = "hash_sha256" if len(digest) == 64 else "hash_md5"
+        return [self._to_record(r) for r in self._query(f"SELECT * FROM documentos WHERE {column} = ?", (digest,))]
+
+    def dates(self, entity: str) -> set:
+        """Publication dates already held for ``entity``, as ISO strings."""
+        rows = self._query(
+            "SELECT DISTINCT data_publicacao FROM documentos "
+            "WHERE entity = ? AND status = 'sucesso' AND data_publicacao IS NOT NULL",
+            (entity,),
+        )
+        return {r[0][:10] for r in rows}
+
+    def editions(self, entity: str) -> set:
+        rows = self._query(
+            "SELECT DISTINCT numero_edicao FROM documentos "
+            "WHERE entity = ? AND status = 'sucesso' AND numero_edicao IS NOT NULL",
+            (entity,),
+        )
+        return {r[0] for r in rows}
+
+    def documents(self, entity: Optional[str] = None) -> Iterator[dict]:
+        """Iterates over every record, optionally restricted to one entity."""
+        sql, params = "SELECT * FROM documentos", ()
+        if entity:
+            sql, params = sql + " WHERE entity = ?", (entity,)
+        sql += " ORDER BY entity, data_publicacao, numero_edicao"
+        for row in self._query(sql, params):
+            yield self._to_record(row)
+
+    def contents(self, entity: Optional[str] = None) -> Iterator[dict]:
+        """One record per distinct SHA-256, so downstream stages handle duplicate bytes once."""
+        sql = (
+            "SELECT * FROM documentos WHERE id IN ("
+            "SELECT MIN(id) FROM documentos WHERE status = 'sucesso' AND hash_sha256 IS NOT NULL{} "
+            "GROUP BY hash_sha256) ORDER BY entity, data_publicacao, numero_edicao"
+        )
+        if entity:
+            rows = self._query(sql.format(" AND entity = ?"), (entity,))
+        else:
+            rows = self._query(sql.format(""))
+        for row in rows:
+            yield self._to_record(row)
+
+    def pending_contents(self, stage: str, entity: Optional[str] = None) -> Iterator[dict]:
+        """Like :meth:`contents`, skipping the contents already marked done for ``stage``."""
+        done = {r[0] for r in self._query("SELECT hash_sha256 FROM etapas WHERE etapa = ?", (stage,))}
+        for record in self.contents(entity):
+            if record["hash_sha256"] not in done:
+                yield record
+
+    def mark_done(self, stage: str, hashes: Iterable[str]):
+        """Records that ``stage`` finished for these contents, so a rerun resumes after them."""
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO etapas (etapa, hash_sha256, concluido_em) VALUES (?, ?, ?)",
+                ((stage, h, now) for h in hashes),
+            )
+
+    def reset_stage(self, stage: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM etapas WHERE etapa = ?", (stage,))
+
+    def count(self, entity: Optional[str] = None) -> int:
+        if entity:
+            return self._query("SELECT COUNT(*) FROM documentos WHERE entity = ?", (entity,))[0][0]
+        return self._query("SELECT COUNT(*) FROM documentos")[0][0]
+
+    @staticmethod
+    def _to_record(row) -> dict:
+        record = dict(row)
+        extra = record.pop("extra")
+        record["extra"] = json.loads(extra) if extra else {}
+        return record
+
+    # ---- Cache HTTP ----
+
+    def cache_entry(self, url: str) -> Optional[dict]:
+        """Validators (ETag, Last-Modified, length) last seen for ``url``, if any."""
+        rows = self._query("SELECT * FROM cache_http WHERE url = ?", (url,))
+        return dict(rows[0]) if rows else None
+
+    def cache_entries(self) -> list:
+        """Every cache entry, least recently used first."""
+        return [dict(r) for r in self._query("SELECT * FROM cache_http ORDER BY usado_em")]
+
+    def put_cache_entry(self, entry: dict):
+        row = tuple(entry.get(c) for c in CACHE_COLUMNS)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO cache_http ({', '.join(CACHE_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in CACHE_COLUMNS)})",
+                row,
+            )
+
+    def touch_cache_entry(self, url: str):
+        with self._lock, self._conn:
+            now = datetime.now().isoformat()
+            self._conn.execute("UPDATE cache_http SET validado_em = ?, usado_em = ? WHERE url = ?", (now, now, url))
+
+    def delete_cache_entries(self, urls: Iterable[str]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM cache_http WHERE url = ?", ((u,) for u in urls))
+
+    # ---- Migração ----
+
+    def import_json_dir(self, metadata_dir, entity: Optional[str] = None, batch_size: int = 1000) -> int:
+        """
+        Imports the legacy ``metadata_*.json`` files of a ``metadata/`` folder.
+
+        Args:
+            metadata_dir (Path): Folder with the per-file JSON metadata.
+            entity (str): Entity to record, overriding the ``entity``/``orgao`` of the files.
+
+        Returns:
+            int: Number of records imported.
+        """
+        imported = 0
+        with self.batch(batch_size):
+            for path in sorted(Path(metadata_dir).glob("metadata_*.json")):
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        legacy = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ Metadado ilegível ignorado: {path.name} ({e})")
+                    continue
+
+                record = {"extra": {}}
+                for key, value in legacy.items():
+                    if key in _LEGACY_KEYS:
+                        record[_LEGACY_KEYS[key]] = value
+                    else:
+                        record["extra"][key] = value
+                if entity:
+                    record["entity"] = entity
+                elif record.get("entity") in _LEGACY_ENTITIES:
+                    record["entity"] = _LEGACY_ENTITIES[record["entity"]]
+                if record.get("data_publicacao"):
+                    record["data_publicacao"] = record["data_publicacao"][:10]
+
+                self.add(record)
+                imported += 1
+        return imported
@@ -0,0 +1,315 @@
+"""
+Timed spans and counters per stage and entity, exported as JSON lines and Prometheus text.
+
+Instrumented code calls the module-level :data:`metrics`::
+
+    with metrics.span("fetch", "ALGO"):
+        ...
+    metrics.count("downloads", entity="ALGO", status="sucesso")
+
+Until :meth:`Metrics.configure` is called (the CLI's ``--metrics``) or
+``$DATAPUB_METRICS`` names a file, ``span`` hands back one shared no-op context
+manager and ``count`` returns right away, so the instrumentation costs one
+attribute check. Once enabled, every span is appended to the JSON lines file and
+each process adds a ``resumo`` line with its totals when it exits. The process
+that configured the run merges the summaries of its workers (same ``execucao``)
+into the Prometheus file and the summary table.
+"""
+
+import os
+import json
+import time
+import uuid
+import atexit
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+ENV_PATH = "DATAPUB_METRICS"
+ENV_RUN = "DATAPUB_METRICS_RUN"
+# Intervalo mínimo entre duas linhas de progresso
+PROGRESS_EVERY = 30.0
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _NoopProgress:
+    done = total = 0
+
+    def update(self, done):
+        pass
+
+    def advance(self, n=1):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_NOOP_PROGRESS = _NoopProgress()
+
+
+class _Span:
+    __slots__ = ("metrics", "stage", "entity", "started")
+
+    def __init__(self, metrics, stage, entity):
+        self.metrics = metrics
+        self.stage = stage
+        self.entity = entity
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, self.entity, time.perf_counter() - self.started)
+        return False
+
+
+class Progress:
+    """
+    Done/total of a long run with its rate and ETA, reported at most every ``PROGRESS_EVERY`` seconds.
+
+    Args:
+        metrics (Metrics): Where the progress lines are written.
+        name (str): What is being counted (e.g. ``"download"``).
+        total (int): Units expected; ``None`` when unknown (no percentage or ETA).
+        entity (str): Entity the units belong to.
+    """
+
+    def __init__(self, metrics, name: str, total: Optional[int], entity: str = ""):
+        self.metrics = metrics
+        self.name = name
+        self.total = total
+        self.entity = entity
+        self.done = 0
+        self.started = time.monotonic()
+        self._reported = self.started
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[timedelta]:
+        if not self.total or not self.rate or self.done >= self.total:
+            return None
+        return timedelta(seconds=round((self.total - self.done) / self.rate))
+
+    def update(self, done: int):
+        self.done = done
+        now = time.monotonic()
+        if now - self._reported >= PROGRESS_EVERY or (self.total and done >= self.total):
+            self._reported = now
+            print(f"⏳ {self}")
+            self.metrics.event(
+                "progresso", etapa=self.name, entidade=self.entity, feitos=done, total=self.total, por_segundo=self.rate
+            )
+
+    def advance(self, n: int = 1):
+        self.update(self.done + n)
+
+    def __str__(self):
+        label = f"{self.entity} {self.name}".strip()
+        if not self.total:
+            return f"{label}: {self.done} · {self.rate:.2f}/s"
+        eta = f" · faltam {self.eta}" if self.eta else ""
+        return f"{label}: {self.done}/{self.total} ({100 * self.done / self.total:.0f}%) · {self.rate:.2f}/s{eta}"
+
+
+class Metrics:
+    """Aggregates spans and counters of this process; see the module docstring."""
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.prometheus_path = None
+        self.run_id = None
+        self._owner = False
+        self._lock = threading.Lock()
+        self._file = None
+        # (etapa, entidade) -> [quantidade, segundos, maior]
+        self._spans: Dict[Tuple[str, str], list] = {}
+        # (nome, entidade, rótulos) -> valor
+        self._counters: Dict[Tuple[str, str, Tuple], float] = {}
+
+    def configure(self, path=None, prometheus=None, run_id=None):
+        """
+        Enables the metrics of this process.
+
+        Args:
+            path (Path): JSON lines file the spans and summaries are appended to.
+            prometheus (Path): Text file written by :meth:`close` in Prometheus format.
+            run_id (str): Id shared with worker processes; a new one makes this process the owner.
+        """
+        self.enabled = True
+        self.path = str(path) if path else None
+        self.prometheus_path = str(prometheus) if prometheus else None
+        self._owner = run_id is None
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        if self.path:
+            # Processos filhos (spawn) herdam o ambiente e se configuram sozinhos
+            os.environ[ENV_PATH] = self.path
+            os.environ[ENV_RUN] = self.run_id
+            # Uma escrita por linha: vários processos acrescentam ao mesmo arquivo
+            self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+        atexit.register(self.close)
+
+    def span(self, stage: str, entity: str = ""):
+        """Context manager timing one occurrence of ``stage`` for ``entity``."""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, stage, entity or "")
+
+    def observe(self, stage: str, entity: str, seconds: float):
+        key = (stage, entity or "")
+        with self._lock:
+            totals = self._spans.get(key)
+            if totals is None:
+                totals = self._spans[key] = [0, 0.0, 0.0]
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+        self.event("span", etapa=stage, entidade=entity, segundos=round(seconds, 6))
+
+    def count(self, name: str, value: float = 1, entity: str = "", **labels):
+        if not self.enabled:
+            return
+        key = (name, entity or "", tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def progress(self, name: str, total: Optional[int] = None, entity: str = ""):
+        """A :class:`Progress` for ``total`` units, or a no-op when disabled."""
+        if not self.enabled:
+            return _NOOP_PROGRESS
+        return Progress(self, name, total, entity)
+
+    def event(self, kind: str, **fields):
+        if self._file is None:
+            return
+        line = json.dumps(
+            {"ts": datetime.now().isoformat(), "execucao": self.run_id, "pid": os.getpid(), "tipo": kind, **fields},
+            ensure_ascii=False,
+        )
+        with self._lock:
+            self._file.write(line + "\n")
+
+    # ---- Exportação ----
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "spans": [[stage, entity, *totals] for (stage, entity), totals in self._spans.items()],
+                "contadores": [
+                    [name, entity, dict(labels), value] for (name, entity, labels), value in self._counters.items()
+                ],
+            }
+
+    def merged(self) -> dict:
+        """This process's totals plus the ``resumo`` lines of the workers of the same run."""
+        spans, counters = {}, {}
+
+        def add(snapshot):
+            for stage, entity, n, total, longest in snapshot["spans"]:
+                current = spans.setdefault((stage, entity), [0, 0.0, 0.0])
+                current[0] += n
+                current[1] += total
+                current[2] = max(current[2], longest)
+            for name, entity, labels, value in snapshot["contadores"]:
+                key = (name, entity, tuple(sorted(labels.items())))
+                counters[key] = counters.get(key, 0) + value
+
+        add(self.snapshot())
+        if self.path and os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if f'"{self.run_id}"' not in line or '"resumo"' not in line:
+                        continue
+                    entry = json.loads(line)
+                    if entry["tipo"] == "resumo" and entry["pid"] != os.getpid():
+                        add(entry)
+        return {"spans": spans, "contadores": counters}
+
+    def prometheus_text(self, merged: dict = None) -> str:
+        merged = merged or self.merged()
+        lines = [
+            "# HELP datapub_stage_seconds Time spent in each stage, per entity.",
+            "# TYPE datapub_stage_seconds summary",
+        ]
+        for (stage, entity), (n, total, _) in sorted(merged["spans"].items()):
+            labels = _labels(stage=stage, entity=entity)
+            lines.append(f"datapub_stage_seconds_count{labels} {n}")
+            lines.append(f"datapub_stage_seconds_sum{labels} {total:.6f}")
+        lines += [
+            "# HELP datapub_stage_seconds_max Longest occurrence of each stage.",
+            "# TYPE datapub_stage_seconds_max gauge",
+        ]
+        for (stage, entity), (_, _, longest) in sorted(merged["spans"].items()):
+            lines.append(f"datapub_stage_seconds_max{_labels(stage=stage, entity=entity)} {longest:.6f}")
+
+        names = sorted({name for name, _, _ in merged["contadores"]})
+        for name in names:
+            metric = f"datapub_{name}_total"
+            lines += [f"# TYPE {metric} counter"]
+            for (counter, entity, labels), value in sorted(merged["contadores"].items()):
+                if counter == name:
+                    lines.append(f"{metric}{_labels(entity=entity, **dict(labels))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, merged: dict = None) -> str:
+        """Table of the stages ordered by total time, the bottleneck first."""
+        merged = merged or self.merged()
+        rows = [f"  {'etapa':<14} {'entidade':<10} {'n':>7} {'total s':>9} {'média ms':>9} {'máx ms':>9}"]
+        for (stage, entity), (n, total, longest) in sorted(merged["spans"].items(), key=lambda i: -i[1][1]):
+            mean, longest = 1000 * total / n, 1000 * longest
+            rows.append(f"  {stage:<14} {entity or '-':<10} {n:>7} {total:>9.2f} {mean:>9.1f} {longest:>9.1f}")
+        for (name, entity, labels), value in sorted(merged["contadores"].items()):
+            detail = ", ".join(f"{k}={v}" for k, v in labels)
+            rows.append(f"  {name:<14} {entity or '-':<10} {_number(value):>7}  {detail}")
+        return "\n".join(rows)
+
+    def close(self):
+        """Writes this process's ``resumo`` line and, in the owner process, the Prometheus file and summary."""
+        if not self.enabled:
+            return
+        snapshot = self.snapshot()
+        if snapshot["spans"] or snapshot["contadores"]:
+            self.event("resumo", **snapshot)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._owner:
+            merged = self.merged()
+            if self.prometheus_path:
+                with open(self.prometheus_path, "w", encoding="utf-8") as f:
+                    f.write(self.prometheus_text(merged))
+            if merged["spans"] or merged["contadores"]:
+                print("\n⏱️ Tempo por etapa")
+                print(self.summary(merged))
+        self.enabled = False
+
+
+def _number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    pairs = [f'{key}="{_escape(value)}"' for key, value in labels.items() if value]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+metrics = Metrics()
+
+if os.environ.get(ENV_PATH):
+    # Processo filho de uma execução com métricas
+    metrics.configure(os.environ[ENV_PATH], run_id=os.environ.get(ENV_RUN))
@@ -0,0 +1,170 @@
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Iterable, List
+
+# Feriados nacionais de data fixa (mês, dia)
+FIXED_HOLIDAYS = (
+    (1, 1),    # Confraternização Universal
+    (4, 21),   # Tiradentes
+    (5, 1),    # Dia do Trabalho
+    (9, 7),    # Independência
+    (10, 12),  # Nossa Senhora Aparecida
+    (11, 2),   # Finados
+    (11, 15),  # Proclamação da República
+    (12, 25),  # Natal
+)
+
+# Feriados móveis, em dias a partir do domingo de Páscoa
+EASTER_OFFSETS = (
+    -48,  # Segunda de Carnaval
+    -47,  # Terça de Carnaval
+    -2,   # Sexta-feira Santa
+    60,   # Corpus Christi
+)
+
+
+def _season(day: date) -> tuple:
+    """Half-month slot of ``day``, the unit of the gap model (recessos, férias coletivas)."""
+    return day.month, day.day > 15
+
+
+def _as_date(day) -> date:
+    return day.date() if isinstance(day, datetime) else day
+
+
+def easter(year: int) -> date:
+    """Easter Sunday of ``year`` (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7  # noqa: E741
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+@lru_cache(maxsize=None)
+def brazilian_holidays(year: int) -> frozenset:
+    """National holidays and Carnival/Corpus Christi optional days of ``year``."""
+    days = {date(year, month, day) for month, day in FIXED_HOLIDAYS}
+    if year >= 2024:
+        days.add(date(year, 11, 20))  # Consciência Negra (Lei 14.759/2023)
+    sunday = easter(year)
+    days.update(sunday + timedelta(days=offset) for offset in EASTER_OFFSETS)
+    return frozenset(days)
+
+
+def is_holiday(day) -> bool:
+    day = _as_date(day)
+    return day in brazilian_holidays(day.year)
+
+
+class PublicationPlanner:
+    """
+    Orders and prunes the days a day-by-day extractor should probe.
+
+    The planner learns, from the publication dates already in the manifest, how
+    often the entity publishes on each weekday and on holidays, and in each
+    half-month of the year, which captures the typical gaps (parliamentary
+    recess in July and from late December, collective vacations) that repeat
+    every year; all rates use Laplace smoothing, so a gap seen in a single year
+    is not enough to skip it. A day's probability is the lowest of its rates.
+    Days whose estimated probability falls below ``threshold`` are skipped,
+    except for a rotating slice of them (one in ``sweep_every``) that is still
+    probed on each run, so over ``sweep_every`` runs every skipped day gets
+    checked once and the model self-corrects if the calendar changes. With less
+    than ``min_history`` publications it plans every day.
+
+    Args:
+        history (Iterable[date]): Days on which the entity is known to have published.
+        threshold (float): Minimum probability for a day to be probed on every run.
+        sweep_every (int): Improbable days are probed once every this many runs.
+        min_history (int): Publications needed before any day is skipped.
+    """
+
+    def __init__(self, history: Iterable = (), threshold=0.05, sweep_every=7, min_history=20):
+        self.history = sorted({_as_date(d) for d in history})
+        self.threshold = threshold
+        self.sweep_every = max(1, sweep_every)
+        self.min_history = min_history
+        self._weekday_rate, self._holiday_rate, self._season_rate = self._learn()
+
+    @classmethod
+    def from_manifest(cls, manifest, entity: str, **kwargs) -> "PublicationPlanner":
+        return cls((date.fromisoformat(d) for d in manifest.dates(entity)), **kwargs)
+
+    def _learn(self):
+        if len(self.history) < self.min_history:
+            return None, None, None
+
+        published = set(self.history)
+        hits = [0] * 7
+        totals = [0] * 7
+        holiday_hits = holiday_total = 0
+        # Meia-quinzena -> [publicações, dias úteis]; só dias úteis, para não diluir o recesso com fins de semana
+        seasons = {}
+
+        day = self.history[0]
+        while day <= self.history[-1]:
+            if is_holiday(day):
+                holiday_total += 1
+                holiday_hits += day in published
+            else:
+                totals[day.weekday()] += 1
+                hits[day.weekday()] += day in published
+                if day.weekday() < 5:
+                    counts = seasons.setdefault(_season(day), [0, 0])
+                    counts[0] += day in published
+                    counts[1] += 1
+            day += timedelta(days=1)
+
+        weekday_rate = [(hits[w] + 1) / (totals[w] + 2) for w in range(7)]
+        holiday_rate = (holiday_hits + 1) / (holiday_total + 2)
+        season_rate = {slot: (h + 1) / (n + 2) for slot, (h, n) in seasons.items()}
+        return weekday_rate, holiday_rate, season_rate
+
+    def probability(self, day) -> float:
+        """Estimated chance that the entity published on ``day``."""
+        if self._weekday_rate is None:
+            return 1.0
+        day = _as_date(day)
+        rate = self._weekday_rate[day.weekday()]
+        if is_holiday(day):
+            rate = min(rate, self._holiday_rate)
+        # Meias-quinzenas sem histórico não restringem nada
+        return min(rate, self._season_rate.get(_season(day), 1.0))
+
+    def plan(self, start_date, end_date, sweep=False, run_key: int = None) -> List[date]:
+        """
+        Days to probe between ``start_date`` and ``end_date``, most likely first.
+
+        Args:
+            sweep (bool): Probes every improbable day too, after the likely ones.
+            run_key (int): Selects which slice of improbable days this run sweeps;
+                defaults to the current ISO week, so consecutive weekly runs rotate.
+
+        Returns:
+            list[date]: Likely days in date order, followed by the improbable days
+            chosen for this run's sweep.
+        """
+        start_date, end_date = _as_date(start_date), _as_date(end_date)
+        days = (start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1))
+        return self.plan_days(days, sweep=sweep, run_key=run_key)
+
+    def plan_days(self, days: Iterable, sweep=False, run_key: int = None) -> List[date]:
+        """Same as :meth:`plan` for an explicit sequence of days (e.g. skipped days behind the checkpoint)."""
+        if run_key is None:
+            run_key = date.today().isocalendar()[1]
+
+        likely, swept = [], []
+        for day in sorted({_as_date(d) for d in days}):
+            if self.probability(day) >= self.threshold:
+                likely.append(day)
+            elif sweep or (day.toordinal() + run_key) % self.sweep_every == 0:
+                swept.append(day)
+
+        return likely + swept
@@ -0,0 +1,41 @@
+from typing import Callable
+
+
+def find_last(probe: Callable[[int], bool], known: int = 0, confirm: int = 2) -> int:
+    """
+    Finds the highest number for which ``probe`` is true, with galloping + binary search.
+
+    Starting just after ``known`` (a number already known to exist, or 0), the step
+    doubles until a probe fails, and the gap between the last hit and that miss is
+    then bisected. This takes O(log n) probes instead of one per number. Because
+    publication series can have holes, a miss is only accepted as the end after the
+    next ``confirm`` numbers are also missing; otherwise the search resumes from there.
+
+    Args:
+        probe (Callable[[int], bool]): Tells whether a number exists. It may be expensive,
+            so callers usually memoize it.
+        known (int): Highest number already known to exist.
+        confirm (int): How many numbers past a miss must also miss to stop.
+
+    Returns:
+        int: The last existing number, or ``known`` when nothing newer exists.
+    """
+    lo = known
+    while True:
+        step = 1
+        while probe(lo + step):
+            lo += step
+            step *= 2
+        hi = lo + step
+
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if probe(mid):
+                lo = mid
+            else:
+                hi = mid
+
+        beyond = next((n for n in range(hi + 1, hi + 1 + confirm) if probe(n)), None)
+        if beyond is None:
+            return lo
+        lo = beyond
@@ -0,0 +1,200 @@
+"""
+Adaptive per-host rate limiting for the portals (token bucket + AIMD).
+
+Each host gets a token bucket refilled at ``rate`` requests per second. Every
+response feeds the bucket back: a fast success raises the rate additively up to
+the entity's ceiling, while a 429, a 5xx, a network error or a response slower
+than ``target_latency`` halves it (at most once per second, so a burst of
+failures in flight counts as one). A ``Retry-After`` header also pauses the host.
+Fast portals then run as fast as their ceiling allows, and a struggling portal
+is backed off on its own.
+
+HTTP traffic is limited by mounting :class:`RateLimitedAdapter` on a session;
+browser-driven searches use :meth:`RateLimiter.request` around each page.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+from datapub.shared.utils.metrics import metrics
+
+# Pausas de Retry-After acima disso são limitadas (um portal não segura a execução por horas)
+MAX_RETRY_AFTER = 300.0
+
+
+@dataclass
+class HostPolicy:
+    """
+    Limits of one host.
+
+    Args:
+        rate (float): Requests per second at the start.
+        min_rate (float): Floor the rate never goes below.
+        max_rate (float): Ceiling the rate never goes above.
+        burst (int): Requests that may go out back to back.
+        target_latency (float): Responses slower than this (seconds) count as congestion.
+        increase (float): Requests per second added after each fast success.
+        decrease (float): Factor applied to the rate on congestion.
+    """
+
+    rate: float = 2.0
+    min_rate: float = 0.2
+    max_rate: float = 10.0
+    burst: int = 2
+    target_latency: float = 5.0
+    increase: float = 0.2
+    decrease: float = 0.5
+
+
+class HostLimiter:
+    """Token bucket of one host whose refill rate follows AIMD feedback."""
+
+    def __init__(self, host: str, policy: HostPolicy, entity: str = ""):
+        self.host = host
+        self.policy = policy
+        self.entity = entity
+        self.rate = min(max(policy.rate, policy.min_rate), policy.max_rate)
+        self.tokens = float(policy.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until the host may receive one more request."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.policy.burst, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def feedback(self, latency: float, status: Optional[int] = None, retry_after: Optional[float] = None):
+        """
+        Adjusts the rate after a response.
+
+        Args:
+            latency (float): Seconds until the response (or the failure).
+            status (int): HTTP status; ``None`` for a network error.
+            retry_after (float): Seconds the server asked us to wait, if any.
+        """
+        congested = status is None or status == 429 or status >= 500 or latency > self.policy.target_latency
+        with self._lock:
+            now = time.monotonic()
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + min(retry_after, MAX_RETRY_AFTER))
+            if not congested:
+                self.rate = min(self.policy.max_rate, self.rate + self.policy.increase)
+                return
+            if now - self._last_decrease < 1.0:
+                return
+            self._last_decrease = now
+            self.rate = max(self.policy.min_rate, self.rate * self.policy.decrease)
+            self.tokens = min(self.tokens, 1.0)
+        metrics.count("limitacoes", entity=self.entity, host=self.host, motivo=str(status or "rede"))
+
+
+class RateLimiter:
+    """
+    One :class:`HostLimiter` per host, created on first use.
+
+    Args:
+        policy (HostPolicy): Limits of every host not listed in ``hosts``.
+        hosts (dict): Policies of specific hostnames.
+        entity (str): Label of the throttling counters.
+    """
+
+    def __init__(self, policy: HostPolicy = None, hosts: Dict[str, HostPolicy] = None, entity: str = ""):
+        self.policy = policy or HostPolicy()
+        self.hosts = hosts or {}
+        self.entity = entity
+        self._limiters: Dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def host(self, url: str) -> HostLimiter:
+        host = urlsplit(url).hostname or ""
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = HostLimiter(host, self.hosts.get(host, self.policy), self.entity)
+            return limiter
+
+    def acquire(self, url: str):
+        self.host(url).acquire()
+
+    def feedback(self, url: str, latency: float, status: Optional[int] = None, retry_after: Optional[float] = None):
+        self.host(url).feedback(latency, status, retry_after)
+
+    @contextmanager
+    def request(self, url: str):
+        """Waits for a slot, then times the block: an exception counts as a failed request."""
+        limiter = self.host(url)
+        limiter.acquire()
+        started = time.monotonic()
+        try:
+            yield limiter
+        except BaseException:
+            limiter.feedback(time.monotonic() - started, None)
+            raise
+        limiter.feedback(time.monotonic() - started, 200)
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parses a ``Retry-After`` header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """``requests`` adapter that takes a token before each request and reports how it went."""
+
+    def __init__(self, limiter: RateLimiter, **kwargs):
+        self.limiter = limiter
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        host = self.limiter.host(request.url)
+        host.acquire()
+        started = time.monotonic()
+        try:
+            response = super().send(request, **kwargs)
+        except Exception:
+            host.feedback(time.monotonic() - started, None)
+            raise
+        # Com stream=True o tempo vai até os cabeçalhos: é a latência do servidor
+        host.feedback(
+            time.monotonic() - started, response.status_code, retry_after_seconds(response.headers.get("Retry-After"))
+        )
+        return response
+
+
+def limit_session(session, limiter: RateLimiter, pool_maxsize: int = 10):
+    """Mounts a :class:`RateLimitedAdapter` of ``limiter`` on both schemes of ``session``."""
+    adapter = RateLimitedAdapter(limiter, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
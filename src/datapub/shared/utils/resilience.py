@@ -0,0 +1,380 @@
+"""
+Retries with backoff, per-host circuit breakers and a persisted retry queue.
+
+:meth:`Resilience.call` runs one network operation (an HTTP request, a browser
+search) and sorts its outcome into a retry class: network errors, throttling
+(429) and server errors (5xx) are retried with exponential backoff and jitter,
+each class with its own policy, while a definitive answer (404, an invalid
+document, a bug) is returned or raised right away.
+
+Every host has a :class:`CircuitBreaker`. After ``threshold`` consecutive
+network or server failures it opens and calls to that host fail fast for
+``reset_after`` seconds; then a single trial request decides whether it closes
+again. A host that is down is therefore probed now and then instead of being
+hammered by every worker.
+
+Downloads that still fail go to the entity's :class:`RetryQueue`
+(``retry_queue.jsonl``), which the extractor drains at the end of the run and
+which survives to the next run if the process dies first.
+"""
+
+import json
+import time
+import random
+import threading
+from pathlib import Path
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from datapub.shared.utils.metrics import metrics
+
+# Classes de retentativa
+NETWORK = "rede"
+THROTTLED = "limite"
+SERVER = "servidor"
+CIRCUIT = "circuito"
+DEFINITIVE = "definitivo"
+
+# Falhas que contam para abrir o circuito do host (429 é assunto do limitador de ritmo)
+BREAKER_FAILURES = (NETWORK, SERVER)
+# Rodadas de fila após as quais um download é abandonado (o checkpoint ainda guarda a unidade)
+MAX_ROUNDS = 3
+
+
+@dataclass
+class RetryPolicy:
+    """
+    How one retry class is retried.
+
+    Args:
+        attempts (int): Total attempts, the first one included.
+        base_delay (float): Delay before the first retry, in seconds; doubles on every retry.
+        max_delay (float): Cap of a single delay.
+    """
+
+    attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def delay(self, retry: int) -> float:
+        """Delay before retry number ``retry`` (from 0), with jitter over its upper half."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** retry)
+        return random.uniform(ceiling / 2, ceiling)
+
+
+DEFAULT_POLICIES = {
+    NETWORK: RetryPolicy(attempts=4, base_delay=0.5),
+    # O limitador de ritmo já pausa o host pelo Retry-After; aqui só se insiste mais
+    THROTTLED: RetryPolicy(attempts=6, base_delay=2.0, max_delay=60.0),
+    SERVER: RetryPolicy(attempts=3, base_delay=1.0),
+    # Espera o circuito reabrir só se for logo; senão falha rápido e o item vai para a fila
+    CIRCUIT: RetryPolicy(attempts=3, base_delay=1.0, max_delay=5.0),
+}
+
+
+def status_class(status: Optional[int]) -> Optional[str]:
+    """Retry class of an HTTP status; ``None`` when the request went through."""
+    if status is None or status < 400:
+        return None
+    if status == 429:
+        return THROTTLED
+    if status == 408 or status >= 500:
+        return SERVER
+    return DEFINITIVE
+
+
+def error_class(error: BaseException) -> str:
+    """Retry class of an exception raised by a request or a browser step."""
+    if isinstance(error, CircuitOpenError):
+        return CIRCUIT
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return status_class(error.response.status_code) or DEFINITIVE
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)):
+        return NETWORK
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return NETWORK
+    # Esperas e quedas do navegador (TimeoutException, WebDriverException...) sem importar o selenium
+    if type(error).__module__.startswith("selenium"):
+        return NETWORK
+    return DEFINITIVE
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a host's circuit is open and the call was not attempted."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"circuito aberto para {host} (nova tentativa em {retry_in:.0f}s)")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker of one host.
+
+    Args:
+        host (str): Hostname, for messages and counters.
+        threshold (int): Consecutive failures that open the circuit.
+        reset_after (float): Seconds the circuit stays open before a trial request.
+        entity (str): Label of the counters.
+    """
+
+    def __init__(self, host: str, threshold: int = 5, reset_after: float = 30.0, entity: str = ""):
+        self.host = host
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.entity = entity
+        self.failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def retry_in(self) -> float:
+        """Seconds until the host may be tried again (0 when closed or ready for a trial)."""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_after - time.monotonic())
+
+    def admit(self) -> float:
+        """
+        Claims the right to send one request.
+
+        Returns:
+            float: 0 when the request may go; otherwise the seconds to wait before asking again.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            wait = self._opened_at + self.reset_after - time.monotonic()
+            if wait > 0:
+                return wait
+            if self._trial:
+                # Outro worker já está testando o host
+                return 1.0
+            self._trial = True
+            return 0.0
+
+    def record(self, success: bool):
+        with self._lock:
+            self._trial = False
+            if success:
+                self.failures = 0
+                self._opened_at = None
+                return
+            self.failures += 1
+            if self._opened_at is not None:
+                # A tentativa de teste falhou: mais um período aberto
+                self._opened_at = time.monotonic()
+            elif self.failures >= self.threshold:
+                self._opened_at = time.monotonic()
+                print(f"🔌 {self.host}: {self.failures} falhas seguidas, pausando por {self.reset_after:.0f}s")
+                metrics.count("circuitos_abertos", entity=self.entity, host=self.host)
+
+
+def _status_code(result) -> Optional[int]:
+    return getattr(result, "status_code", None)
+
+
+class Resilience:
+    """
+    Retry policies plus one :class:`CircuitBreaker` per host.
+
+    Args:
+        policies (dict): :class:`RetryPolicy` per retry class; missing classes use the defaults.
+        threshold (int): Consecutive failures that open a host's circuit.
+        reset_after (float): Seconds a circuit stays open.
+        entity (str): Label of the counters.
+    """
+
+    def __init__(
+        self, policies: Dict[str, RetryPolicy] = None, threshold: int = 5, reset_after: float = 30.0, entity: str = ""
+    ):
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.entity = entity
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).hostname or ""
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(host, self.threshold, self.reset_after, self.entity)
+            return breaker
+
+    def call(self, url: str, operation: Callable, status: Callable = _status_code):
+        """
+        Runs ``operation()`` against the host of ``url``, retrying what is worth retrying.
+
+        Args:
+            url (str): Address the operation talks to; picks the circuit breaker.
+            operation (callable): Performs one attempt; may raise or return a response.
+            status (callable): Extracts the HTTP status of a returned value (default: ``status_code``).
+
+        Returns:
+            The value of the last attempt; a response with a retryable status is
+            returned as is once the attempts run out.
+
+        Raises:
+            Exception: The error of the last attempt, or :class:`CircuitOpenError`.
+        """
+        breaker = self.breaker(url)
+        retries = 0
+        while True:
+            wait = breaker.admit()
+            if wait:
+                result, error = None, CircuitOpenError(breaker.host, wait)
+                kind = CIRCUIT
+            else:
+                try:
+                    result, error = operation(), None
+                except Exception as e:
+                    result, error = None, e
+                kind = error_class(error) if error is not None else status_class(status(result))
+                breaker.record(kind not in BREAKER_FAILURES)
+
+            policy = self.policies.get(kind)
+            if kind is None or policy is None or retries + 1 >= policy.attempts or wait > policy.max_delay:
+                if error is not None:
+                    raise error
+                return result
+
+            delay = max(policy.delay(retries), wait)
+            retries += 1
+            metrics.count("retentativas", entity=self.entity, classe=kind)
+            time.sleep(delay)
+
+    def wait_for(self, url: str):
+        """Sleeps until the circuit of ``url``'s host lets a trial request through."""
+        wait = self.breaker(url).retry_in()
+        if wait:
+            print(f"⏳ Aguardando {wait:.0f}s para testar {urlsplit(url).hostname} de novo")
+            time.sleep(wait)
+
+
+# ---- Fila de retentativas ----
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+    if isinstance(value, Path):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} não serializável")
+
+
+def _decode(obj):
+    if "$datetime" in obj:
+        return datetime.fromisoformat(obj["$datetime"])
+    if "$date" in obj:
+        return date.fromisoformat(obj["$date"])
+    return obj
+
+
+@dataclass
+class RetryEntry:
+    job: object  # DownloadJob
+    error: str = ""
+    rounds: int = 1
+    queued_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    @property
+    def key(self):
+        return self.job.url, str(self.job.target)
+
+
+def _line(entry: RetryEntry) -> str:
+    job = entry.job
+    # Corpo e cabeçalhos (ViewState, cookies) valem só para a sessão que os gerou
+    spec = {"url": job.url, "target": job.target, "metadata": job.metadata}
+    line = {"job": spec, "erro": entry.error, "rodadas": entry.rounds, "em": entry.queued_at}
+    return json.dumps(line, ensure_ascii=False, default=_encode) + "\n"
+
+
+class RetryQueue:
+    """
+    Append-only log of downloads that failed after their retries.
+
+    Entries are appended as they fail, so they survive a crash. :meth:`take`
+    hands them over for another round and :meth:`settle` rewrites the file
+    with just what failed again; a job that fails ``MAX_ROUNDS`` rounds is
+    dropped (its unit stays pending in the checkpoint).
+
+    Only the URL, target and metadata (with the unit) of a job are stored: a
+    request body or session headers would be stale by the next round, so the
+    extractor rebuilds each job it takes (see ``ExtractorBase._rebuild_job``).
+
+    Args:
+        base_dir (Path): Storage folder of the entity (e.g. ``storage/raw/al_go``).
+        job_type (type): Class rebuilt from each entry (``DownloadJob``).
+    """
+
+    def __init__(self, base_dir, job_type):
+        self.path = Path(base_dir) / "retry_queue.jsonl"
+        self.job_type = job_type
+        self._rounds = {}
+        self._failed: Dict[tuple, RetryEntry] = {}
+        self._lock = threading.Lock()
+
+    def push(self, job, error: str = ""):
+        entry = RetryEntry(job, error or "")
+        with self._lock:
+            entry.rounds = self._rounds.get(entry.key, 0) + 1
+            if entry.rounds > MAX_ROUNDS:
+                print(f"🗑️ Desistindo de {job.url} após {MAX_ROUNDS} rodadas: {error}")
+                return
+            self._failed[entry.key] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(_line(entry))
+
+    def take(self) -> List:
+        """The queued jobs, one per download, as stored; their next failure counts as one more round."""
+        entries = self._read()
+        with self._lock:
+            self._rounds = {entry.key: entry.rounds for entry in entries}
+            self._failed = {}
+        return [entry.job for entry in entries]
+
+    def settle(self):
+        """Keeps in the file only the jobs pushed since :meth:`take`."""
+        with self._lock:
+            failed = list(self._failed.values())
+            self._rounds = {}
+            self._failed = {}
+        if not failed:
+            self.path.unlink(missing_ok=True)
+            return
+        tmp = self.path.with_suffix(".jsonl.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(_line(entry) for entry in failed)
+        tmp.replace(self.path)
+
+    def _read(self) -> List[RetryEntry]:
+        if not self.path.exists():
+            return []
+        entries = {}
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    data = json.loads(line, object_hook=_decode)
+                except ValueError:
+                    continue  # linha truncada por uma interrupção
+                spec = data["job"]
+                job = self.job_type(url=spec["url"], target=Path(spec["target"]), metadata=spec.get("metadata") or {})
+                entry = RetryEntry(job, data.get("erro", ""), data.get("rodadas", 1), data.get("em", ""))
+                # A última linha de um mesmo download vale
+                entries[entry.key] = entry
+        return list(entries.values())
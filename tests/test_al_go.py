@@ -0,0 +1,82 @@
+import json
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+pytest.importorskip("selenium")
+
+from datapub.entities.al_go.extractor import ALGOExtractor  # noqa: E402
+
+FEED_PAGE = b"""<html><script>
+$('#calendar').fullCalendar({ events: '/gestao-parlamentar/diario/eventos', lang: 'pt-br' });
+</script></html>"""
+
+
+class _CalendarHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/gestao-parlamentar/diario" and query["mes"] == ["3"]:
+            body = (
+                '<a class="fc-day-grid-event" href="/storage/diario/diario-alego-2024-03-01.pdf">DOE</a>'
+                '<a class="fc-day-grid-event" href="/storage/diario/diario-alego-2024-03-04.pdf">DOE</a>'
+            ).encode()
+        elif url.path == "/gestao-parlamentar/diario":
+            body = FEED_PAGE
+        elif url.path == "/gestao-parlamentar/diario/eventos" and query["start"] == ["2024-04-01"]:
+            events = [{"title": "DOE", "start": "2024-04-02", "url": "https://cdn.example/diario-alego-2024-04-02.pdf"}]
+            body = json.dumps(events).encode()
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def extractor(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _CalendarHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    extractor = ALGOExtractor(base_dir=tmp_path / "al_go", base_url=f"http://127.0.0.1:{server.server_port}")
+    yield extractor
+    extractor.close()
+    server.shutdown()
+
+
+def test_lists_calendar_links_over_http(extractor):
+    links = extractor._get_pdf_links_for_month(2024, 3)
+
+    assert sorted(links) == ["2024-03-01", "2024-03-04"]
+    assert links["2024-03-01"].endswith("/storage/diario/diario-alego-2024-03-01.pdf")
+    assert extractor._driver is None
+
+
+def test_lists_calendar_links_from_events_feed(extractor):
+    links = extractor._get_pdf_links_for_month(2024, 4)
+
+    assert links == {"2024-04-02": "https://cdn.example/diario-alego-2024-04-02.pdf"}
+    assert extractor._driver is None
+
+
+def test_failed_month_is_recorded_and_the_run_continues(extractor, monkeypatch):
+    def listing(year, month):
+        if month == 3:
+            raise RuntimeError("circuito aberto")
+        return {}
+
+    monkeypatch.setattr(extractor, "_get_pdf_links_for_month", listing)
+    monkeypatch.setattr(extractor, "download_jobs", lambda jobs: list(jobs))
+    extractor.checkpoint.begin("date", "2024-03-01", "2024-04-30")
+
+    extractor.download(date(2024, 3, 1), date(2024, 4, 30))
+
+    assert extractor.checkpoint.run.failed == {date(2024, 3, 1)}
+    extractor.checkpoint.abort()
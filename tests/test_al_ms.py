@@ -0,0 +1,61 @@
+import pytest
+import requests
+
+pytest.importorskip("selenium")
+
+from datapub.entities.al_ms import extractor as module  # noqa: E402
+
+BROWSER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) Chrome/126.0"
+
+
+class _FakeDriver:
+    """Browser after a search: holds the portal's session cookie and its own user-agent."""
+
+    def __init__(self):
+        self.cookies = [{"name": "PHPSESSID", "value": "abc123", "domain": "diariooficial.al.ms.gov.br", "path": "/"}]
+
+    def get_cookies(self):
+        return self.cookies
+
+    def execute_script(self, script):
+        assert "navigator.userAgent" in script
+        return BROWSER_AGENT
+
+    def quit(self):
+        pass
+
+
+class _FakePool:
+    def acquire(self):
+        return _FakeDriver()
+
+
+@pytest.fixture
+def alms(tmp_path, monkeypatch):
+    monkeypatch.setattr(module, "browser_pool", lambda headless=True: _FakePool())
+    extractor = module.ALMSExtractor(base_dir=tmp_path / "alms")
+    yield extractor
+    extractor.close()
+
+
+def test_browser_cookies_and_user_agent_reach_the_download_session(alms):
+    pdf_url = "https://diariooficial.al.ms.gov.br/arquivos/0042.pdf"
+
+    job = alms._build_job("0042", pdf_url)
+
+    assert job.url == pdf_url and job.target.name == "diario-alms-0042.pdf"
+    assert job.metadata["unit"] == 42
+    assert alms.session.headers["User-Agent"] == BROWSER_AGENT
+    request = alms.session.prepare_request(requests.Request("GET", pdf_url, headers=job.headers))
+    assert request.headers["Cookie"] == "PHPSESSID=abc123"
+    assert request.headers["User-Agent"] == BROWSER_AGENT
+
+
+def test_renewed_cookies_are_synced_again_for_a_replayed_job(alms):
+    job = alms._build_job("0042", "https://diariooficial.al.ms.gov.br/arquivos/0042.pdf")
+    alms.driver.cookies = [dict(alms.driver.cookies[0], value="renovado")]
+
+    replayed = alms._rebuild_job(job)
+
+    assert replayed.url == job.url
+    assert alms.session.cookies.get("PHPSESSID") == "renovado"
@@ -0,0 +1,80 @@
+from datetime import date
+
+import pytest
+import requests
+
+from datapub.shared.utils.extractor_base import DownloadJob, DownloadResult
+from datapub.entities.al_pa.header import parse_date_range, read_date_range
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("DIÁRIO OFICIAL Nº 100 - 22 a 29 de Janeiro de 2021", ("2021-01-22", "2021-01-29")),
+    ("Belém, 29 de janeiro a 05 de fevereiro de 2021", ("2021-01-29", "2021-02-05")),
+    ("29 DE DEZEMBRO DE 2020 A 04 DE JANEIRO DE 2021", ("2020-12-29", "2021-01-04")),
+    ("1º a 7 de Março de 2022", ("2022-03-01", "2022-03-07")),
+    ("30 a 31 de Fevereiro de 2021", None),
+    ("Edição de 22 de Janeiro de 2021", None),
+])
+def test_parse_date_range(text, expected):
+    assert parse_date_range(text) == expected
+
+
+def test_reads_period_from_page_header(tmp_path, make_pdf):
+    pytest.importorskip("pdfplumber")
+    pdf = tmp_path / "diario.pdf"
+    pdf.write_bytes(make_pdf(["22 a 29 de Janeiro de 2021"]))
+
+    assert read_date_range(pdf) == ("2021-01-22", "2021-01-29")
+
+
+class _FakeDriver:
+    def quit(self):
+        pass
+
+
+class _FakePool:
+    def acquire(self):
+        return _FakeDriver()
+
+
+@pytest.fixture
+def alpa(tmp_path, monkeypatch):
+    pytest.importorskip("pdfplumber")
+    pytest.importorskip("selenium")
+    pytest.importorskip("pyperclip")
+    from datapub.entities.al_pa import extractor as module
+
+    monkeypatch.setattr(module, "browser_pool", lambda headless=True: _FakePool())
+    extractor = module.ALPAExtractor(base_dir=tmp_path / "alpa")
+    yield extractor
+    extractor.close()
+
+
+def test_weekly_edition_is_renamed_off_the_loop_and_the_cache_follows(alpa, make_pdf):
+    url = "https://portal.example/diario.pdf"
+    temp = alpa.downloads_dir / "diario-alpa-2021-01-25.pdf"
+    temp.write_bytes(make_pdf(["22 a 29 de Janeiro de 2021"]))
+    response = requests.Response()
+    response.headers["ETag"] = '"v1"'
+    alpa.http_cache.remember(url, response, temp)
+    job = DownloadJob(url, temp, metadata={"date": date(2021, 1, 25), "unit": date(2021, 1, 25)})
+
+    result = alpa._postprocess_download(DownloadResult(job, "sucesso", md5="0" * 32, sha256="1" * 64))
+    alpa._on_download_complete(result)
+
+    final = alpa.downloads_dir / "diario-alpa-2021-01-22_2021-01-29.pdf"
+    assert result.job.target == final and final.exists() and not temp.exists()
+    assert alpa.http_cache.entry(url)["caminho_local"] == str(final)
+    assert alpa.coverage.find(date(2021, 1, 28))
+
+
+def test_unreadable_header_falls_back_to_the_listed_date(alpa):
+    temp = alpa.downloads_dir / "diario-alpa-2021-01-25.pdf"
+    temp.write_bytes(b"%PDF-1.4\n corrompido")
+    job = DownloadJob("https://portal.example/diario.pdf", temp, metadata={"date": date(2021, 1, 25)})
+
+    result = alpa._postprocess_download(DownloadResult(job, "sucesso", md5="0" * 32, sha256="1" * 64))
+    alpa._on_download_complete(result)
+
+    assert result.job.target == temp and temp.exists()
+    assert alpa.manifest.has_date("ALPA", date(2021, 1, 25))
@@ -0,0 +1,28 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("psycopg2")
+
+from datapub.processing.amounts import extract_amounts, format_cents, parse_amounts  # noqa: E402
+
+TEXT = (
+    "Extrato do contrato nº 12/2024. Valor global: R$ 1.234.567,89.\n"
+    "Concessão de diárias ao servidor, no valor de R$450,00 e R$ 12,5 (inválido).\n"
+    "Pagamento de R$ 0,99"
+)
+
+
+def test_parses_brazilian_amounts_exactly():
+    cents = parse_amounts(["1.234.567", "450", "0"], ["89", "00", "99"])
+
+    assert cents.tolist() == [123456789, 45000, 99]
+    assert format_cents(cents).tolist() == ["1234567.89", "450.00", "0.99"]
+
+
+def test_extracts_amounts_with_context_and_category():
+    amounts = extract_amounts(TEXT)
+
+    assert format_cents(amounts.valores).tolist() == ["1234567.89", "450.00", "0.99"]
+    assert amounts.categorias.tolist() == ["contrato", "diarias", "pagamento"]
+    assert amounts.descricoes[0].startswith("Extrato do contrato") and amounts.descricoes[0].endswith("1.234.567,89")
+    assert extract_amounts("sem valores").valores.size == 0
@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip("bs4")
+
+from benchmarks.run import run_scenario  # noqa: E402
+
+# 2024-03-04 é uma segunda-feira: cinco dias úteis numa semana
+DAYS = 7
+
+
+@pytest.mark.parametrize("entity, requests", [
+    # O ViewState de cada GET traz a data consultada e o POST devolve o PDF daquele dia
+    ("al_ac", {"formulario": DAYS, "pdf": DAYS}),
+    ("al_ce", {"listagem": 1, "pdf": 5}),
+])
+def test_scenario_downloads_every_published_day(entity, requests):
+    result = run_scenario(entity, days=DAYS, latency=0, pdf_size=4096)
+
+    assert "skipped" not in result
+    assert result["documents"] == 5
+    assert result["requests"] == requests
+    assert result["bytes"] > 5 * 4096
@@ -0,0 +1,43 @@
+import os
+
+from datapub.shared.utils.blob_store import BlobStore, deduplicate
+from datapub.shared.utils.download import hash_file
+from datapub.shared.utils.manifest import Manifest
+
+PDF = b"%PDF-1.4\n" + b"z" * 4096
+
+
+def test_identical_downloads_share_one_blob(tmp_path):
+    store = BlobStore(tmp_path)
+    first = tmp_path / "alce" / "downloads" / "a.pdf"
+    second = tmp_path / "alms" / "downloads" / "b.pdf"
+    for path in (first, second):
+        path.parent.mkdir(parents=True)
+        path.write_bytes(PDF)
+    sha256 = hash_file(first)[1]
+
+    assert store.put(first, sha256) is True
+    assert store.put(second, sha256) is False
+
+    blob = store.path_for(sha256)
+    assert os.path.samefile(blob, first) and os.path.samefile(blob, second)
+    assert blob.stat().st_nlink == 3
+    assert second.read_bytes() == PDF
+
+
+def test_deduplicate_links_legacy_copies_and_fills_hashes(tmp_path):
+    downloads = tmp_path / "alms" / "downloads"
+    downloads.mkdir(parents=True)
+    for name in ("diario-alms-0001_20250101_000000.pdf", "diario-alms-0001_20250201_000000.pdf"):
+        (downloads / name).write_bytes(PDF)
+
+    manifest = Manifest(tmp_path)
+    manifest.add({"entity": "ALMS", "numero_edicao": "0001", "caminho_local": str(next(downloads.iterdir()))})
+
+    seen, distinct, reclaimed = deduplicate(tmp_path, manifest)
+
+    assert (seen, distinct, reclaimed) == (2, 1, len(PDF))
+    assert all(p.stat().st_nlink == 3 for p in downloads.iterdir())
+    sha256 = hash_file(next(downloads.iterdir()))[1]
+    assert [r["hash_sha256"] for r in manifest.contents("ALMS")] == [sha256]
+    manifest.close()
@@ -0,0 +1,70 @@
+import pytest
+
+pytest.importorskip("selenium")
+
+from selenium.common.exceptions import InvalidSessionIdException  # noqa: E402
+
+from datapub.shared.utils.browser_pool import BrowserPool  # noqa: E402
+
+
+class FakeDriver:
+    launched = 0
+
+    def __init__(self):
+        FakeDriver.launched += 1
+        self.crash_next = False
+        self.quit_called = False
+
+    def get(self, url):
+        if self.crash_next:
+            raise InvalidSessionIdException("session deleted")
+
+    def delete_all_cookies(self):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    FakeDriver.launched = 0
+    pool = BrowserPool(size=1, max_pages=3)
+
+    def launch():
+        driver = FakeDriver()
+        pool._pages[id(driver)] = 0
+        return driver
+
+    monkeypatch.setattr(pool, "_launch", launch)
+    return pool
+
+
+def test_pool_reuses_and_recycles_browsers(pool):
+    lease = pool.acquire()
+    for _ in range(3):
+        lease.get("http://portal/")
+    lease.quit()
+
+    # Atingiu max_pages: o navegador é descartado na devolução
+    lease = pool.acquire()
+    lease.get("http://portal/")
+    lease.quit()
+    assert FakeDriver.launched == 2
+
+    lease = pool.acquire()
+    assert FakeDriver.launched == 2
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.01)
+    lease.quit()
+
+
+def test_pool_replaces_crashed_browser(pool):
+    lease = pool.acquire()
+    crashed = lease._driver
+    crashed.crash_next = True
+
+    lease.get("http://portal/")
+
+    assert crashed.quit_called
+    assert lease._driver is not crashed and lease.pages == 1
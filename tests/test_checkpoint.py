@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+
+import pytest
+
+from datapub.shared.utils.extractor_base import ExtractorBase
+from datapub.shared.utils.planner import PublicationPlanner
+
+
+class Interrupted(Exception):
+    pass
+
+
+class FakeExtractor(ExtractorBase):
+    def __init__(self, base_dir, fail_on=None):
+        super().__init__(entity="FAKE", base_dir=base_dir)
+        self.fail_on = fail_on
+        self.probed = []
+
+    def download(self, start_date, end_date):
+        day = start_date
+        while day <= end_date:
+            if not self.checkpoint.is_done(day):
+                if day == self.fail_on:
+                    raise Interrupted(day)
+                self.probed.append(day)
+                self.checkpoint.completed(day, "vazio")
+            day += timedelta(days=1)
+
+
+def test_interrupted_run_resumes_and_advances_high_water(tmp_path):
+    base_dir = tmp_path / "raw" / "fake"
+    start, end = date(2024, 1, 1), date(2024, 1, 10)
+
+    extractor = FakeExtractor(base_dir, fail_on=date(2024, 1, 6))
+    with pytest.raises(Interrupted):
+        extractor.sync({"start_date": start, "end_date": end})
+    assert extractor.checkpoint.high_water("date") is None
+
+    resumed = FakeExtractor(base_dir)
+    resumed.sync({"start_date": start, "end_date": end}, incremental=True)
+    assert resumed.probed == [date(2024, 1, d) for d in range(6, 11)]
+    assert resumed.checkpoint.high_water("date") == end
+    assert not resumed.checkpoint.log_path.exists()
+
+    later = FakeExtractor(base_dir)
+    later.sync({"start_date": start, "end_date": date(2024, 1, 12)}, incremental=True)
+    assert later.probed == [date(2024, 1, 11), date(2024, 1, 12)]
+
+
+def test_failed_units_hold_back_high_water(tmp_path):
+    extractor = FakeExtractor(tmp_path / "raw" / "fake")
+    extractor.checkpoint.begin("number", 10, 20)
+    for number in range(10, 21):
+        extractor.checkpoint.completed(number, "erro" if number == 15 else "ok")
+    extractor.checkpoint.finish()
+
+    assert extractor.checkpoint.high_water("number") == 14
+    pending = extractor.checkpoint.pending_run()
+    assert pending.outstanding == {15}
+    assert 16 in pending.done
+
+
+class PlannedExtractor(ExtractorBase):
+    def __init__(self, base_dir):
+        super().__init__(entity="FAKE", base_dir=base_dir)
+        self.probed = []
+
+    def download(self, start_date, end_date, sweep=False):
+        for day in self._plan_days(start_date, end_date, sweep=sweep):
+            self.probed.append(day)
+            self.checkpoint.completed(day, "vazio")
+
+
+class _FixedRunPlanner(PublicationPlanner):
+    def plan_days(self, days, sweep=False, run_key=None):
+        return super().plan_days(days, sweep=sweep, run_key=1)
+
+
+def test_skipped_days_stay_reachable_behind_high_water(tmp_path, monkeypatch):
+    year = [date(2023, 1, 2) + timedelta(days=i) for i in range(364)]
+    weekdays = [day for day in year if day.weekday() < 5]
+    planner = _FixedRunPlanner(weekdays, sweep_every=1000)
+    monkeypatch.setattr(PublicationPlanner, "from_manifest", classmethod(lambda cls, *args, **kwargs: planner))
+    base_dir = tmp_path / "raw" / "fake"
+    weekends = {date(2024, 1, 6), date(2024, 1, 7), date(2024, 1, 13), date(2024, 1, 14)}
+
+    first = PlannedExtractor(base_dir)
+    first.sync({"start_date": date(2024, 1, 1), "end_date": date(2024, 1, 14)})
+    assert weekends.isdisjoint(first.probed)
+    assert first.checkpoint.high_water("date") == date(2024, 1, 14)
+    assert first.checkpoint.skipped_days() == weekends
+
+    # A varredura de uma execução incremental volta aos dias pulados atrás da marca
+    later = PlannedExtractor(base_dir)
+    later.sync({"start_date": date(2024, 1, 1), "end_date": date(2024, 1, 16), "sweep": True}, incremental=True)
+    assert set(later.probed) == weekends | {date(2024, 1, 15), date(2024, 1, 16)}
+    assert later.checkpoint.high_water("date") == date(2024, 1, 16)
+    assert later.checkpoint.skipped_days() == set()
@@ -0,0 +1,46 @@
+import sys
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from datapub import cli  # noqa: E402
+from datapub.processing import embeddings, ner  # noqa: E402
+from datapub.shared.utils import database  # noqa: E402
+
+
+class _Pool:
+    def closeall(self):
+        pass
+
+
+@pytest.fixture
+def run(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "connection_pool", lambda *args, **kwargs: _Pool())
+
+    def run(*argv):
+        monkeypatch.setattr(sys, "argv", ["datapub", *argv, "--root", str(tmp_path / "raw")])
+        cli.main()
+
+    return run
+
+
+def test_entities_command_passes_the_spacy_model_through(run, monkeypatch):
+    calls = []
+    monkeypatch.setattr(ner, "extract_entities", lambda *args, **kwargs: calls.append(kwargs) or 3)
+
+    run("entities")
+    run("entities", "--model", "pt_core_news_sm")
+
+    # Sem --model o etiquetador fica só com as regras e o gazetteer
+    assert [c["model"] for c in calls] == [None, "pt_core_news_sm"]
+
+
+def test_embed_command_defaults_to_the_real_model(run, monkeypatch):
+    calls = []
+    monkeypatch.setattr(embeddings, "embed_documents", lambda *args, **kwargs: calls.append(kwargs) or 2)
+
+    run("embed")
+    run("embed", "--model", "hashing")
+
+    assert [c["model"] for c in calls] == [embeddings.DEFAULT_MODEL, "hashing"]
@@ -0,0 +1,31 @@
+import hashlib
+
+import pytest
+
+from datapub.shared.utils.download import InvalidDocumentError, hash_file, stream_to_file
+
+
+def test_stream_to_file_hashes_in_one_pass(tmp_path):
+    chunks = [b"%PD", b"F-1.7\n", b"a" * 100_000, b"", b"fim"]
+    body = b"".join(chunks)
+
+    streamed = stream_to_file(iter(chunks), tmp_path / "doc.pdf")
+
+    assert streamed.size == len(body)
+    assert streamed.md5 == hashlib.md5(body).hexdigest()
+    assert streamed.sha256 == hashlib.sha256(body).hexdigest()
+    assert (tmp_path / "doc.pdf").read_bytes() == body
+    assert hash_file(tmp_path / "doc.pdf") == (streamed.md5, streamed.sha256)
+
+
+def test_stream_to_file_leaves_nothing_on_failure(tmp_path):
+    def broken():
+        yield b"%PDF-1.4\n"
+        raise ConnectionError("conexão perdida")
+
+    with pytest.raises(ConnectionError):
+        stream_to_file(broken(), tmp_path / "doc.pdf")
+    with pytest.raises(InvalidDocumentError):
+        stream_to_file([b"<html>not a pdf</html>"], tmp_path / "doc.pdf")
+
+    assert list(tmp_path.iterdir()) == []
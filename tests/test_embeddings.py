@@ -0,0 +1,93 @@
+from functools import partial
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("psycopg2")
+
+from datapub.processing import embeddings  # noqa: E402
+from datapub.processing.embeddings import (  # noqa: E402
+    DIMENSIONS,
+    HASHING_MODEL,
+    EmbeddingCache,
+    HashingEmbedder,
+    chunk_text,
+    embed_document,
+    init_worker,
+    stage_name,
+    vector_literal,
+)
+from datapub.processing.stage import run_stage  # noqa: E402
+from datapub.processing.text import TextStore  # noqa: E402
+from datapub.shared.utils.manifest import Manifest  # noqa: E402
+
+TEXT = " ".join(f"palavra{i}" for i in range(400))
+
+
+def test_chunks_overlap_without_splitting_words():
+    chunks = chunk_text(TEXT, size=200, overlap=50)
+
+    assert len(chunks) > 1
+    assert all(len(c) <= 200 for c in chunks)
+    words = set(TEXT.split())
+    assert all(set(c.split()) <= words for c in chunks)
+    assert chunks[0].split()[-1] in chunks[1]
+    assert chunks[-1].endswith("palavra399")
+
+
+def test_hashing_model_is_deterministic_and_normalized():
+    vectors = HashingEmbedder().encode(["diário oficial", "diário oficial", ""])
+
+    assert vectors.shape == (3, DIMENSIONS)
+    assert np.array_equal(vectors[0], vectors[1])
+    assert np.isclose(np.linalg.norm(vectors[0]), 1)
+    assert not vectors[2].any()
+    assert vector_literal(np.array([0.5, -1.0], dtype=np.float32)) == "[0.5,-1]"
+
+
+def test_vectors_are_cached_by_content(tmp_path, monkeypatch):
+    root = tmp_path / "processed"
+    TextStore(root).write("a" * 64, [TEXT, "segunda página"])
+    manifest = Manifest(tmp_path / "raw")
+    manifest.add({"entity": "ALAC", "caminho_local": "x.pdf", "hash_sha256": "a" * 64})
+    written = []
+
+    def write(batch):
+        written.extend(batch)
+        return [sha256 for sha256, _ in batch]
+
+    task = partial(embed_document, str(root))
+    hashing = {"workers": 1, "initializer": init_worker, "initargs": (HASHING_MODEL,)}
+    assert run_stage(manifest, stage_name(HASHING_MODEL), TextStore(root), task, write, **hashing) == 1
+    assert run_stage(manifest, stage_name(HASHING_MODEL), TextStore(root), task, write, **hashing) == 0
+    (_, vector), = written
+    assert vector.shape == (DIMENSIONS,)
+    assert np.array_equal(EmbeddingCache(root).get("a" * 64), vector)
+
+    # Com o vetor em cache o modelo não é chamado de novo
+    class Unused(HashingEmbedder):
+        def encode(self, texts):
+            raise AssertionError("modelo chamado")
+
+    monkeypatch.setattr(embeddings, "_embedder", Unused())
+    assert np.array_equal(embed_document(str(root), "a" * 64), vector)
+    manifest.close()
+
+
+def test_progress_is_recorded_per_model(tmp_path):
+    root = tmp_path / "processed"
+    TextStore(root).write("b" * 64, [TEXT])
+    manifest = Manifest(tmp_path / "raw")
+    manifest.add({"entity": "ALAC", "caminho_local": "x.pdf", "hash_sha256": "b" * 64})
+    task = partial(embed_document, str(root))
+    hashing = {"workers": 1, "initializer": init_worker, "initargs": (HASHING_MODEL,)}
+
+    def write(batch):
+        return [sha256 for sha256, _ in batch]
+
+    assert stage_name() != stage_name(HASHING_MODEL)
+    assert run_stage(manifest, stage_name(HASHING_MODEL), TextStore(root), task, write, **hashing) == 1
+    # Outro modelo não herda o progresso do anterior, mesmo sem --full
+    assert run_stage(manifest, stage_name("outro-modelo"), TextStore(root), task, write, **hashing) == 1
+    assert run_stage(manifest, stage_name("outro-modelo"), TextStore(root), task, write, **hashing) == 0
+    manifest.close()
@@ -0,0 +1,84 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from datapub.shared.utils.extractor_base import DownloadEngine, DownloadJob
+
+PDF_BODY = b"%PDF-1.4\n" + b"x" * 2048
+
+
+class _PortalHandler(BaseHTTPRequestHandler):
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        time.sleep(0.05)
+        with cls.lock:
+            cls.in_flight -= 1
+
+        body = PDF_BODY if self.path.endswith(".pdf") else b"<html></html>"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def portal():
+    _PortalHandler.in_flight = _PortalHandler.peak = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PortalHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_engine_respects_per_host_limit(portal, tmp_path):
+    jobs = (DownloadJob(f"{portal}/{i}.pdf", tmp_path / f"{i}.pdf") for i in range(8))
+    seen = []
+
+    results = DownloadEngine(concurrency=8, per_host=3).run(jobs, on_result=seen.append)
+
+    assert len(results) == 8 and seen == results
+    assert all(r.ok for r in results)
+    assert _PortalHandler.peak <= 3
+    assert (tmp_path / "0.pdf").read_bytes() == PDF_BODY
+
+
+def test_engine_flags_invalid_and_existing(portal, tmp_path):
+    (tmp_path / "a.pdf").write_bytes(PDF_BODY)
+    jobs = [
+        DownloadJob(f"{portal}/a.pdf", tmp_path / "a.pdf"),
+        DownloadJob(f"{portal}/page", tmp_path / "b.pdf"),
+    ]
+
+    results = {r.job.target.name: r for r in DownloadEngine().run(jobs)}
+
+    assert results["a.pdf"].status == "existente"
+    assert results["b.pdf"].status == "invalido"
+    assert not (tmp_path / "b.pdf").exists()
+
+
+def test_engine_finishes_in_flight_jobs_when_the_producer_fails(portal, tmp_path):
+    seen = []
+
+    def jobs():
+        for i in range(3):
+            yield DownloadJob(f"{portal}/{i}.pdf", tmp_path / f"{i}.pdf")
+        raise RuntimeError("listagem falhou")
+
+    with pytest.raises(RuntimeError):
+        DownloadEngine(concurrency=4, per_host=4).run(jobs(), on_result=seen.append)
+
+    assert sorted(r.job.target.name for r in seen) == ["0.pdf", "1.pdf", "2.pdf"]
+    assert all(r.ok for r in seen)
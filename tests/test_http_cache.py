@@ -0,0 +1,78 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from datapub.shared.utils.extractor_base import DownloadEngine, DownloadJob
+from datapub.shared.utils.http_cache import HttpCache
+from datapub.shared.utils.manifest import Manifest
+
+
+class _EtagHandler(BaseHTTPRequestHandler):
+    version = 1
+    bodies_sent = 0
+
+    def do_GET(self):
+        cls = type(self)
+        etag = f'"v{cls.version}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        body = b"%PDF-1.4\n" + str(cls.version).encode() * 1024 if self.path.endswith(".pdf") else b"<html>lista</html>"
+        cls.bodies_sent += 1
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def portal():
+    _EtagHandler.version, _EtagHandler.bodies_sent = 1, 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EtagHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    manifest = Manifest(tmp_path)
+    yield HttpCache(manifest, max_bytes=1024 * 1024)
+    manifest.close()
+
+
+def test_revalidation_turns_304_into_noop(portal, cache, tmp_path):
+    job = DownloadJob(f"{portal}/a.pdf", tmp_path / "a.pdf")
+
+    first = DownloadEngine(cache=cache).run([job])[0]
+    assert first.ok and cache.entry(job.url)["etag"] == '"v1"'
+
+    again = DownloadEngine(cache=cache, revalidate=True).run([job])[0]
+    assert again.status == "existente" and again.http_status == 304
+    assert _EtagHandler.bodies_sent == 1
+
+    _EtagHandler.version = 2
+    changed = DownloadEngine(cache=cache, revalidate=True).run([job])[0]
+    assert changed.ok and job.target.read_bytes().endswith(b"2")
+
+
+def test_listing_pages_are_served_from_cache_and_evicted(portal, cache):
+    session = requests.Session()
+    assert cache.get(session, f"{portal}/lista", params={"mes": 3}).from_cache is False
+
+    response = cache.get(session, f"{portal}/lista", params={"mes": 3})
+    assert response.from_cache and response.text == "<html>lista</html>"
+    assert _EtagHandler.bodies_sent == 1
+
+    cache.max_bytes = 0
+    assert cache.evict() == 1
+    assert cache.manifest.cache_entries() == []
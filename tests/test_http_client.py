@@ -0,0 +1,105 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from datapub.shared.utils.extractor_base import DownloadJob, ExtractorBase
+from datapub.shared.utils.http_client import USER_AGENT, build_session
+from datapub.shared.utils.rate_limit import HostPolicy, RateLimiter
+
+PDF_BODY = b"%PDF-1.4\n" + b"x" * 2048
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 server that records the client port of every request."""
+
+    protocol_version = "HTTP/1.1"
+    ports = []
+    agents = []
+
+    def do_GET(self):
+        cls = type(self)
+        cls.ports.append(self.client_address[1])
+        cls.agents.append(self.headers.get("User-Agent"))
+        body = PDF_BODY if self.path.endswith(".pdf") else b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _KeepAliveHandler.ports = []
+    _KeepAliveHandler.agents = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _limiter():
+    return RateLimiter(HostPolicy(rate=1000, max_rate=1000, burst=1000))
+
+
+class FakeExtractor(ExtractorBase):
+    max_per_host = 2
+    host_limits = {"docs.example": 4}
+
+    def __init__(self, base_dir):
+        super().__init__(entity="FAKE", base_dir=base_dir)
+
+
+def test_requests_reuse_one_connection_with_the_common_user_agent(server):
+    session = build_session(_limiter())
+
+    for i in range(10):
+        assert session.get(f"{server}/{i}").status_code == 200
+
+    assert len(set(_KeepAliveHandler.ports)) == 1
+    assert set(_KeepAliveHandler.agents) == {USER_AGENT}
+
+
+def test_pools_are_sized_per_host_and_carry_the_default_timeout():
+    session = build_session(_limiter(), pool_maxsize=3, host_pools={"docs.example": 6}, timeout=12)
+
+    default = session.get_adapter("https://portal.example/a")
+    docs = session.get_adapter("https://docs.example/a.pdf")
+    assert default._pool_maxsize == 3 and default.timeout == 12
+    assert docs._pool_maxsize == 6
+    assert session.get_adapter("https://docs.example.br/") is default
+
+
+def test_extractor_shares_its_session_with_the_download_engine(server, tmp_path):
+    extractor = FakeExtractor(tmp_path / "raw" / "fake")
+    engine = extractor._download_engine()
+    assert engine.session is extractor.session
+    assert engine.host_limits == {"docs.example": 4}
+    assert extractor.session.get_adapter("https://docs.example/")._pool_maxsize == 5
+
+    jobs = [DownloadJob(f"{server}/{i}.pdf", tmp_path / f"{i}.pdf") for i in range(6)]
+    extractor.session.get(f"{server}/listagem")
+    results = engine.run(jobs)
+    extractor.close()
+
+    assert all(r.ok for r in results)
+    # Duas transferências por host no máximo: nunca mais que três conexões (com a da listagem)
+    assert len(set(_KeepAliveHandler.ports)) <= 3
+
+
+def test_http2_transport_returns_requests_responses(server):
+    pytest.importorskip("httpx")
+    pytest.importorskip("h2")
+    session = build_session(_limiter(), http2=True)
+
+    response = session.get(f"{server}/a.pdf", stream=True)
+    body = b"".join(response.iter_content(512))
+    session.close()
+
+    assert response.status_code == 200 and body == PDF_BODY
+    assert response.headers["Content-Length"] == str(len(PDF_BODY))
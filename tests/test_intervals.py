@@ -0,0 +1,19 @@
+from datetime import date
+
+from datapub.shared.utils.intervals import DateIntervalIndex
+
+
+def test_interval_index_merges_and_finds():
+    index = DateIntervalIndex([(date(2021, 1, 22), date(2021, 1, 29))])
+    index.add(date(2021, 2, 5), date(2021, 2, 12))
+    index.add(date(2021, 3, 1))
+
+    assert date(2021, 1, 25) in index
+    assert date(2021, 2, 1) not in index
+    assert index.find(date(2021, 3, 1)) == (date(2021, 3, 1), date(2021, 3, 1))
+
+    # Preenche a lacuna e une os dois intervalos, inclusive os dias adjacentes
+    index.add(date(2021, 1, 30), date(2021, 2, 4))
+    assert len(index) == 2
+    assert index.find(date(2021, 2, 1)) == (date(2021, 1, 22), date(2021, 2, 12))
+    assert not index.contains(date(2021, 1, 21))
@@ -0,0 +1,62 @@
+import os
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from datapub.processing.load_db import STAGE, document_row, load_documents  # noqa: E402
+from datapub.shared.utils.manifest import Manifest  # noqa: E402
+
+TEST_DB_URL = os.environ.get("DATAPUB_TEST_DB_URL")
+
+
+def _manifest(tmp_path, count):
+    manifest = Manifest(tmp_path)
+    manifest.add_many(
+        {
+            "entity": "ALGO",
+            "data_publicacao": f"2024-01-{n + 1:02d}",
+            "caminho_local": f"storage/raw/al_go/downloads/diario-alego-2024-01-{n + 1:02d}.pdf",
+            "hash_sha256": f"{n:064x}",
+        }
+        for n in range(count)
+    )
+    return manifest
+
+
+def test_document_row_estimates_missing_publication_date():
+    orgao, published, path, digest, metadata = document_row({
+        "entity": "ALMS",
+        "numero_edicao": "1844",
+        "caminho_local": "storage/raw/alms/downloads/diario-alms-1844.pdf",
+        "hash_sha256": "f" * 64,
+        "data_download": "2025-06-01T10:00:00",
+        "extra": {},
+    })
+
+    assert (orgao, published, digest) == ("ALMS", "2025-06-01", "f" * 64)
+    assert metadata["numero_edicao"] == "1844" and metadata["data_publicacao_estimada"] is True
+
+
+@pytest.mark.skipif(not TEST_DB_URL, reason="defina DATAPUB_TEST_DB_URL com um Postgres local")
+def test_load_is_batched_resumable_and_idempotent(tmp_path):
+    from datapub.shared.utils.database import connection_pool, pooled_connection
+
+    schema = Path(__file__).resolve().parents[1] / "database.sql"
+    pool = connection_pool(TEST_DB_URL, size=2)
+    with pooled_connection(pool) as conn, conn.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS document_embeddings, gastos, entidades, documentos CASCADE")
+        cursor.execute(schema.read_text().split("-- Extensão")[0])
+
+    manifest = _manifest(tmp_path, 25)
+    assert load_documents(manifest, pool, batch_size=10) == 25
+    assert load_documents(manifest, pool, batch_size=10) == 0
+    assert load_documents(manifest, pool, batch_size=10, full=True) == 25
+
+    with pooled_connection(pool) as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM documentos")
+        assert cursor.fetchone()[0] == 25
+    assert len(list(manifest.pending_contents(STAGE))) == 0
+    pool.closeall()
+    manifest.close()
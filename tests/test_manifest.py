@@ -0,0 +1,39 @@
+import json
+from datetime import date
+
+from datapub.shared.utils.manifest import Manifest
+
+
+def _record(day, path, **kwargs):
+    return {"entity": "ALGO", "data_publicacao": day, "caminho_local": path, "hash_md5": "ab" * 16, **kwargs}
+
+
+def test_manifest_lookups_and_upsert(tmp_path):
+    manifest = Manifest(tmp_path)
+    with manifest.batch(10):
+        manifest.add(_record(date(2024, 3, 1), "a.pdf", url_origem="http://x/a.pdf"))
+        manifest.add(_record(date(2024, 3, 4), "b.pdf", origem="calendario"))
+        # Registro repetido atualiza em vez de duplicar
+        manifest.add(_record(date(2024, 3, 4), "b.pdf", tamanho_bytes=10))
+
+    assert manifest.path == tmp_path / "manifest.sqlite3"
+    assert manifest.count("ALGO") == 2
+    assert manifest.has_date("ALGO", date(2024, 3, 1))
+    assert not manifest.has_date("ALAC", date(2024, 3, 1))
+    assert manifest.has_url("http://x/a.pdf")
+    assert manifest.dates("ALGO") == {"2024-03-01", "2024-03-04"}
+    assert [r["tamanho_bytes"] for r in manifest.documents()] == [None, 10]
+
+
+def test_manifest_imports_legacy_json(tmp_path):
+    metadata_dir = tmp_path / "alms" / "metadata"
+    metadata_dir.mkdir(parents=True)
+    legacy = {"orgao": "MS", "numero_diario": "1850", "caminho_local": "x.pdf", "hash_md5": "f" * 32}
+    (metadata_dir / "metadata_1850.json").write_text(json.dumps(legacy), encoding="utf-8")
+    (metadata_dir / "metadata_broken.json").write_text("{", encoding="utf-8")
+
+    manifest = Manifest(tmp_path)
+
+    assert manifest.import_json_dir(metadata_dir) == 1
+    assert manifest.has_edition("ALMS", 1850)
+    assert manifest.find_by_hash("f" * 32)[0]["entity"] == "ALMS"
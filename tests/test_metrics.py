@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from datapub.shared.utils.metrics import ENV_PATH, ENV_RUN, Metrics, Progress
+
+
+@pytest.fixture
+def enabled(tmp_path, monkeypatch):
+    # configure() exporta o arquivo para processos filhos; o monkeypatch desfaz isso
+    monkeypatch.setenv(ENV_PATH, "")
+    monkeypatch.setenv(ENV_RUN, "")
+    m = Metrics()
+    m.configure(tmp_path / "metrics.jsonl", tmp_path / "metrics.prom")
+    yield m
+    m.close()
+
+
+def test_disabled_metrics_are_noops():
+    m = Metrics()
+
+    assert m.span("fetch", "ALGO") is m.span("write")
+    with m.span("fetch", "ALGO"):
+        m.count("downloads", entity="ALGO")
+    assert m.snapshot() == {"spans": [], "contadores": []}
+    m.progress("download", 10).advance()
+
+
+def test_spans_and_counters_are_exported(enabled, tmp_path, capsys):
+    for _ in range(3):
+        with enabled.span("fetch", "ALGO"):
+            pass
+    enabled.count("downloads", entity="ALGO", status="sucesso")
+    enabled.count("bytes", 2048, entity="ALGO")
+    # Resumo de um processo filho da mesma execução
+    worker = {"tipo": "resumo", "execucao": enabled.run_id, "pid": -1,
+              "spans": [["fetch", "ALPA", 2, 1.5, 1.0]], "contadores": [["downloads", "ALPA", {"status": "erro"}, 2]]}
+    with open(tmp_path / "metrics.jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps(worker) + "\n")
+    enabled.close()
+
+    events = [json.loads(line) for line in (tmp_path / "metrics.jsonl").read_text(encoding="utf-8").splitlines()]
+    assert sum(e["tipo"] == "span" and e["etapa"] == "fetch" for e in events) == 3
+
+    text = (tmp_path / "metrics.prom").read_text(encoding="utf-8")
+    assert 'datapub_stage_seconds_count{stage="fetch",entity="ALGO"} 3' in text
+    assert 'datapub_stage_seconds_sum{stage="fetch",entity="ALPA"} 1.500000' in text
+    assert 'datapub_downloads_total{entity="ALGO",status="sucesso"} 1' in text
+    assert 'datapub_downloads_total{entity="ALPA",status="erro"} 2' in text
+    assert 'datapub_bytes_total{entity="ALGO"} 2048' in text
+    # A etapa mais lenta aparece primeiro no resumo
+    summary = capsys.readouterr().out.split("Tempo por etapa")[1].splitlines()
+    assert "ALPA" in summary[2]
+
+
+def test_progress_reports_rate_and_eta(enabled):
+    progress = enabled.progress("download", 100, "ALGO")
+    progress.started -= 10
+    progress.update(25)
+
+    assert isinstance(progress, Progress)
+    assert progress.rate == pytest.approx(2.5, rel=0.01)
+    assert progress.eta.total_seconds() == pytest.approx(30, abs=1)
+    assert str(progress).startswith("ALGO download: 25/100 (25%)")
@@ -0,0 +1,64 @@
+import re
+from functools import partial
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from datapub.processing.ner import STAGE, EntityTagger, tag_document  # noqa: E402
+from datapub.processing.stage import run_stage  # noqa: E402
+from datapub.processing.text import TextStore  # noqa: E402
+from datapub.shared.utils.manifest import Manifest  # noqa: E402
+
+ACT = (
+    "O Presidente da Assembleia Legislativa resolve nomear MARIA DA SILVA SANTOS, matrícula 123, "
+    "para a Secretaria de Estado de Saúde, no Município de Rio Branco, Acre."
+)
+
+
+def test_tags_people_agencies_and_places():
+    mentions = EntityTagger().tag(ACT)
+    found = {(m.tipo_entidade, m.valor) for m in mentions}
+
+    assert ("PESSOA", "MARIA DA SILVA SANTOS") in found
+    assert ("ORGAO", "Assembleia Legislativa") in found
+    assert ("ORGAO", "Secretaria de Estado de Saúde") in found
+    assert ("LOCAL", "Rio Branco") in found and ("LOCAL", "Acre") in found
+    for m in mentions:
+        assert ACT[m.inicio_pos:m.fim_pos] == m.valor
+
+
+def test_overlapping_mentions_keep_the_longest_span():
+    text = "Rio Branco do Acre Previdência Social e Cuiabá"
+    tagger = EntityTagger(gazetteer={})
+    tagger.patterns = [
+        ("LOCAL", re.compile(r"(Rio Branco)")),
+        ("ORGAO", re.compile(r"(Branco do Acre Previdência)")),
+        ("ORGAO", re.compile(r"(Previdência Social)")),
+        ("LOCAL", re.compile(r"(Cuiabá)")),
+    ]
+
+    mentions = tagger.tag(text)
+
+    # A menção curta que começa antes perde para a longa que a sobrepõe
+    assert [m.valor for m in mentions] == ["Branco do Acre Previdência", "Cuiabá"]
+
+
+def test_each_content_is_tagged_once(tmp_path):
+    store = TextStore(tmp_path / "processed")
+    store.write("a" * 64, [ACT, "Cuiabá"])
+    manifest = Manifest(tmp_path / "raw")
+    manifest.add({"entity": "ALAC", "caminho_local": "x.pdf", "hash_sha256": "a" * 64})
+    written = []
+
+    def write(batch):
+        written.extend(batch)
+        return [sha256 for sha256, _ in batch]
+
+    task = partial(tag_document, str(tmp_path / "processed"))
+    assert run_stage(manifest, STAGE, store, task, write, workers=1) == 1
+    assert run_stage(manifest, STAGE, store, task, write, workers=1) == 0
+
+    (sha256, mentions), = written
+    assert any(m.valor == "Cuiabá" and m.inicio_pos == len(ACT) + 1 for m in mentions)
+    manifest.close()
@@ -0,0 +1,24 @@
+import json
+from datetime import date
+
+from datapub.factory import build_params
+from datapub.orchestrator import implemented_entities, run_all
+
+
+def test_build_params_uses_entity_defaults():
+    assert build_params("al_go", "2024-01-01", "2024-01-31") == {
+        "start_date": date(2024, 1, 1),
+        "end_date": date(2024, 1, 31),
+    }
+    assert build_params("al_ms") == {"start_num": 1844, "end_num": None}
+
+
+def test_run_all_isolates_failures(tmp_path):
+    sources = tmp_path / "sources.json"
+    sources.write_text(json.dumps([{"sigla": "al_go"}, {"sigla": "al_xx"}]), encoding="utf-8")
+    assert implemented_entities(sources) == ["al_go"]
+
+    results = run_all(["al_xx"], workers=1, logs_dir=tmp_path / "logs")
+
+    assert [(r.entity, r.status) for r in results] == [("al_xx", "erro")]
+    assert "al_xx" in results[0].error
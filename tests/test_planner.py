@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+
+from datapub.shared.utils.planner import PublicationPlanner, easter, is_holiday
+
+
+def _weekdays(start, end):
+    day = start
+    while day <= end:
+        if day.weekday() < 5 and not is_holiday(day):
+            yield day
+        day += timedelta(days=1)
+
+
+def test_holidays():
+    assert easter(2024) == date(2024, 3, 31)
+    assert is_holiday(date(2024, 3, 29))  # Sexta-feira Santa
+    assert is_holiday(date(2025, 3, 4))  # Carnaval
+    assert not is_holiday(date(2023, 11, 20))
+
+
+def test_planner_skips_improbable_days_with_rotating_sweep():
+    planner = PublicationPlanner(_weekdays(date(2023, 1, 1), date(2023, 12, 31)))
+    start, end = date(2024, 4, 1), date(2024, 4, 30)
+
+    plan = planner.plan(start, end, run_key=0)
+    likely = [d for d in plan if d.weekday() < 5 and not is_holiday(d)]
+    assert plan[:len(likely)] == likely == list(_weekdays(start, end))
+    assert len(plan) < 30
+
+    swept = set()
+    for run_key in range(planner.sweep_every):
+        swept.update(planner.plan(start, end, run_key=run_key)[len(likely):])
+    assert swept == {start + timedelta(days=i) for i in range(30)} - set(likely)
+    assert len(planner.plan(start, end, sweep=True)) == 30
+
+
+def test_planner_learns_yearly_recess():
+    # Três anos sem publicações na segunda quinzena de julho
+    history = [d for d in _weekdays(date(2021, 1, 1), date(2023, 12, 31)) if not (d.month == 7 and d.day > 15)]
+    planner = PublicationPlanner(history)
+
+    plan = planner.plan(date(2024, 7, 1), date(2024, 7, 31), run_key=0)
+    likely = [d for d in plan if planner.probability(d) >= planner.threshold]
+    assert likely == list(_weekdays(date(2024, 7, 1), date(2024, 7, 15)))
+    assert planner.probability(date(2024, 7, 22)) < planner.threshold < planner.probability(date(2024, 7, 8))
+
+    # Um único ano de recesso não basta para pular a quinzena
+    full = _weekdays(date(2021, 1, 1), date(2023, 12, 31))
+    single = PublicationPlanner([d for d in full if not (d.year == 2023 and d.month == 7 and d.day > 15)])
+    assert single.probability(date(2024, 7, 22)) >= single.threshold
+
+
+def test_planner_without_history_plans_every_day():
+    assert len(PublicationPlanner().plan(date(2024, 1, 1), date(2024, 1, 31))) == 31
@@ -0,0 +1,27 @@
+from datapub.shared.utils.probing import find_last
+
+
+def _series(last, holes=()):
+    calls = []
+
+    def probe(n):
+        calls.append(n)
+        return 1 <= n <= last and n not in holes
+
+    return probe, calls
+
+
+def test_find_last_uses_logarithmic_probes():
+    probe, calls = _series(2871)
+
+    assert find_last(probe, known=1843) == 2871
+    assert len(calls) < 30
+
+
+def test_find_last_only_new_editions_and_holes():
+    probe, calls = _series(2871)
+    assert find_last(probe, known=2871) == 2871
+    assert len(calls) == 3
+
+    probe, _ = _series(2871, holes={2869})
+    assert find_last(probe, known=2860) == 2871
@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("pdfplumber")
+
+from datapub.processing import text  # noqa: E402
+from datapub.processing.text import TextStore, process_documents  # noqa: E402
+from datapub.shared.utils.download import hash_file  # noqa: E402
+from datapub.shared.utils.manifest import Manifest  # noqa: E402
+
+
+def test_extracts_every_page_in_chunks(tmp_path, make_pdf, monkeypatch):
+    monkeypatch.setattr(text, "PAGES_PER_TASK", 2)
+    raw = tmp_path / "raw"
+    pdf = raw / "alpa" / "downloads" / "diario.pdf"
+    pdf.parent.mkdir(parents=True)
+    pdf.write_bytes(make_pdf([f"Pagina {n}" for n in range(5)]))
+    sha256 = hash_file(pdf)[1]
+
+    manifest = Manifest(raw)
+    for name in ("diario.pdf", "copia.pdf"):
+        manifest.add({"entity": "ALPA", "caminho_local": str(pdf.parent / name), "hash_sha256": sha256})
+    (pdf.parent / "copia.pdf").write_bytes(pdf.read_bytes())
+
+    assert process_documents(manifest, tmp_path / "processed", workers=2) == (1, 0)
+    assert process_documents(manifest, tmp_path / "processed", workers=2) == (0, 0)
+    manifest.close()
+
+    store = TextStore(tmp_path / "processed")
+    assert list(store.hashes()) == [sha256]
+    assert store.pages(sha256) == [f"Pagina {n}" for n in range(5)]
+    assert store.page(sha256, 3) == "Pagina 3"
+    assert store.page(sha256, 4) == "Pagina 4"
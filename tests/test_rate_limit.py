@@ -0,0 +1,107 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from datapub.shared.utils.rate_limit import HostPolicy, RateLimiter, limit_session, retry_after_seconds
+
+
+class _ThrottlingHandler(BaseHTTPRequestHandler):
+    """Answers the first request with 429 and a Retry-After, then 200."""
+
+    requests = 0
+
+    def do_GET(self):
+        cls = type(self)
+        cls.requests += 1
+        self.send_response(429 if cls.requests == 1 else 200)
+        if cls.requests == 1:
+            self.send_header("Retry-After", "0.3")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _ThrottlingHandler.requests = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _ThrottlingHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_fast_successes_raise_the_rate_up_to_the_ceiling():
+    limiter = RateLimiter(HostPolicy(rate=1.0, max_rate=1.5, increase=0.2)).host("https://portal.example/a")
+
+    for _ in range(10):
+        limiter.feedback(0.1, 200)
+
+    assert limiter.rate == 1.5
+
+
+def test_congestion_halves_the_rate_once_per_burst_and_respects_the_floor():
+    limiter = RateLimiter(HostPolicy(rate=4.0, min_rate=0.5)).host("https://portal.example/a")
+
+    limiter.feedback(0.1, 429)
+    limiter.feedback(0.1, 503)  # mesma rajada: não reduz de novo
+    assert limiter.rate == 2.0
+
+    for _ in range(5):
+        limiter._last_decrease = 0.0
+        limiter.feedback(0.1, None)
+    assert limiter.rate == 0.5
+
+
+def test_slow_responses_count_as_congestion():
+    limiter = RateLimiter(HostPolicy(rate=2.0, target_latency=1.0)).host("https://portal.example/a")
+
+    limiter.feedback(3.0, 200)
+
+    assert limiter.rate == 1.0
+
+
+def test_hosts_are_limited_independently():
+    rate_limiter = RateLimiter(HostPolicy(rate=2.0), hosts={"lento.example": HostPolicy(rate=0.5)})
+
+    rate_limiter.feedback("https://rapido.example/x", 0.1, 429)
+
+    assert rate_limiter.host("https://rapido.example/y").rate == 1.0
+    assert rate_limiter.host("https://lento.example/").rate == 0.5
+    assert rate_limiter.host("https://outro.example/").rate == 2.0
+
+
+def test_acquire_spaces_requests_beyond_the_burst():
+    limiter = RateLimiter(HostPolicy(rate=20.0, max_rate=20.0, burst=1)).host("https://portal.example/")
+
+    started = time.monotonic()
+    for _ in range(4):
+        limiter.acquire()
+
+    assert time.monotonic() - started >= 0.14
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert retry_after_seconds("12") == 12.0
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert retry_after_seconds("amanhã") is None
+    assert retry_after_seconds(None) is None
+
+
+def test_session_backs_off_and_honours_retry_after(server):
+    rate_limiter = RateLimiter(HostPolicy(rate=5.0, burst=5))
+    session = limit_session(requests.Session(), rate_limiter)
+
+    assert session.get(server).status_code == 429
+    assert rate_limiter.host(server).rate == 2.5
+
+    started = time.monotonic()
+    assert session.get(server).status_code == 200
+    assert time.monotonic() - started >= 0.25
@@ -0,0 +1,247 @@
+import threading
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+
+from datapub.shared.utils.extractor_base import DownloadEngine, DownloadJob, ExtractorBase
+from datapub.shared.utils.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Resilience,
+    RetryPolicy,
+    RetryQueue,
+    error_class,
+    status_class,
+)
+
+PDF_BODY = b"%PDF-1.4\n" + b"x" * 1024
+FAST = {kind: RetryPolicy(attempts=3, base_delay=0.001) for kind in ("rede", "limite", "servidor")}
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    """Answers 503 to the first ``failures`` requests of each path, then the PDF."""
+
+    failures = 2
+    seen = {}
+
+    def do_GET(self):
+        cls = type(self)
+        cls.seen[self.path] = cls.seen.get(self.path, 0) + 1
+        if self.path.startswith("/sumido"):
+            self.send_response(404)
+            body = b""
+        elif cls.seen[self.path] <= cls.failures:
+            self.send_response(503)
+            body = b""
+        else:
+            self.send_response(200)
+            body = PDF_BODY
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def portal():
+    _FlakyHandler.failures = 2
+    _FlakyHandler.seen = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FlakyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_errors_are_sorted_into_retry_classes():
+    assert status_class(200) is None
+    assert status_class(429) == "limite"
+    assert status_class(503) == "servidor"
+    assert status_class(404) == "definitivo"
+    assert error_class(requests.ConnectionError()) == "rede"
+    assert error_class(requests.Timeout()) == "rede"
+    assert error_class(ValueError("bug")) == "definitivo"
+
+
+def test_transient_failures_are_retried_until_success():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise requests.ConnectionError("caiu")
+        return "ok"
+
+    assert Resilience(FAST).call("https://portal.example/x", flaky) == "ok"
+    assert len(calls) == 3
+
+
+def test_definitive_errors_are_not_retried():
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise ValueError("bug")
+
+    with pytest.raises(ValueError):
+        Resilience(FAST).call("https://portal.example/x", broken)
+    assert len(calls) == 1
+
+
+def test_breaker_opens_fails_fast_and_closes_after_a_good_trial():
+    resilience = Resilience(FAST, threshold=2, reset_after=60)
+    calls = []
+
+    def down():
+        calls.append(1)
+        raise requests.ConnectionError("fora do ar")
+
+    # O circuito abre na segunda falha e a terceira tentativa nem é feita
+    with pytest.raises(CircuitOpenError):
+        resilience.call("https://fora.example/a", down)
+    assert len(calls) == 2
+
+    with pytest.raises(CircuitOpenError):
+        resilience.call("https://fora.example/b", down)
+    assert len(calls) == 2
+    assert resilience.call("https://outro.example/", lambda: "ok") == "ok"
+
+    breaker = resilience.breaker("https://fora.example/")
+    breaker.reset_after = 0
+    assert resilience.call("https://fora.example/c", lambda: "ok") == "ok"
+    assert not breaker.is_open
+
+
+def test_half_open_breaker_lets_a_single_trial_through():
+    breaker = CircuitBreaker("portal.example", threshold=1, reset_after=0)
+    breaker.record(False)
+
+    assert breaker.admit() == 0
+    assert breaker.admit() > 0  # teste em andamento
+    breaker.record(True)
+    assert breaker.admit() == 0
+
+
+def test_retry_queue_survives_restarts_and_keeps_only_new_failures(tmp_path):
+    job = DownloadJob(
+        "https://portal.example/a.pdf",
+        tmp_path / "a.pdf",
+        metadata={"date": datetime(2024, 3, 4), "unit": date(2024, 3, 4), "edicao": {"id": 7}},
+    )
+    other = DownloadJob("https://portal.example/b.pdf", tmp_path / "b.pdf", metadata={"unit": 8})
+    RetryQueue(tmp_path, DownloadJob).push(job, "HTTP 503")
+    RetryQueue(tmp_path, DownloadJob).push(other, "timeout")
+
+    queue = RetryQueue(tmp_path, DownloadJob)
+    jobs = queue.take()
+    assert jobs == [job, other]
+
+    queue.push(jobs[1], "timeout de novo")
+    queue.settle()
+    assert RetryQueue(tmp_path, DownloadJob).take() == [other]
+
+    queue = RetryQueue(tmp_path, DownloadJob)
+    queue.take()
+    queue.settle()
+    assert not queue.path.exists()
+
+
+def test_retry_queue_does_not_keep_request_bodies_or_headers(tmp_path):
+    job = DownloadJob(
+        "https://portal.example/doe",
+        tmp_path / "a.pdf",
+        metadata={"unit": date(2024, 3, 4)},
+        method="POST",
+        data={"javax.faces.ViewState": "-123:456"},
+        headers={"Cookie": "JSESSIONID=abc"},
+    )
+    RetryQueue(tmp_path, DownloadJob).push(job, "HTTP 503")
+
+    (queued,) = RetryQueue(tmp_path, DownloadJob).take()
+    assert "ViewState" not in queued.target.parent.joinpath("retry_queue.jsonl").read_text()
+    assert (queued.method, queued.data, queued.headers) == ("GET", None, None)
+    assert queued.metadata == {"unit": date(2024, 3, 4)}
+
+
+class _PostExtractor(ExtractorBase):
+    """Extractor whose jobs are POSTs bound to a form token, like ALAC's ViewState."""
+
+    def __init__(self, base_dir, portal):
+        super().__init__(entity="FAKE", base_dir=base_dir)
+        self.portal = portal
+        self.resilience = Resilience(FAST)
+        self.tokens = 0
+
+    def _build_job(self, day, path="/a.pdf"):
+        self.tokens += 1
+        return DownloadJob(
+            f"{self.portal}{path}",
+            self.downloads_dir / f"{day.isoformat()}.pdf",
+            metadata={"date": day, "unit": day, "label": day.isoformat()},
+            method="POST",
+            data={"token": str(self.tokens)},
+        )
+
+    def _rebuild_job(self, job):
+        return self._build_job(job.metadata["unit"], urlsplit(job.url).path)
+
+    def _on_download_complete(self, result):
+        pass
+
+
+def test_queued_jobs_are_rebuilt_and_a_missing_replay_stays_failed(portal, tmp_path):
+    extractor = _PostExtractor(tmp_path / "raw" / "fake", portal)
+    good, gone = date(2024, 3, 4), date(2024, 3, 5)
+    extractor.retry_queue.push(extractor._build_job(good), "HTTP 503")
+    extractor.retry_queue.push(extractor._build_job(gone, "/sumido.pdf"), "HTTP 503")
+    _FlakyHandler.failures = 0
+
+    extractor.checkpoint.begin("date", good, gone)
+    results = extractor.download_jobs([])
+
+    assert sorted(r.status for r in results) == ["invalido", "sucesso"]
+    assert all(r.job.method == "POST" and r.job.data["token"] in ("3", "4") for r in results)
+    assert good in extractor.checkpoint.run.done
+    # Um 404 na repetição não vira "sem diário": a unidade continua pendente
+    assert gone in extractor.checkpoint.run.failed
+
+
+def test_retry_queue_gives_up_after_max_rounds(tmp_path):
+    job = DownloadJob("https://portal.example/a.pdf", tmp_path / "a.pdf")
+    queue = RetryQueue(tmp_path, DownloadJob)
+    queue.push(job, "erro")
+    for _ in range(3):
+        queue.take()
+        queue.push(job, "erro")
+        queue.settle()
+
+    assert queue.take() == []
+
+
+def test_engine_retries_server_errors_and_keeps_404_as_invalid(portal, tmp_path):
+    jobs = [
+        DownloadJob(f"{portal}/a.pdf", tmp_path / "a.pdf"),
+        DownloadJob(f"{portal}/sumido.pdf", tmp_path / "sumido.pdf"),
+    ]
+
+    results = {r.job.target.name: r for r in DownloadEngine(resilience=Resilience(FAST)).run(jobs)}
+
+    assert results["a.pdf"].ok and _FlakyHandler.seen["/a.pdf"] == 3
+    assert results["sumido.pdf"].status == "invalido" and _FlakyHandler.seen["/sumido.pdf"] == 1
+
+
+def test_engine_reports_exhausted_server_errors_as_errors(portal, tmp_path):
+    _FlakyHandler.failures = 10
+
+    (result,) = DownloadEngine(resilience=Resilience(FAST)).run([DownloadJob(f"{portal}/a.pdf", tmp_path / "a.pdf")])
+
+    assert result.status == "erro" and result.http_status == 503
+    assert _FlakyHandler.seen["/a.pdf"] == 3
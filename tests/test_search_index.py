@@ -0,0 +1,124 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("psycopg2")
+
+from datapub.processing.search_index import STAGE, BulkIndexer, bulk_chunks, index_documents  # noqa: E402
+from datapub.processing.text import TextStore  # noqa: E402
+from datapub.shared.utils.manifest import Manifest  # noqa: E402
+
+
+class _ElasticHandler(BaseHTTPRequestHandler):
+    """Stand-in for Elasticsearch: answers the first _bulk with 429 and rejects one item once."""
+
+    indices = set()
+    documents = {}
+    requests = 0
+    throttled_item = None
+    broken = False
+
+    def do_HEAD(self):
+        self.send_response(200 if self.path.strip("/") in self.indices else 404)
+        self.end_headers()
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        type(self).indices.add(self.path.strip("/"))
+        self._json({"acknowledged": True})
+
+    def do_POST(self):
+        cls = type(self)
+        lines = self.rfile.read(int(self.headers["Content-Length"])).splitlines()
+        cls.requests += 1
+        if cls.requests == 1:
+            self._json({"error": "rejected"}, status=429)
+            return
+        if cls.broken and b"number 0" not in b"".join(lines):
+            self._json({"error": "shard failure"}, status=500)
+            return
+
+        items = []
+        for action, source in zip(lines[::2], lines[1::2]):
+            doc_id = json.loads(action)["index"]["_id"]
+            if cls.throttled_item is None:
+                cls.throttled_item = doc_id
+                items.append({"index": {"_id": doc_id, "status": 429}})
+                continue
+            cls.documents[doc_id] = json.loads(source)
+            items.append({"index": {"_id": doc_id, "status": 201}})
+        self._json({"errors": False, "items": items})
+
+    def _json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def elastic():
+    _ElasticHandler.indices, _ElasticHandler.documents = set(), {}
+    _ElasticHandler.requests, _ElasticHandler.throttled_item = 0, None
+    _ElasticHandler.broken = False
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ElasticHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_chunks_are_bounded_by_size_and_count():
+    actions = [(str(i), b"x" * 40) for i in range(10)]
+
+    assert [len(c.hashes) for c in bulk_chunks(actions, max_bytes=100, max_docs=10)] == [2, 2, 2, 2, 2]
+    assert [len(c.hashes) for c in bulk_chunks(actions, max_bytes=10_000, max_docs=4)] == [4, 4, 2]
+    assert [len(c.hashes) for c in bulk_chunks([("big", b"x" * 500)], max_bytes=100)] == [1]
+
+
+def test_indexes_incrementally_with_backpressure(elastic, tmp_path):
+    root = tmp_path / "processed"
+    manifest = Manifest(tmp_path / "raw")
+    for i in range(5):
+        sha256 = f"{i}" * 64
+        TextStore(root).write(sha256, [f"Diário número {i}"])
+        manifest.add(
+            {"entity": "ALAC", "caminho_local": f"{i}.pdf", "hash_sha256": sha256, "data_publicacao": "2024-03-01"}
+        )
+    indexer = BulkIndexer(elastic, backoff=0.01)
+
+    assert index_documents(manifest, root, index="diarios", concurrency=2, max_docs=2, indexer=indexer) == (5, 0)
+    assert "diarios" in _ElasticHandler.indices
+    assert len(_ElasticHandler.documents) == 5
+    assert _ElasticHandler.documents["0" * 64]["texto"] == "Diário número 0"
+    assert _ElasticHandler.documents["0" * 64]["orgao"] == "ALAC"
+
+    sent = _ElasticHandler.requests
+    assert index_documents(manifest, root, indexer=indexer) == (0, 0)
+    assert _ElasticHandler.requests == sent
+    assert len(list(manifest.pending_contents(STAGE))) == 0
+    manifest.close()
+
+
+def test_a_failed_batch_is_counted_and_the_run_continues(elastic, tmp_path):
+    root = tmp_path / "processed"
+    manifest = Manifest(tmp_path / "raw")
+    for i in range(4):
+        sha256 = f"{i}" * 64
+        TextStore(root).write(sha256, [f"Diario number {i}"])
+        manifest.add({"entity": "ALAC", "caminho_local": f"{i}.pdf", "hash_sha256": sha256})
+    _ElasticHandler.broken = True
+    _ElasticHandler.throttled_item = "nenhum"
+    indexer = BulkIndexer(elastic, backoff=0.01, pool_maxsize=2)
+    assert indexer.session.get_adapter(elastic)._pool_maxsize == 2
+
+    assert index_documents(manifest, root, concurrency=2, max_docs=1, indexer=indexer) == (1, 3)
+    # Os documentos do lote que falhou continuam pendentes
+    assert len(list(manifest.pending_contents(STAGE))) == 3
+    manifest.close()